@@ -1,2 +1,2 @@
-from .database import engine, SessionLocal, get_db, create_tables
+from .database import engine, SessionLocal, get_db, create_tables, DB_ASYNC, AsyncSessionLocal, get_async_db, get_pool_status
 from .models import Base
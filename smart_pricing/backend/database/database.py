@@ -2,19 +2,36 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from .models import Base
+from .pool import instrument_pool, pool_options
 
-def get_db_url():
+# Serve the hot routes (select, reward, listings) from an asyncpg AsyncEngine
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+def get_db_url(driver: str = "psycopg2"):
     user = os.getenv("DB_USER", "postgres")
     password = os.getenv("DB_PASSWORD", "admin")
     name = os.getenv("DB_NAME", "postgres")
     host = os.getenv("DB_HOST", "db")
     port = os.getenv("DB_PORT", "5432")
 
-    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}"
+    return f"postgresql+{driver}://{user}:{password}@{host}:{port}/{name}"
 
-engine = create_engine(get_db_url(), pool_pre_ping=True)
+# Pool sizing, pre-ping and statement timeout come from DB_POOL_* (see pool.py)
+engine = create_engine(get_db_url(), **pool_options())
+pool_stats = instrument_pool(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Only created in async mode, so asyncpg is not needed otherwise
+async_engine = None
+async_pool_stats = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(get_db_url("asyncpg"), **pool_options(is_async=True))
+    async_pool_stats = instrument_pool(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     """
     Dependency for FastAPI. Yields a SQLAlchemy Session.
@@ -26,6 +43,21 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Async counterpart of ``get_db`` for routes served in ``DB_ASYNC`` mode.
+    Usage: db: AsyncSession = Depends(get_async_db)
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_pool_status() -> dict:
+    """Live state of the sync pool, and of the async pool in ``DB_ASYNC`` mode."""
+    status = {"sync_pool": pool_stats.snapshot(engine.pool)}
+    if async_engine is not None:
+        status["async_pool"] = async_pool_stats.snapshot(async_engine.sync_engine.pool)
+    return status
+
 def create_tables():
     """
     Create all tables
@@ -7,14 +7,26 @@ from sqlalchemy import (
     Numeric,
     ForeignKey,
     DateTime,
-    Text
+    Text,
+    Index,
+    Double,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import os
 
 Base = declarative_base()
 
+# Storage of the posterior statistics (bandits.mean / bandits.variance):
+# "numeric" (default, exact) or "double" (float8, read back as Python floats).
+# Prices and reward sums always stay NUMERIC, so they remain exact either way.
+BANDIT_STATS_STORAGE = os.getenv("BANDIT_STATS_STORAGE", "numeric").lower()
+if BANDIT_STATS_STORAGE not in ("numeric", "double"):
+    raise ValueError(f"BANDIT_STATS_STORAGE must be 'numeric' or 'double', got {BANDIT_STATS_STORAGE!r}")
+
+StatsType = Double(asdecimal=False) if BANDIT_STATS_STORAGE == "double" else Numeric
+
 
 # -----------------------------
 #  FIXED: Always return naive datetime
@@ -56,6 +68,10 @@ class User(Base):
 # -----------------------------
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Newest-first listing (keyset pagination) and the storefront's default project
+        Index("ix_projects_created_at", "created_at", "project_id"),
+    )
 
     project_id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -81,6 +97,10 @@ class Project(Base):
 # -----------------------------
 class Bandit(Base):
     __tablename__ = "bandits"
+    __table_args__ = (
+        # Per-project arm lookups, ordered by id
+        Index("ix_bandits_project_id", "project_id", "bandit_id"),
+    )
 
     bandit_id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
@@ -88,9 +108,9 @@ class Bandit(Base):
     price = Column(Numeric, nullable=False)
 
     # Thompson sampling statistics
-    mean = Column(Numeric, nullable=False, default=0.0)
-    variance = Column(Numeric, nullable=False, default=1.0)
-    reward = Column(Numeric, nullable=False, default=0.0)
+    mean = Column(StatsType, nullable=False, default=0.0)
+    variance = Column(StatsType, nullable=False, default=1.0)
+    reward = Column(Numeric, nullable=False, default=0.0)  # exact running sum
     trial = Column(Integer, nullable=False, default=0)
     number_explored = Column(Integer, nullable=False, default=0)
 
@@ -109,6 +129,12 @@ class Bandit(Base):
 # -----------------------------
 class Experiment(Base):
     __tablename__ = "experiments"
+    __table_args__ = (
+        # Per-project / per-bandit history; BRIN for date-range analytics
+        Index("ix_experiments_project_id_start_date", "project_id", "start_date"),
+        Index("ix_experiments_bandit_id_start_date", "bandit_id", "start_date"),
+        Index("brin_experiments_start_date", "start_date", postgresql_using="brin"),
+    )
 
     experiment_id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -122,4 +148,19 @@ class Experiment(Base):
     end_date = Column(DateTime(timezone=False), default=get_naive_time)
 
     project = relationship("Project", back_populates="experiments")
-    bandit = relationship("Bandit", back_populates="experiments")
\ No newline at end of file
+    bandit = relationship("Bandit", back_populates="experiments")
+
+# -----------------------------
+#  REWARD JOURNAL MARKERS
+# -----------------------------
+class RewardJournalSegment(Base):
+    """
+    Journal segments of the write-behind reward buffer whose rewards are committed.
+
+    A segment is recorded in the same transaction as its rewards, so replaying
+    a segment that was committed but not yet deleted is a no-op.
+    """
+    __tablename__ = "reward_journal_segments"
+
+    segment = Column(String, primary_key=True)
+    applied_at = Column(DateTime(timezone=False), nullable=False, default=get_naive_time)
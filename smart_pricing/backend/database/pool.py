@@ -0,0 +1,190 @@
+"""
+Connection pool configuration and live pool statistics.
+
+Pool sizing comes from the environment, so it can be matched to the number
+of uvicorn workers (every worker process has its own pool, and together
+they must stay below the server's ``max_connections``):
+
+    DB_POOL_SIZE                    connections kept open (default 5)
+    DB_MAX_OVERFLOW                 extra connections under load (default 10)
+    DB_POOL_TIMEOUT_SECONDS         wait for a free connection before failing (default 30)
+    DB_POOL_RECYCLE_SECONDS         replace connections older than this; -1 = never (default -1)
+    DB_POOL_PRE_PING                liveness check on checkout: "always" (default),
+                                    "idle" (only after DB_POOL_PRE_PING_IDLE_SECONDS
+                                    unused, default 30) or "never"
+    DB_STATEMENT_TIMEOUT_MS         server-side statement_timeout; 0 = none (default 0)
+
+``always`` costs one extra round trip per checkout. ``idle`` only pings
+connections that sat in the pool long enough to have been dropped by a
+firewall or a server restart; a busy pool then never pings.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").lower()
+DB_POOL_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+if DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+    raise ValueError(f"DB_POOL_PRE_PING must be one of {PRE_PING_STRATEGIES}, got {DB_POOL_PRE_PING!r}")
+
+# Recent checkout waits kept for percentiles
+WAIT_SAMPLES = 2048
+
+
+class PoolStats:
+    """
+    Counters and recent checkout wait times of one engine's pool.
+
+    ``wait`` is the time spent in the pool's checkout, i.e. waiting for a
+    free connection or opening a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.connects = 0
+        self.invalidations = 0
+        self.pings = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_s += seconds
+            self.wait_max_s = max(self.wait_max_s, seconds)
+            self._waits.append(seconds)
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, pool) -> dict:
+        """Current pool occupancy together with the accumulated counters."""
+        with self._lock:
+            waits = np.fromiter(self._waits, dtype=np.float64)
+            counters = {
+                "checkouts_total": self.checkouts,
+                "timeouts_total": self.timeouts,
+                "connects_total": self.connects,
+                "invalidations_total": self.invalidations,
+                "pings_total": self.pings,
+                "wait_seconds_total": round(self.wait_total_s, 6),
+                "wait_max_ms": round(self.wait_max_s * 1000, 3),
+            }
+        p50, p99 = np.percentile(waits, [50, 99]) * 1000 if len(waits) else (0.0, 0.0)
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            **counters,
+            "recent_wait_p50_ms": round(float(p50), 3),
+            "recent_wait_p99_ms": round(float(p99), 3),
+        }
+
+
+class _TimedCheckout:
+    """Pool mixin timing every checkout into ``self.stats``."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # Keep the same stats object across pool recreation (e.g. after dispose)
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(is_async: bool = False) -> dict:
+    """
+    Keyword arguments for ``create_engine`` / ``create_async_engine`` from the environment.
+    """
+    options = {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING == "always",
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def instrument_pool(engine) -> PoolStats:
+    """
+    Attach a ``PoolStats`` to a (sync) engine created with ``pool_options``
+    and install the ``idle`` pre-ping strategy if configured.
+    """
+    stats = PoolStats()
+    engine.pool.stats = stats
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.count("connects")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.count("invalidations")
+
+    if DB_POOL_PRE_PING == "idle":
+        @event.listens_for(engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            connection_record.info["checked_in_at"] = time.monotonic()
+
+        @event.listens_for(engine, "checkout")
+        def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if checked_in_at is None or time.monotonic() - checked_in_at < DB_POOL_PRE_PING_IDLE_SECONDS:
+                return
+            stats.count("pings")
+            try:
+                engine.dialect.do_ping(dbapi_connection)
+                dbapi_connection.rollback()
+            except Exception as e:
+                # The pool discards this connection and retries with a fresh one
+                raise exc.DisconnectionError() from e
+
+    return stats
@@ -6,28 +6,89 @@ from fastapi import (
     APIRouter,
     HTTPException,
     Depends,
+    Query,
     UploadFile,
     File,
     FastAPI,
     Response,
+    Request,
 )
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import numpy as np
+import asyncio
 import os
-from io import BytesIO
+import time
+from datetime import datetime
+from typing import Literal
 
-import matplotlib.pyplot as plt
-from scipy.stats import norm
+import numpy as np
 
-from database.database import get_db
+from database.database import DB_ASYNC, async_engine, engine, get_async_db, get_db, get_pool_status, SessionLocal
+from database.pool import DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS
 from database.models import Project, Bandit, Experiment
+from observability import (
+    METRICS_ENABLED,
+    PROFILES_ROUTE,
+    PROFILING_ENABLED,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    instrument_engine,
+    list_profiles,
+    profile_path,
+    record_rewards,
+    record_selections,
+    register_pool_collector,
+    render_metrics,
+    token_matches,
+)
+from services.arm_cache import (
+    arm_cache,
+    get_arm_table,
+    get_arm_table_async,
+    get_bandit_project,
+    get_bandit_project_async,
+)
+from services.optimal_price import optimal_price_tracker
+from services.pagination import (
+    API_DEFAULT_PAGE_SIZE,
+    API_MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    fetch_page_async,
+    parse_fields,
+    project_rows,
+)
+from services.posterior import encode_posterior_f32, posterior_grid
+from services.plotting import PlotOptions, plot_cache, plot_digest, render_posterior_plot
+from services.render_pool import RenderPoolBusy, render_pool
+from services.sampling import sample_arms
+from services.rewards import (
+    REWARD_BULK_MAX_EVENTS,
+    apply_reward,
+    apply_reward_async,
+    apply_reward_batch,
+    parse_reward_events,
+)
+from services.reward_buffer import RewardBufferFull, create_reward_buffer
+from services.simulation import run_simulation
+from services.export import EXPORT_BATCH_ROWS, EXPORT_FORMATS, ExportOptions, stream_experiments
+from services.timeseries import conversion_timeseries
 
 # ---------- REQUEST MODELS ----------
 from models.Request.requests import (
     CreateProjectRequest,
     SubmitRewardRequest,
     CreateBanditRequestModel,
+    BatchSelectRequest,
+    RunSimulationRequest,
 )
 
 # ---------- RESPONSE MODELS ----------
@@ -35,8 +96,16 @@ from models.Response.responses import (
     CreateProjectResponseModel,
     CreateBanditResponseModel,
     ProjectItem,
+    ProjectReport,
     BanditReport,
     ThompsonSelectResponse,
+    OfferResponse,
+    ThompsonBatchSelectResponse,
+    BulkRewardResponse,
+    PosteriorGridResponse,
+    DbPoolStatusResponse,
+    SimulationResponse,
+    TimeSeriesResponse,
 )
 
 # ----------------------------------------------------
@@ -44,6 +113,12 @@ from models.Response.responses import (
 # ----------------------------------------------------
 router = APIRouter()
 
+# Async (asyncpg) variants of the hot routes, served instead when DB_ASYNC is set
+async_router = APIRouter()
+
+# Write-behind reward buffer, enabled with REWARD_WRITE_MODE=buffered
+reward_buffer = create_reward_buffer(SessionLocal)
+
 # ======================================================
 #  CREATE PROJECT
 # ======================================================
@@ -111,9 +186,76 @@ def upload_project_image(
 # ======================================================
 #  GET PROJECTS
 # ======================================================
+def _projects_page_query(cursor: str | None, fields: str | None):
+    try:
+        selected = parse_fields(fields, ProjectItem)
+        after = None
+        if cursor:
+            after = decode_cursor(cursor, "created_at", "project_id")
+            after["created_at"] = datetime.fromisoformat(after["created_at"])
+    except (ValueError, TypeError) as e:
+        raise HTTPException(400, str(e))
+
+    # Newest first; (created_at, project_id) is unique and matches ix_projects_created_at
+    names = dict.fromkeys([*(selected or ProjectItem.model_fields), "created_at", "project_id"])
+    stmt = select(*(getattr(Project, name) for name in names)).order_by(
+        Project.created_at.desc(), Project.project_id.desc()
+    )
+    if after:
+        stmt = stmt.where(tuple_(Project.created_at, Project.project_id) < (after["created_at"], after["project_id"]))
+    return stmt, selected
+
+
+def _project_cursor(row) -> str:
+    return encode_cursor(created_at=row.created_at, project_id=row.project_id)
+
+
+def _page_response(response: Response, rows, next_cursor, model, selected):
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if selected:
+        return JSONResponse(project_rows(rows, model, selected), headers=headers)
+    response.headers.update(headers)
+    return rows
+
+
 @router.get("/projects", response_model=list[ProjectItem])
-def list_projects(db: Session = Depends(get_db)):
-    return db.query(Project).order_by(Project.created_at.desc()).all()
+def list_projects(
+    response: Response,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE, description="Page size"),
+    cursor: str | None = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db),
+):
+
+    stmt, selected = _projects_page_query(cursor, fields)
+    rows, next_cursor = fetch_page(db, stmt, limit, _project_cursor)
+    return _page_response(response, rows, next_cursor, ProjectItem, selected)
+
+
+@async_router.get("/projects", response_model=list[ProjectItem])
+async def list_projects_async(
+    response: Response,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE, description="Page size"),
+    cursor: str | None = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    db: AsyncSession = Depends(get_async_db),
+):
+
+    stmt, selected = _projects_page_query(cursor, fields)
+    rows, next_cursor = await fetch_page_async(db, stmt, limit, _project_cursor)
+    return _page_response(response, rows, next_cursor, ProjectItem, selected)
+
+
+# ======================================================
+#  GET PROJECT
+# ======================================================
+@router.get("/projects/{project_id}", response_model=ProjectReport)
+def get_project(project_id: int, db: Session = Depends(get_db)):
+
+    project = db.query(Project).filter_by(project_id=project_id).first()
+    if not project:
+        raise HTTPException(404, "Project not found")
+    return project
 
 
 # ======================================================
@@ -143,20 +285,71 @@ def create_bandit(
     db.commit()
     db.refresh(bandit)
 
+    arm_cache.add_arm(project_id, bandit.bandit_id, float(bandit.price), 0.0, 1.0)
+    optimal_price_tracker.mark_dirty(project_id, 0)
+
     return bandit
 
 
 # ======================================================
 #  LIST BANDITS
 # ======================================================
+def _bandits_page_query(project_id: int, cursor: str | None, fields: str | None):
+    try:
+        selected = parse_fields(fields, BanditReport)
+        after = decode_cursor(cursor, "bandit_id") if cursor else None
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    names = dict.fromkeys([*(selected or BanditReport.model_fields), "bandit_id"])
+    stmt = (
+        select(*(getattr(Bandit, name) for name in names))
+        .where(Bandit.project_id == project_id)
+        .order_by(Bandit.bandit_id)
+    )
+    if after:
+        stmt = stmt.where(Bandit.bandit_id > after["bandit_id"])
+    return stmt, selected
+
+
+def _bandit_cursor(row) -> str:
+    return encode_cursor(bandit_id=row.bandit_id)
+
+
 @router.get("/projects/{project_id}/bandits", response_model=list[BanditReport])
-def get_bandits_for_project(project_id: int, db: Session = Depends(get_db)):
+def get_bandits_for_project(
+    project_id: int,
+    response: Response,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE, description="Page size"),
+    cursor: str | None = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db),
+):
 
-    project = db.query(Project).filter_by(project_id=project_id).first()
-    if not project:
+    stmt, selected = _bandits_page_query(project_id, cursor, fields)
+    if db.execute(select(Project.project_id).filter_by(project_id=project_id)).first() is None:
+        raise HTTPException(404, "Project not found")
+
+    rows, next_cursor = fetch_page(db, stmt, limit, _bandit_cursor)
+    return _page_response(response, rows, next_cursor, BanditReport, selected)
+
+
+@async_router.get("/projects/{project_id}/bandits", response_model=list[BanditReport])
+async def get_bandits_for_project_async(
+    project_id: int,
+    response: Response,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE, description="Page size"),
+    cursor: str | None = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    db: AsyncSession = Depends(get_async_db),
+):
+
+    stmt, selected = _bandits_page_query(project_id, cursor, fields)
+    if (await db.execute(select(Project.project_id).filter_by(project_id=project_id))).first() is None:
         raise HTTPException(404, "Project not found")
 
-    return db.query(Bandit).filter_by(project_id=project_id).all()
+    rows, next_cursor = await fetch_page_async(db, stmt, limit, _bandit_cursor)
+    return _page_response(response, rows, next_cursor, BanditReport, selected)
 
 
 # ======================================================
@@ -165,73 +358,348 @@ def get_bandits_for_project(project_id: int, db: Session = Depends(get_db)):
 @router.post("/projects/{project_id}/thompson/select", response_model=ThompsonSelectResponse)
 def thompson_select_price(project_id: int, db: Session = Depends(get_db)):
 
-    project = db.query(Project).filter_by(project_id=project_id).first()
-    if not project:
+    # Served from the in-process arm cache; the DB is only hit on a miss
+    table = get_arm_table(db, project_id)
+    if table is None:
         raise HTTPException(404, "Project not found")
-
-    bandits = db.query(Bandit).filter_by(project_id=project_id).all()
-    if not bandits:
+    if not len(table):
         raise HTTPException(404, "No bandits found")
 
-    samples = []
-    for b in bandits:
-        mean = float(b.mean)
-        var = max(float(b.variance), 1e-4)
-        std = var**0.5
-        sample = np.random.normal(mean, std)
-        samples.append((b.bandit_id, sample, float(b.price)))
+    bandit_id, price = _select_arm(table)
+    return ThompsonSelectResponse(bandit_id=bandit_id, price=price)
 
-    bandit_id, _, price = max(samples, key=lambda x: x[1])
 
-    project.optimal_price = price
-    db.commit()
+@async_router.post("/projects/{project_id}/thompson/select", response_model=ThompsonSelectResponse)
+async def thompson_select_price_async(project_id: int, db: AsyncSession = Depends(get_async_db)):
 
+    table = await get_arm_table_async(db, project_id)
+    if table is None:
+        raise HTTPException(404, "Project not found")
+    if not len(table):
+        raise HTTPException(404, "No bandits found")
+
+    bandit_id, price = _select_arm(table)
     return ThompsonSelectResponse(bandit_id=bandit_id, price=price)
 
 
+def _select_arm(table) -> tuple[int, float]:
+    # Read-only: optimal_price is maintained by optimal_price_tracker
+    idx = int(sample_arms(table)[0])
+    bandit_id = int(table.bandit_ids[idx])
+    record_selections(table.project_id, (bandit_id,))
+    return bandit_id, float(table.prices[idx])
+
+
+# ======================================================
+#  CUSTOMER OFFER
+# ======================================================
+def _offer_project_query(project_id: int | None):
+    stmt = select(Project.project_id, Project.description, Project.image_path)
+    if project_id is None:
+        # Top-1 scan of ix_projects_created_at
+        return stmt.order_by(Project.created_at.desc()).limit(1)
+    return stmt.where(Project.project_id == project_id)
+
+
+def _offer_response(project_id: int | None, project, table) -> OfferResponse:
+    if project is None:
+        raise HTTPException(404, "No projects found" if project_id is None else "Project not found")
+    if table is None or not len(table):
+        raise HTTPException(404, "No bandits found")
+
+    bandit_id, price = _select_arm(table)
+    return OfferResponse(
+        project_id=project.project_id,
+        bandit_id=bandit_id,
+        price=price,
+        description=project.description,
+        image_path=project.image_path,
+    )
+
+
+@router.post("/offer", response_model=OfferResponse)
+def get_offer(
+    project_id: int | None = Query(None, description="Project to offer; defaults to the newest project"),
+    db: Session = Depends(get_db),
+):
+
+    project = db.execute(_offer_project_query(project_id)).first()
+    table = get_arm_table(db, project.project_id) if project else None
+    return _offer_response(project_id, project, table)
+
+
+@async_router.post("/offer", response_model=OfferResponse)
+async def get_offer_async(
+    project_id: int | None = Query(None, description="Project to offer; defaults to the newest project"),
+    db: AsyncSession = Depends(get_async_db),
+):
+
+    project = (await db.execute(_offer_project_query(project_id))).first()
+    table = await get_arm_table_async(db, project.project_id) if project else None
+    return _offer_response(project_id, project, table)
+
+
+# ======================================================
+#  THOMPSON BATCH SELECT
+# ======================================================
+def _batch_response(project_id: int, n: int, table) -> ThompsonBatchSelectResponse:
+    if table is None:
+        raise HTTPException(404, f"Project {project_id} not found")
+    if not len(table):
+        raise HTTPException(404, f"No bandits found for project {project_id}")
+
+    winners = sample_arms(table, n)
+    record_selections(project_id, table.bandit_ids.tolist(), np.bincount(winners, minlength=len(table)))
+    return ThompsonBatchSelectResponse(
+        project_id=project_id,
+        bandit_ids=table.bandit_ids[winners].tolist(),
+        prices=table.prices[winners].tolist(),
+    )
+
+
+def _batch_select(db: Session, project_id: int, n: int) -> ThompsonBatchSelectResponse:
+    return _batch_response(project_id, n, get_arm_table(db, project_id))
+
+
+async def _batch_select_async(db: AsyncSession, project_id: int, n: int) -> ThompsonBatchSelectResponse:
+    return _batch_response(project_id, n, await get_arm_table_async(db, project_id))
+
+
+@router.post(
+    "/projects/{project_id}/thompson/select/batch",
+    response_model=ThompsonBatchSelectResponse,
+)
+def thompson_select_batch(
+    project_id: int,
+    n: int = Query(1, ge=1, le=10000, description="Number of impressions to select prices for"),
+    db: Session = Depends(get_db),
+):
+    return _batch_select(db, project_id, n)
+
+
+@async_router.post(
+    "/projects/{project_id}/thompson/select/batch",
+    response_model=ThompsonBatchSelectResponse,
+)
+async def thompson_select_batch_async(
+    project_id: int,
+    n: int = Query(1, ge=1, le=10000, description="Number of impressions to select prices for"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await _batch_select_async(db, project_id, n)
+
+
+def _batch_responses(req: BatchSelectRequest, tables: list) -> list[ThompsonBatchSelectResponse]:
+    # All or nothing: report every unusable project before selecting for any
+    missing = [p for p, table in zip(req.project_ids, tables) if table is None or not len(table)]
+    if missing:
+        raise HTTPException(404, f"Projects not found or without bandits: {missing}")
+    return [_batch_response(p, req.n, table) for p, table in zip(req.project_ids, tables)]
+
+
+@router.post("/thompson/select/batch", response_model=list[ThompsonBatchSelectResponse])
+def thompson_select_many_projects(req: BatchSelectRequest, db: Session = Depends(get_db)):
+    return _batch_responses(req, [get_arm_table(db, project_id) for project_id in req.project_ids])
+
+
+@async_router.post("/thompson/select/batch", response_model=list[ThompsonBatchSelectResponse])
+async def thompson_select_many_projects_async(req: BatchSelectRequest, db: AsyncSession = Depends(get_async_db)):
+    return _batch_responses(req, [await get_arm_table_async(db, project_id) for project_id in req.project_ids])
+
+
 # ======================================================
 #  THOMPSON POSTERIOR PLOT
 # ======================================================
 @router.get("/projects/{project_id}/thompson/plot")
-def thompson_posterior_plot(project_id: int, db: Session = Depends(get_db)):
+async def thompson_posterior_plot(
+    project_id: int,
+    request: Request,
+    format: Literal["png", "svg", "webp"] = Query("png", description="Image format"),
+    width: float = Query(8.0, ge=2.0, le=20.0, description="Figure width in inches"),
+    height: float = Query(4.0, ge=1.5, le=12.0, description="Figure height in inches"),
+    dpi: int = Query(100, ge=30, le=300, description="Resolution of raster formats"),
+    db: Session = Depends(get_db),
+):
 
-    project = db.query(Project).filter_by(project_id=project_id).first()
-    if not project:
+    table = await run_in_threadpool(get_arm_table, db, project_id)
+    if table is None:
         raise HTTPException(404, "Project not found")
+    if not len(table):
+        raise HTTPException(404, "No bandits found")
+
+    options = PlotOptions(fmt=format, width=width, height=height, dpi=dpi)
+    digest = plot_digest(table, options)
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "no-cache"}
+
+    # Unchanged bandit state and options: the client's copy is still valid
+    if request.headers.get("if-none-match") in (f'"{digest}"', f'W/"{digest}"', "*"):
+        return Response(status_code=304, headers=headers)
+
+    # Rendered in the renderer process pool; identical concurrent requests share one render
+    try:
+        result = plot_cache.get_or_submit(
+            digest,
+            lambda: render_pool.submit(
+                render_posterior_plot,
+                table.bandit_ids.tolist(),
+                table.prices.tolist(),
+                table.means.tolist(),
+                table.stds.tolist(),
+                options,
+            ),
+        )
+    except RenderPoolBusy:
+        raise HTTPException(503, "Plot renderer is busy", headers={"Retry-After": "1"})
+
+    if isinstance(result, bytes):
+        image = result
+    else:
+        try:
+            image = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(result)), render_pool.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(504, "Plot rendering timed out")
+        except BrokenProcessPool:
+            raise HTTPException(503, "Plot renderer restarted", headers={"Retry-After": "1"})
+    return Response(content=image, media_type=options.media_type, headers=headers)
+
+
+# ======================================================
+#  THOMPSON POSTERIOR GRID
+# ======================================================
+@router.get(
+    "/projects/{project_id}/thompson/posterior",
+    response_model=PosteriorGridResponse,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+def thompson_posterior_grid(
+    project_id: int,
+    request: Request,
+    points: int = Query(200, ge=2, le=5000, description="Grid points per bandit"),
+    format: Literal["json", "f32"] = Query("json", description="json, or raw little-endian float32"),
+    decimals: int = Query(6, ge=1, le=15, description="Rounding of JSON values"),
+    db: Session = Depends(get_db),
+):
 
-    bandits = db.query(Bandit).filter_by(project_id=project_id).all()
-    if not bandits:
+    table = get_arm_table(db, project_id)
+    if table is None:
+        raise HTTPException(404, "Project not found")
+    if not len(table):
         raise HTTPException(404, "No bandits found")
 
-    means = [float(b.mean) for b in bandits]
-    vars_ = [max(float(b.variance), 1e-4) for b in bandits]
-    stds = [v**0.5 for v in vars_]
+    digest = plot_digest(table, ("posterior", points, format, decimals))
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") in (f'"{digest}"', f'W/"{digest}"', "*"):
+        return Response(status_code=304, headers=headers)
 
-    xmin = min(means) - 4 * max(stds)
-    xmax = max(means) + 4 * max(stds)
-    x = np.linspace(xmin, xmax, 400)
+    x, density = posterior_grid(table, points)
 
-    plt.figure(figsize=(8, 4))
-    for b in bandits:
-        mean = float(b.mean)
-        var = max(float(b.variance), 1e-4)
-        y = norm.pdf(x, mean, var**0.5)
-        plt.plot(x, y, label=f"Bandit {b.bandit_id} | price={b.price}")
+    if format == "f32":
+        headers["X-Posterior-Shape"] = f"{len(table)},{points}"
+        headers["X-Bandit-Ids"] = ",".join(map(str, table.bandit_ids.tolist()))
+        headers["X-Prices"] = ",".join(map(str, table.prices.tolist()))
+        return Response(
+            content=encode_posterior_f32(x, density),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
 
-    plt.legend(fontsize=8)
-    plt.grid(True)
-    buf = BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
+    body = PosteriorGridResponse(
+        project_id=project_id,
+        points=points,
+        bandit_ids=table.bandit_ids.tolist(),
+        prices=table.prices.tolist(),
+        means=table.means.tolist(),
+        stds=table.stds.tolist(),
+        x=x.round(decimals).tolist(),
+        density=density.round(decimals).tolist(),
+    )
+    return Response(content=body.model_dump_json(), media_type="application/json", headers=headers)
+
+
+# ======================================================
+#  CONVERSION TIME SERIES
+# ======================================================
+@router.get("/projects/{project_id}/experiments/timeseries", response_model=TimeSeriesResponse)
+def experiment_timeseries(
+    project_id: int,
+    points: int = Query(200, ge=2, le=2000, description="Maximum buckets per bandit"),
+    since: datetime | None = Query(None, description="Start (UTC); default: first experiment"),
+    until: datetime | None = Query(None, description="End (UTC); default: last experiment"),
+    db: Session = Depends(get_db),
+):
+
+    table = get_arm_table(db, project_id)
+    if table is None:
+        raise HTTPException(404, "Project not found")
+
+    return TimeSeriesResponse(**conversion_timeseries(db, table, points, since, until))
 
-    return Response(content=buf.read(), media_type="image/png")
+
+# ======================================================
+#  EXPERIMENT EXPORT
+# ======================================================
+async def _close_on_disconnect(chunks):
+    # Starlette does not close a sync body iterator when the client goes away;
+    # closing it here releases the export's session and server-side cursor
+    try:
+        while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        await run_in_threadpool(chunks.close)
+
+
+@router.get("/experiments/export", responses={200: {"content": {f[0]: {} for f in EXPORT_FORMATS.values()}}})
+def export_experiments(
+    format: Literal["parquet", "arrow", "csv"] = Query("parquet"),
+    compression: str | None = Query(None, description="parquet: zstd|snappy|gzip|none, arrow: zstd|lz4|none, csv: none|gzip"),
+    project_id: int | None = Query(None),
+    since: datetime | None = Query(None, description="Experiments started at or after (UTC)"),
+    until: datetime | None = Query(None, description="Experiments started before (UTC)"),
+    batch_rows: int = Query(EXPORT_BATCH_ROWS, ge=1000, le=1_000_000),
+    db: Session = Depends(get_db),
+):
+
+    try:
+        options = ExportOptions(format, compression, project_id, since, until, batch_rows).validated()
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if project_id is not None and db.execute(
+        select(Project.project_id).where(Project.project_id == project_id)
+    ).first() is None:
+        raise HTTPException(404, "Project not found")
+
+    # The stream has its own session: the request's one is closed before the body is sent
+    return StreamingResponse(
+        _close_on_disconnect(stream_experiments(SessionLocal, options)),
+        media_type=options.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{options.filename}"'},
+    )
 
 
 # ======================================================
 #  UPDATE REWARD
 # ======================================================
+def _reward_response(bandit_id: int, row) -> dict:
+    if row is None:
+        raise HTTPException(404, "Bandit not found")
+    record_rewards("single")
+    return {
+        "message": "Reward updated",
+        "bandit_id": bandit_id,
+        "new_mean": row.mean,
+    }
+
+
+def _reward_accepted(bandit_id: int, project_id: int | None) -> dict:
+    if project_id is None:
+        raise HTTPException(404, "Bandit not found")
+    return {
+        "message": "Reward accepted",
+        "bandit_id": bandit_id,
+        "new_mean": None,
+    }
+
+
 @router.post("/bandits/{bandit_id}/thompson/reward")
 def submit_reward(
     bandit_id: int,
@@ -239,37 +707,196 @@ def submit_reward(
     db: Session = Depends(get_db),
 ):
 
-    bandit = db.query(Bandit).filter_by(bandit_id=bandit_id).first()
-    if not bandit:
-        raise HTTPException(404, "Bandit not found")
+    if reward_buffer is not None:
+        response = _reward_accepted(bandit_id, get_bandit_project(db, bandit_id))
+        try:
+            reward_buffer.submit(bandit_id, req.reward, req.decision)
+        except RewardBufferFull:
+            raise HTTPException(503, "Reward buffer is full", headers={"Retry-After": "1"})
+        record_rewards("buffered")
+        return response
 
-    experiment = Experiment(
-        project_id=bandit.project_id,
-        bandit_id=bandit_id,
-        reward=req.reward,
-        decision=req.decision,
+    return _reward_response(bandit_id, apply_reward(db, bandit_id, req.reward, req.decision))
+
+
+@async_router.post("/bandits/{bandit_id}/thompson/reward")
+async def submit_reward_async(
+    bandit_id: int,
+    req: SubmitRewardRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+
+    if reward_buffer is not None:
+        response = _reward_accepted(bandit_id, await get_bandit_project_async(db, bandit_id))
+        # May journal with fsync
+        try:
+            await run_in_threadpool(reward_buffer.submit, bandit_id, req.reward, req.decision)
+        except RewardBufferFull:
+            raise HTTPException(503, "Reward buffer is full", headers={"Retry-After": "1"})
+        record_rewards("buffered")
+        return response
+
+    return _reward_response(bandit_id, await apply_reward_async(db, bandit_id, req.reward, req.decision))
+
+
+# ======================================================
+#  BULK REWARD INGESTION
+# ======================================================
+def _ingest_rewards(db: Session, body: bytes, ndjson: bool) -> BulkRewardResponse:
+    start = time.perf_counter()
+    try:
+        bandit_ids, rewards, decisions = parse_reward_events(body, ndjson)
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid reward batch: {e}")
+    if len(bandit_ids) > REWARD_BULK_MAX_EVENTS:
+        raise HTTPException(413, f"Batch exceeds {REWARD_BULK_MAX_EVENTS} events")
+
+    result = apply_reward_batch(db, bandit_ids, rewards, decisions)
+    record_rewards("bulk", result["applied"])
+
+    elapsed = time.perf_counter() - start
+    return BulkRewardResponse(
+        received=len(bandit_ids),
+        elapsed_ms=round(elapsed * 1000, 3),
+        events_per_second=round(len(bandit_ids) / elapsed, 1) if elapsed > 0 else 0.0,
+        **result,
     )
-    db.add(experiment)
 
-    bandit.reward += req.reward
-    bandit.trial += 1
-    bandit.mean = bandit.reward / bandit.trial
-    bandit.variance = max(1.0 / bandit.trial, 0.0001)
 
-    db.commit()
+@router.post(
+    "/thompson/rewards/bulk",
+    response_model=BulkRewardResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def submit_rewards_bulk(request: Request, db: Session = Depends(get_db)):
+    """
+    Ingest a batch of reward events given as a JSON array or as NDJSON
+    (``Content-Type: application/x-ndjson``), one
+    ``{"bandit_id": ..., "reward": ..., "decision": ...}`` object per event.
+    """
+    body = await request.body()
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    return await run_in_threadpool(_ingest_rewards, db, body, ndjson)
 
-    return {
-        "message": "Reward updated",
-        "bandit_id": bandit_id,
-        "new_mean": bandit.mean,
-    }
+
+# ======================================================
+#  THOMPSON SIMULATION
+# ======================================================
+@router.post("/projects/{project_id}/thompson/simulate", response_model=SimulationResponse)
+def simulate_project(project_id: int, req: RunSimulationRequest, db: Session = Depends(get_db)):
+
+    try:
+        result = run_simulation(db, project_id, req)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except (RenderPoolBusy, BrokenProcessPool):
+        raise HTTPException(503, "Simulation workers are busy", headers={"Retry-After": "1"})
+    except TimeoutError:
+        raise HTTPException(504, "Simulation timed out")
+    if result is None:
+        raise HTTPException(404, f"Project {project_id} not found")
+
+    if not req.dry_run:
+        record_rewards("simulated", req.n_trials)
+    return SimulationResponse(**result)
+
+
+# ======================================================
+#  HEALTH
+# ======================================================
+@router.get("/health/db-pool", response_model=DbPoolStatusResponse)
+async def db_pool_status():
+    # Not in the threadpool, so it still answers when all threads wait for connections
+    return DbPoolStatusResponse(
+        pid=os.getpid(),
+        pre_ping=DB_POOL_PRE_PING,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        **get_pool_status(),
+    )
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(404, "Metrics are disabled")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+# ======================================================
+#  PROFILES
+# ======================================================
+def _require_profile_token(request: Request):
+    token = request.headers.get("x-profile") or request.query_params.get("profile")
+    if not token_matches(token):
+        # Same answer as an unknown route, whether profiling is off or the token is wrong
+        raise HTTPException(404, "Not Found")
+
+
+@router.get(PROFILES_ROUTE, include_in_schema=False, dependencies=[Depends(_require_profile_token)])
+async def get_profiles():
+    return list_profiles()
+
+
+@router.get(PROFILES_ROUTE + "/{profile_id}", include_in_schema=False, dependencies=[Depends(_require_profile_token)])
+async def get_profile(profile_id: str):
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(path, filename=os.path.basename(path))
 
 
 # ======================================================
 #  FASTAPI APP
 # ======================================================
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    optimal_price_tracker.session_factory = SessionLocal
+    optimal_price_tracker.start()
+    render_pool.start()
+    if reward_buffer is not None:
+        reward_buffer.start()
+    yield
+    if reward_buffer is not None:
+        reward_buffer.stop()
+    optimal_price_tracker.stop()
+    render_pool.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    for instrumented in (engine, async_engine.sync_engine if async_engine is not None else None):
+        if instrumented is not None:
+            instrument_engine(instrumented)
+    register_pool_collector(get_pool_status)
+
+if PROFILING_ENABLED:
+    # Added last, so it is outermost and also profiles the metrics middleware
+    app.add_middleware(ProfilingMiddleware)
 
 app.mount("/images", StaticFiles(directory="images"), name="images")
 
+if DB_ASYNC:
+    # Async variants replace the sync routes with the same path and method
+    replaced = {(route.path, method) for route in async_router.routes for method in route.methods}
+    router.routes = [
+        route for route in router.routes
+        if not any((route.path, method) in replaced for method in route.methods)
+    ]
+    app.include_router(async_router)
+
 app.include_router(router)
\ No newline at end of file
@@ -1,6 +1,10 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, model_validator
 from decimal import Decimal
-from typing import Optional
+from typing import Annotated, Literal, Optional
+import os
+
+# Most Thompson draws (projects x selections) one multi-project batch select may ask for
+BATCH_SELECT_MAX_DRAWS = int(os.getenv("BATCH_SELECT_MAX_DRAWS", "100000"))
 
 
 # =========================
@@ -18,9 +22,11 @@ class CreateProjectRequest(BaseModel):
     Attributes:
         description (str): Textual description of the project.
         number_bandits (int): Number of price options (bandits) to create. Must be >= 1.
+        price (Decimal): Price of the first bandit, created together with the project.
     """
     description: str
     number_bandits: int = Field(..., ge=1, description="Number of price options to be created")
+    price: Decimal = Field(..., description="Price of the first bandit")
 
 
 class UpdateProjectRequestModel(BaseModel):
@@ -73,17 +79,95 @@ class SubmitRewardRequest(BaseModel):
 
     Attributes:
         reward (float): Numeric reward value (e.g., 1 = purchase, 0 = no purchase).
+            Finite and at most 1,000,000 in magnitude, like a bulk event.
         decision (Optional[str]): Optional text describing the source or context of the event.
     """
-    reward: float
+    # Same bound as services.rewards.REWARD_MAX_ABS, so journaled rewards replay through the bulk parser
+    reward: float = Field(..., ge=-1_000_000, le=1_000_000, allow_inf_nan=False)
     decision: Optional[str] = None
 
 
+class DemandCurve(BaseModel):
+    """
+    Probability that a simulated customer buys at a given price.
+
+    Kinds:
+        logistic: ``max_probability / (1 + exp(steepness * (price - reference_price)))``.
+        exponential: ``max_probability * exp(-steepness * price)``.
+        linear: ``max_probability * (1 - price / choke_price)``, clipped at 0.
+        points: piecewise-linear through (``prices[i]``, ``probabilities[i]``).
+
+    Attributes:
+        kind (str): Shape of the curve.
+        max_probability (float): Buy probability at a price of zero.
+        steepness (float): How quickly demand falls with the price (logistic, exponential).
+        reference_price (float | None): Price where logistic demand is half of
+            ``max_probability``; defaults to the mean arm price.
+        choke_price (float | None): Price where linear demand reaches zero;
+            defaults to twice the highest arm price.
+        prices (list[float] | None): Support points of a ``points`` curve, ascending.
+        probabilities (list[float] | None): Buy probability at each support point.
+    """
+    kind: Literal["logistic", "exponential", "linear", "points"] = "logistic"
+    max_probability: float = Field(0.5, ge=0, le=1)
+    steepness: float = Field(0.2, ge=0)
+    reference_price: Optional[float] = None
+    choke_price: Optional[float] = Field(None, gt=0)
+    prices: Optional[list[float]] = None
+    probabilities: Optional[list[Annotated[float, Field(ge=0, le=1)]]] = None
+
+    @model_validator(mode="after")
+    def _check_points(self):
+        if self.kind == "points":
+            if not self.prices or not self.probabilities or len(self.prices) != len(self.probabilities):
+                raise ValueError("a points curve needs prices and probabilities of the same length")
+            if any(a >= b for a, b in zip(self.prices, self.prices[1:])):
+                raise ValueError("points prices must be strictly ascending")
+        return self
+
+
 class RunSimulationRequest(BaseModel):
     """
     Request model for running multiple simulated Thompson Sampling trials.
 
+    Each trial selects an arm by Thompson Sampling and a simulated customer
+    buys with the probability given by ``demand`` at that arm's price; a buy
+    earns the price, otherwise the reward is 0.
+
     Attributes:
         n_trials (int): Number of simulation trials to execute. Must be >= 1.
+        demand (DemandCurve): Buy probability as a function of the price.
+        batch_size (int): Trials drawn from the same posterior before it is
+            updated; 1 updates after every trial.
+        dry_run (bool): Only return the outcome; nothing is written.
+        record_experiments (bool): Also log one experiment row per trial.
+        seed (int | None): Seed of the random generator, for reproducible runs.
     """
     n_trials: int = Field(..., ge=1, description="Number of simulation trials to run")
+    demand: DemandCurve = Field(default_factory=DemandCurve)
+    batch_size: int = Field(100, ge=1, le=100_000, description="Trials per posterior update")
+    dry_run: bool = Field(False, description="Return the outcome without writing it")
+    record_experiments: bool = Field(False, description="Log one experiment row per simulated trial")
+    seed: Optional[int] = None
+
+
+class BatchSelectRequest(BaseModel):
+    """
+    Request model for running Thompson Sampling for several projects at once.
+
+    The request is all-or-nothing: if any project does not exist or has no
+    bandits, nothing is selected and the error lists every such project.
+
+    Attributes:
+        project_ids (list[int]): Projects to select prices for.
+        n (int): Number of independent selections (impressions) per project.
+            ``len(project_ids) * n`` is limited to ``BATCH_SELECT_MAX_DRAWS``.
+    """
+    project_ids: list[int] = Field(..., min_length=1, max_length=1000, description="Projects to select prices for")
+    n: int = Field(1, ge=1, le=10000, description="Number of selections per project")
+
+    @model_validator(mode="after")
+    def _check_total(self):
+        if len(self.project_ids) * self.n > BATCH_SELECT_MAX_DRAWS:
+            raise ValueError(f"len(project_ids) * n must not exceed {BATCH_SELECT_MAX_DRAWS}")
+        return self
@@ -139,3 +139,243 @@ class ThompsonSelectResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OfferResponse(BaseModel):
+    """
+    Everything the storefront needs to show one offer.
+
+    Attributes:
+        project_id (int): Project the offer belongs to.
+        bandit_id (int): Bandit selected by Thompson Sampling.
+        price (Decimal): Price of the selected bandit.
+        description (str): Product description.
+        image_path (str | None): Product image path, relative to the backend URL.
+    """
+    project_id: int
+    bandit_id: int
+    price: Decimal
+    description: str
+    image_path: str | None = None
+
+
+class ThompsonBatchSelectResponse(BaseModel):
+    """
+    Response returned after performing several Thompson Sampling selections for one project.
+
+    Assignments are returned column-wise: the i-th impression is served
+    ``prices[i]`` from bandit ``bandit_ids[i]``.
+
+    Attributes:
+        project_id (int): ID of the project the selections were made for.
+        bandit_ids (list[int]): Selected bandit for each impression.
+        prices (list[float]): Price of the selected bandit for each impression.
+    """
+    project_id: int
+    bandit_ids: list[int]
+    prices: list[float]
+
+
+class BulkRewardResponse(BaseModel):
+    """
+    Response returned after ingesting a batch of reward events.
+
+    Attributes:
+        received (int): Number of events in the batch.
+        applied (int): Events recorded as experiments and applied to their bandit.
+        rejected (int): Events skipped because their bandit does not exist.
+        unknown_bandit_ids (list[int]): Distinct bandit ids that were not found.
+        bandits_updated (int): Number of bandits whose posterior was updated.
+        elapsed_ms (float): Server-side processing time of the batch.
+        events_per_second (float): Ingestion throughput of the batch.
+    """
+    received: int
+    applied: int
+    rejected: int
+    unknown_bandit_ids: list[int]
+    bandits_updated: int
+    elapsed_ms: float
+    events_per_second: float
+
+
+class SimulatedArm(BaseModel):
+    """
+    Outcome of a simulation for one bandit.
+
+    Attributes:
+        bandit_id (int): ID of the bandit.
+        price (Decimal): Price of the bandit.
+        buy_probability (float): Buy probability of the demand curve at this price.
+        trials (int): Simulated trials that selected this bandit.
+        buys (int): Simulated trials that ended in a buy.
+        reward (Decimal): Reward earned by those trials (``price * buys``).
+        mean (float): Posterior mean after the simulation.
+        variance (float): Posterior variance after the simulation.
+    """
+    bandit_id: int
+    price: Decimal
+    buy_probability: float
+    trials: int
+    buys: int
+    reward: Decimal
+    mean: float
+    variance: float
+
+
+class SimulationResponse(BaseModel):
+    """
+    Response returned after a Thompson Sampling simulation.
+
+    Attributes:
+        project_id (int): Simulated project.
+        n_trials (int): Number of simulated trials.
+        batch_size (int): Trials per posterior update.
+        dry_run (bool): True if nothing was written.
+        experiments_recorded (int): Experiment rows written.
+        total_reward (Decimal): Reward earned over all trials.
+        best_price (Decimal): Price with the highest expected reward under the demand curve.
+        regret (float): Expected reward lost against always offering ``best_price``.
+        checkpoints (list[int]): Trial counts at which ``cumulative_regret`` was taken.
+        cumulative_regret (list[float]): Expected regret after each checkpoint.
+        arms (list[SimulatedArm]): Outcome per bandit.
+        elapsed_ms (float): Server-side time of the simulation and write.
+    """
+    project_id: int
+    n_trials: int
+    batch_size: int
+    dry_run: bool
+    experiments_recorded: int
+    total_reward: Decimal
+    best_price: Decimal
+    regret: float
+    checkpoints: list[int]
+    cumulative_regret: list[float]
+    arms: list[SimulatedArm]
+    elapsed_ms: float
+
+
+class PosteriorGridResponse(BaseModel):
+    """
+    Posterior density curves of all bandits of a project, column-wise.
+
+    Row ``i`` of ``x`` and ``density`` belongs to ``bandit_ids[i]``; every row
+    has ``points`` values spanning the bandit's mean ± 4 standard deviations.
+
+    Attributes:
+        project_id (int): ID of the project.
+        points (int): Number of grid points per bandit.
+        bandit_ids (list[int]): Bandit of each row.
+        prices (list[float]): Price of each bandit.
+        means (list[float]): Posterior mean of each bandit.
+        stds (list[float]): Posterior standard deviation of each bandit.
+        x (list[list[float]]): Grid of expected-reward values, one row per bandit.
+        density (list[list[float]]): Normal density at ``x``, one row per bandit.
+    """
+    project_id: int
+    points: int
+    bandit_ids: list[int]
+    prices: list[float]
+    means: list[float]
+    stds: list[float]
+    x: list[list[float]]
+    density: list[list[float]]
+
+
+class TimeSeriesResponse(BaseModel):
+    """
+    Conversion and revenue over time of all bandits of a project, column-wise.
+
+    Row ``i`` of every series belongs to ``bandit_ids[i]`` and holds at most
+    ``points`` buckets, chosen by LTTB from equal-width buckets of
+    ``bucket_seconds``. Bandits without experiments in the range have empty rows.
+
+    Attributes:
+        project_id (int): ID of the project.
+        points (int): Maximum number of buckets per bandit.
+        start (datetime | None): Start of the range (first experiment by default).
+        end (datetime | None): End of the range (last experiment by default).
+        bucket_seconds (float | None): Width of a bucket.
+        bandit_ids (list[int]): Bandit of each row.
+        prices (list[float]): Price of each bandit.
+        t (list[list[int]]): Bucket start, in epoch milliseconds (UTC).
+        impressions (list[list[int]]): Experiments in the bucket.
+        conversions (list[list[int]]): Experiments with a positive reward in the bucket.
+        revenue (list[list[float]]): Reward sum of the bucket.
+        conversion_rate (list[list[float]]): ``conversions / impressions`` of the bucket.
+        total_impressions (list[int]): Experiments of each bandit over the whole range.
+        total_conversions (list[int]): Conversions of each bandit over the whole range.
+        total_revenue (list[float]): Reward sum of each bandit over the whole range.
+    """
+    project_id: int
+    points: int
+    start: datetime | None = None
+    end: datetime | None = None
+    bucket_seconds: float | None = None
+    bandit_ids: list[int]
+    prices: list[float]
+    t: list[list[int]]
+    impressions: list[list[int]]
+    conversions: list[list[int]]
+    revenue: list[list[float]]
+    conversion_rate: list[list[float]]
+    total_impressions: list[int]
+    total_conversions: list[int]
+    total_revenue: list[float]
+
+
+# =========================
+# HEALTH RESPONSE MODELS
+# =========================
+
+class PoolStatus(BaseModel):
+    """
+    Live state of one SQLAlchemy connection pool in this worker process.
+
+    Attributes:
+        size (int): Configured number of persistent connections.
+        max_overflow (int): Extra connections allowed under load.
+        checked_out (int): Connections currently in use.
+        checked_in (int): Idle connections in the pool.
+        overflow (int): Overflow connections currently open.
+        checkouts_total (int): Successful checkouts since start.
+        timeouts_total (int): Checkouts that gave up after the pool timeout.
+        connects_total (int): New DB connections opened.
+        invalidations_total (int): Connections discarded as broken.
+        pings_total (int): Liveness pings of the ``idle`` pre-ping strategy.
+        wait_seconds_total (float): Total time spent waiting for a connection.
+        wait_max_ms (float): Longest single wait.
+        recent_wait_p50_ms (float): Median wait over recent checkouts.
+        recent_wait_p99_ms (float): 99th percentile wait over recent checkouts.
+    """
+    size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts_total: int
+    timeouts_total: int
+    connects_total: int
+    invalidations_total: int
+    pings_total: int
+    wait_seconds_total: float
+    wait_max_ms: float
+    recent_wait_p50_ms: float
+    recent_wait_p99_ms: float
+
+
+class DbPoolStatusResponse(BaseModel):
+    """
+    Connection pool status of the worker process that served the request.
+
+    Attributes:
+        pid (int): Worker process id; each uvicorn worker has its own pools.
+        pre_ping (str): Pre-ping strategy (``always``, ``idle`` or ``never``).
+        statement_timeout_ms (int): Server-side statement timeout, 0 if none.
+        sync_pool (PoolStatus): Pool of the psycopg2 engine.
+        async_pool (PoolStatus | None): Pool of the asyncpg engine in ``DB_ASYNC`` mode.
+    """
+    pid: int
+    pre_ping: str
+    statement_timeout_ms: int
+    sync_pool: PoolStatus
+    async_pool: PoolStatus | None = None
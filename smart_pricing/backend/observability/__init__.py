@@ -0,0 +1,16 @@
+from .metrics import (
+    METRICS_ENABLED,
+    record_rewards,
+    record_selections,
+    register_pool_collector,
+    render_metrics,
+)
+from .middleware import MetricsMiddleware, instrument_engine
+from .profiling import (
+    PROFILES_ROUTE,
+    PROFILING_ENABLED,
+    ProfilingMiddleware,
+    list_profiles,
+    profile_path,
+    token_matches,
+)
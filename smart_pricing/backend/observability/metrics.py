@@ -0,0 +1,160 @@
+"""
+Prometheus metrics of the backend.
+
+Metrics live in prometheus_client's default registry. With several uvicorn
+workers set ``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable directory, so
+that ``/metrics`` aggregates all workers instead of reporting whichever
+worker answered the scrape.
+
+Labels are bounded: routes are reported by their template
+(``/projects/{project_id}/bandits``), never by the raw path, and
+selections are counted in total. Per-arm selection counts grow with the
+number of bandits, so they are only exported with ``METRICS_PER_BANDIT``.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_PER_BANDIT = os.getenv("METRICS_PER_BANDIT", "false").lower() in ("1", "true", "yes")
+
+# Milliseconds to seconds; select is sub-millisecond, plots take seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status code.",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the last body chunk is sent.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served.",
+    multiprocess_mode="livesum",
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Duration of single SQL statements, by the route that issued them.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements executed while serving one request.",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total SQL time spent while serving one request.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+BANDIT_SELECTIONS = Counter(
+    "bandit_selections_total",
+    "Arms chosen by Thompson sampling (select, offer, batch).",
+)
+# One series per bandit: opt-in only
+BANDIT_SELECTIONS_BY_ARM = Counter(
+    "bandit_selections_by_arm_total",
+    "Times each bandit was chosen by Thompson sampling (select, offer, batch).",
+    ["project_id", "bandit_id"],
+) if METRICS_PER_BANDIT else None
+REWARDS_INGESTED = Counter(
+    "rewards_ingested_total",
+    "Reward events accepted, by ingestion path (single, buffered, bulk, simulated).",
+    ["path"],
+)
+
+
+def record_selections(project_id: int, bandit_ids, counts=None) -> None:
+    """Count selections of ``bandit_ids`` (once each, or ``counts[i]`` times)."""
+    if not METRICS_ENABLED:
+        return
+    if counts is None:
+        counts = [1] * len(bandit_ids)
+    BANDIT_SELECTIONS.inc(int(sum(counts)))
+    if BANDIT_SELECTIONS_BY_ARM is not None:
+        project = str(project_id)
+        for bandit_id, n in zip(bandit_ids, counts):
+            if n:
+                BANDIT_SELECTIONS_BY_ARM.labels(project, str(bandit_id)).inc(int(n))
+
+
+def record_rewards(path: str, n: int = 1) -> None:
+    if METRICS_ENABLED and n:
+        REWARDS_INGESTED.labels(path).inc(n)
+
+
+# Collectors reporting per-process state, added to every multiprocess scrape
+_process_collectors = []
+
+
+class PoolCollector:
+    """Exports connection pool statistics (see ``database.get_pool_status``) at scrape time."""
+
+    def __init__(self, get_status):
+        self.get_status = get_status
+
+    def collect(self):
+        pid = str(os.getpid())
+        gauges = {
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections in use.", labels=["pool", "pid"]),
+            "checked_in": GaugeMetricFamily("db_pool_checked_in", "Idle pooled connections.", labels=["pool", "pid"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Overflow connections open.", labels=["pool", "pid"]),
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool size.", labels=["pool", "pid"]),
+        }
+        counters = {
+            "checkouts_total": CounterMetricFamily(
+                "db_pool_checkouts", "Successful connection checkouts.", labels=["pool", "pid"]),
+            "timeouts_total": CounterMetricFamily(
+                "db_pool_timeouts", "Checkouts that hit the pool timeout.", labels=["pool", "pid"]),
+            "wait_seconds_total": CounterMetricFamily(
+                "db_pool_wait_seconds", "Time spent waiting for connections.", labels=["pool", "pid"]),
+        }
+        for pool, status in self.get_status().items():
+            name = pool.removesuffix("_pool")
+            for key, family in (*gauges.items(), *counters.items()):
+                family.add_metric([name, pid], status[key])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Serialize all metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Pool gauges are per process; report this worker's pools alongside
+        for collector in _process_collectors:
+            registry.register(collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def register_pool_collector(get_status) -> None:
+    collector = PoolCollector(get_status)
+    _process_collectors.append(collector)
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        REGISTRY.register(collector)
@@ -0,0 +1,142 @@
+"""
+Request and database instrumentation.
+
+``MetricsMiddleware`` is plain ASGI (no ``BaseHTTPMiddleware``), so it adds
+no extra task or body buffering per request. It places a ``RequestDbStats``
+in a context variable for the duration of the request. The SQLAlchemy cursor
+events installed by ``instrument_engine`` add to it from any thread serving
+that request (Starlette copies the context into its threadpool). Per-query
+durations are labelled with the route once routing has happened, at the end
+of the request.
+"""
+
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from .metrics import (
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_LATENCY,
+    DB_TIME_PER_REQUEST,
+    HTTP_IN_PROGRESS,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+)
+
+# Queries issued outside a request (background threads) are labelled like this
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestDbStats:
+    """SQL statements executed on behalf of one request."""
+
+    __slots__ = ("durations",)
+
+    def __init__(self):
+        self.durations: list[float] = []
+
+
+_request_db: ContextVar[RequestDbStats | None] = ContextVar("request_db", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Time every cursor execution of a (sync) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        stats = _request_db.get()
+        if stats is not None:
+            stats.durations.append(elapsed)
+        else:
+            DB_QUERY_LATENCY.labels(BACKGROUND_ROUTE).observe(elapsed)
+
+
+# id(router) -> {id(endpoint or mounted app): route path}
+_endpoint_paths: dict[int, dict[int, str]] = {}
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Plain Starlette routes (/docs) and mounts (/images) only leave their endpoint
+    endpoint, router = scope.get("endpoint"), scope.get("router")
+    if endpoint is None or router is None:
+        return UNMATCHED_ROUTE
+    paths = _endpoint_paths.get(id(router))
+    if paths is None:
+        paths = {
+            id(getattr(r, "endpoint", None) or getattr(r, "app", None)): r.path
+            for r in router.routes
+            if hasattr(r, "path")
+        }
+        _endpoint_paths[id(router)] = paths
+    return paths.get(id(endpoint), UNMATCHED_ROUTE)
+
+
+class _RouteSeries:
+    """Labelled metric children of one (method, route, status), resolved once."""
+
+    __slots__ = ("requests", "latency", "queries_per_request", "query_latency", "db_time")
+
+    def __init__(self, method: str, route: str, status: int):
+        labels = (method, route, str(status))
+        self.requests = HTTP_REQUESTS.labels(*labels)
+        self.latency = HTTP_LATENCY.labels(*labels)
+        self.queries_per_request = DB_QUERIES_PER_REQUEST.labels(route)
+        self.query_latency = DB_QUERY_LATENCY.labels(route)
+        self.db_time = DB_TIME_PER_REQUEST.labels(route)
+
+
+# Bounded by routes x methods x status codes
+_series: dict[tuple[str, str, int], _RouteSeries] = {}
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db_stats = RequestDbStats()
+        token = _request_db.set(db_stats)
+        HTTP_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec()
+            _request_db.reset(token)
+
+            route = _route_label(scope)
+            series = _series.get((scope["method"], route, status))
+            if series is None:
+                series = _series[(scope["method"], route, status)] = _RouteSeries(scope["method"], route, status)
+            series.requests.inc()
+            series.latency.observe(elapsed)
+
+            durations = db_stats.durations
+            series.queries_per_request.observe(len(durations))
+            if durations:
+                for d in durations:
+                    series.query_latency.observe(d)
+                series.db_time.observe(sum(durations))
@@ -0,0 +1,221 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries the profiling token, either as an
+``X-Profile`` header or as a ``profile=`` query parameter, or when it is
+picked by ``PROFILE_SAMPLE_RATE``. The profile is written to ``PROFILE_DIR``
+under the request id (``X-Request-ID`` if the client sent one). Token-
+triggered responses carry ``X-Profile-Id``; the file can then be fetched
+from ``GET /debug/profiles/{profile_id}`` with the same token.
+
+Modes (``X-Profile-Mode`` header, default ``PROFILE_MODE``):
+
+- ``sampling``: wall-clock stack samples every ``PROFILE_INTERVAL_MS`` of
+  the event loop thread and of every busy worker thread while the request
+  runs, written as collapsed stacks (``*.collapsed``, one
+  ``thread;frame;frame count`` line per stack, as read by flamegraph.pl or
+  speedscope). Covers sync routes running in the threadpool. Under
+  concurrency, other requests running at the same time show up too.
+- ``cprofile``: deterministic ``cProfile`` of the event loop thread
+  (``*.pstats``, open with ``pstats`` or snakeviz). It sees async routes
+  (and ``DB_ASYNC`` mode), not the threadpool. Only one request per
+  process is profiled this way at a time; a request that asks while another
+  is profiled gets a sampling profile instead. Requests that run on the loop
+  at the same time still show up in the profile.
+
+Profiles are written and pruned in the threadpool, not on the event loop.
+
+Without ``PROFILE_TOKEN`` and with ``PROFILE_SAMPLE_RATE=0`` (the defaults)
+the middleware is not installed at all.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sampling")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+PROFILING_ENABLED = PROFILE_TOKEN is not None or PROFILE_SAMPLE_RATE > 0
+
+PROFILE_MODES = {"sampling": "collapsed", "cprofile": "pstats"}
+if PROFILE_MODE not in PROFILE_MODES:
+    raise ValueError(f"PROFILE_MODE must be one of {sorted(PROFILE_MODES)}, got {PROFILE_MODE!r}")
+
+# Downloading profiles is not profiled
+PROFILES_ROUTE = "/debug/profiles"
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Held while a cProfile capture runs: the loop thread can only be profiled once
+_cprofile_active = threading.Lock()
+
+# Innermost frames of a thread that is waiting rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("connection.py", "wait"),
+}
+
+
+def token_matches(value: str | None) -> bool:
+    return PROFILE_TOKEN is not None and value is not None and hmac.compare_digest(value, PROFILE_TOKEN)
+
+
+def profile_path(profile_id: str) -> str | None:
+    """Path of a stored profile, or None if the id is invalid or unknown."""
+    if not _REQUEST_ID.match(profile_id):
+        return None
+    for ext in PROFILE_MODES.values():
+        path = os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for entry in os.scandir(PROFILE_DIR):
+        profile_id, _, ext = entry.name.rpartition(".")
+        if ext in PROFILE_MODES.values():
+            stat = entry.stat()
+            entries.append({"profile_id": profile_id, "format": ext, "bytes": stat.st_size, "mtime": stat.st_mtime})
+    return sorted(entries, key=lambda e: e["mtime"], reverse=True)
+
+
+def _prune(keep: int):
+    for old in list_profiles()[keep:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, f"{old['profile_id']}.{old['format']}"))
+        except OSError:
+            pass
+
+
+class StackSampler:
+    """Samples the stacks of busy threads from a background thread."""
+
+    def __init__(self, interval_s: float, include_idle_idents: set[int] = frozenset()):
+        self.interval_s = interval_s
+        self.include_idle = include_idle_idents
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES and ident not in self.include_idle:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(PROFILES_ROUTE):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        token = headers.get(b"x-profile")
+        if token is None and b"profile=" in scope["query_string"]:
+            token = parse_qs(scope["query_string"].decode()).get("profile", [None])[0]
+        else:
+            token = token.decode() if token is not None else None
+        requested = token_matches(token)
+        if not requested and not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+            await self.app(scope, receive, send)
+            return
+
+        mode = headers.get(b"x-profile-mode", b"").decode() if requested else ""
+        mode = mode if mode in PROFILE_MODES else PROFILE_MODE
+        request_id = headers.get(b"x-request-id", b"").decode()
+        if not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if requested and message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", request_id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        if mode == "cprofile" and _cprofile_active.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    profiler.disable()
+            finally:
+                _cprofile_active.release()
+                await self._store(request_id, "cprofile", lambda path: profiler.dump_stats(path))
+        else:
+            # The loop thread is "idle" in select while awaiting I/O; keep those samples
+            sampler = StackSampler(PROFILE_INTERVAL_MS / 1000, {threading.get_ident()})
+            sampler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                sampler.stop()
+                elapsed = time.perf_counter() - start
+                route = getattr(scope.get("route"), "path", scope["path"])
+                header = f"# {scope['method']} {route} {elapsed * 1000:.1f} ms\n"
+                await self._store(request_id, "sampling", lambda path: _write_text(path, header + sampler.collapsed()))
+
+    @staticmethod
+    async def _store(request_id: str, mode: str, write):
+        await run_in_threadpool(_store_profile, os.path.join(PROFILE_DIR, f"{request_id}.{PROFILE_MODES[mode]}"), write)
+
+
+def _store_profile(path: str, write):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    write(path)
+    _prune(PROFILE_MAX_FILES)
+
+
+def _write_text(path: str, text: str):
+    with open(path, "w") as f:
+        f.write(text)
@@ -0,0 +1,29 @@
+from .arm_cache import (
+    ArmTable,
+    ArmCache,
+    arm_cache,
+    load_arm_table,
+    load_arm_table_async,
+    get_arm_table,
+    get_arm_table_async,
+    get_bandit_project,
+    get_bandit_project_async,
+)
+from .sampling import get_rng, sample_arms
+from .rewards import (
+    bandit_update_statement,
+    apply_reward,
+    apply_reward_async,
+    apply_reward_batch,
+    parse_reward_events,
+    to_decimal,
+)
+from .reward_buffer import RewardBuffer, RewardBufferFull, create_reward_buffer
+from .optimal_price import OptimalPriceTracker, optimal_price_tracker, recompute_optimal_prices
+from .plotting import PlotOptions, PlotCache, plot_cache, plot_digest, render_posterior_plot
+from .render_pool import RenderPool, RenderPoolBusy, render_pool
+from .posterior import posterior_grid, encode_posterior_f32
+from .simulation import SimulationRun, buy_probabilities, run_simulation, simulate_thompson
+from .timeseries import conversion_timeseries, lttb_indices, to_naive_utc
+from .export import ExportOptions, experiment_batches, stream_experiments
+from .pagination import decode_cursor, encode_cursor, fetch_page, fetch_page_async, parse_fields, project_rows
@@ -0,0 +1,326 @@
+"""
+In-process cache of per-project Thompson Sampling arm tables.
+
+Select reads posterior parameters straight from the NumPy arrays held here
+instead of querying ``projects`` and ``bandits`` on every call. Writers
+(reward submission, bandit creation) write through to the cached entry, so a
+warm entry never needs a DB round trip.
+
+Cached tables are immutable: a write-through publishes a new table with
+updated copies of the arrays, so a reader holding a table never sees a
+half-applied update. A load that read the database before a write-through
+of the same project is not cached (see ``ArmCache.begin_load``), so it
+cannot replace the newer parameters until the TTL expires.
+
+The cache is per process: with several uvicorn workers each worker keeps its
+own copy, and the TTL bounds how long one worker can serve parameters that
+were written by another.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import Project, Bandit
+
+ARM_CACHE_MAX_PROJECTS = int(os.getenv("ARM_CACHE_MAX_PROJECTS", "1024"))
+ARM_CACHE_TTL_SECONDS = float(os.getenv("ARM_CACHE_TTL_SECONDS", "30"))
+
+# Lower bound applied to every variance before sampling or plotting
+MIN_VARIANCE = 1e-4
+
+
+@dataclass
+class ArmTable:
+    """
+    Posterior parameters of all bandits of one project, stored column-wise.
+
+    Attributes:
+        project_id (int): Project the arms belong to.
+        bandit_ids (np.ndarray): Bandit ids, ordered by id.
+        prices (np.ndarray): Price of each arm.
+        means (np.ndarray): Posterior mean of each arm.
+        variances (np.ndarray): Posterior variance of each arm.
+        version (int): Incremented on every write to this table.
+        loaded_at (float): ``time.monotonic()`` of the last load from the DB.
+    """
+    project_id: int
+    bandit_ids: np.ndarray
+    prices: np.ndarray
+    means: np.ndarray
+    variances: np.ndarray
+    version: int = 0
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def __len__(self):
+        return len(self.bandit_ids)
+
+    @property
+    def stds(self) -> np.ndarray:
+        return np.sqrt(np.maximum(self.variances, MIN_VARIANCE))
+
+    def snapshot(self) -> "ArmTable":
+        """Writable copy of the table, for callers that update arms locally (e.g. simulation)."""
+        return ArmTable(
+            project_id=self.project_id,
+            bandit_ids=self.bandit_ids.copy(),
+            prices=self.prices.copy(),
+            means=self.means.copy(),
+            variances=self.variances.copy(),
+            version=self.version,
+            loaded_at=self.loaded_at,
+        )
+
+    def _freeze(self) -> "ArmTable":
+        for values in (self.bandit_ids, self.prices, self.means, self.variances):
+            values.flags.writeable = False
+        return self
+
+    def index_of(self, bandit_id: int) -> int | None:
+        idx = np.searchsorted(self.bandit_ids, bandit_id)
+        if idx < len(self.bandit_ids) and self.bandit_ids[idx] == bandit_id:
+            return int(idx)
+        return None
+
+
+class ArmCache:
+    """
+    Thread-safe LRU of ``ArmTable`` objects keyed by project id.
+
+    Entries older than ``ttl_seconds`` are treated as missing so they get
+    reloaded from the database; at most ``max_projects`` tables stay resident.
+    Tables handed out are read-only and are replaced, never modified.
+    """
+
+    def __init__(self, max_projects: int = ARM_CACHE_MAX_PROJECTS, ttl_seconds: float = ARM_CACHE_TTL_SECONDS):
+        self.max_projects = max_projects
+        self.ttl_seconds = ttl_seconds
+        self._tables: OrderedDict[int, ArmTable] = OrderedDict()
+        self._owners: dict[int, int] = {}
+        self._lock = threading.Lock()
+        # Write-throughs are numbered; loads in flight remember the last write to their project
+        self._writes = 0
+        self._loading: dict[int, int] = {}
+        self._written_at: dict[int, int] = {}
+
+    def get(self, project_id: int) -> ArmTable | None:
+        with self._lock:
+            table = self._tables.get(project_id)
+            if table is None:
+                return None
+            if time.monotonic() - table.loaded_at > self.ttl_seconds:
+                self._drop(project_id)
+                return None
+            self._tables.move_to_end(project_id)
+            return table
+
+    def put(self, table: ArmTable):
+        with self._lock:
+            self._put(table)
+
+    def begin_load(self, project_id: int) -> int:
+        """
+        Register a load of ``project_id`` from the database that is about to start.
+
+        Returns:
+            int: Token to pass to ``end_load`` once the load finished.
+        """
+        with self._lock:
+            self._loading[project_id] = self._loading.get(project_id, 0) + 1
+            return self._writes
+
+    def end_load(self, project_id: int, table: ArmTable | None, token: int) -> bool:
+        """
+        Cache a table loaded since ``begin_load`` unless a write-through to its project happened meanwhile.
+
+        Returns:
+            bool: Whether the table was cached.
+        """
+        with self._lock:
+            stale = self._written_at.get(project_id, 0) > token
+            if self._loading[project_id] == 1:
+                del self._loading[project_id]
+                self._written_at.pop(project_id, None)
+            else:
+                self._loading[project_id] -= 1
+            if table is None or stale:
+                return False
+            self._put(table)
+            return True
+
+    def project_of(self, bandit_id: int) -> int | None:
+        """Return the project of a bandit if its project is resident."""
+        return self._owners.get(bandit_id)
+
+    def update_arm(self, project_id: int, bandit_id: int, mean: float, variance: float):
+        """Write-through of new posterior parameters for one arm."""
+        with self._lock:
+            self._written(project_id)
+            table = self._tables.get(project_id)
+            if table is None:
+                return
+            idx = table.index_of(bandit_id)
+            if idx is None:
+                # Arm created by another worker: reload on next access
+                self._drop(project_id)
+                return
+            means, variances = table.means.copy(), table.variances.copy()
+            means[idx] = mean
+            variances[idx] = variance
+            self._tables[project_id] = ArmTable(
+                project_id=project_id,
+                bandit_ids=table.bandit_ids,
+                prices=table.prices,
+                means=means,
+                variances=variances,
+                version=table.version + 1,
+                loaded_at=table.loaded_at,
+            )._freeze()
+
+    def add_arm(self, project_id: int, bandit_id: int, price: float, mean: float, variance: float):
+        """Write-through of a newly created bandit."""
+        with self._lock:
+            self._written(project_id)
+            table = self._tables.get(project_id)
+            if table is None:
+                return
+            order = np.argsort(np.append(table.bandit_ids, bandit_id), kind="stable")
+            self._tables[project_id] = ArmTable(
+                project_id=project_id,
+                bandit_ids=np.append(table.bandit_ids, bandit_id)[order],
+                prices=np.append(table.prices, price)[order],
+                means=np.append(table.means, mean)[order],
+                variances=np.append(table.variances, variance)[order],
+                version=table.version + 1,
+                loaded_at=table.loaded_at,
+            )._freeze()
+            self._owners[bandit_id] = project_id
+
+    def invalidate(self, project_id: int):
+        with self._lock:
+            self._written(project_id)
+            self._drop(project_id)
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._owners.clear()
+            self._writes += 1
+            self._written_at.update(dict.fromkeys(self._loading, self._writes))
+
+    def _put(self, table: ArmTable):
+        self._tables[table.project_id] = table._freeze()
+        self._tables.move_to_end(table.project_id)
+        self._owners.update(dict.fromkeys(table.bandit_ids.tolist(), table.project_id))
+        while len(self._tables) > self.max_projects:
+            self._drop(next(iter(self._tables)))
+
+    def _written(self, project_id: int):
+        self._writes += 1
+        if project_id in self._loading:
+            self._written_at[project_id] = self._writes
+
+    def _drop(self, project_id: int):
+        table = self._tables.pop(project_id, None)
+        if table is not None:
+            for bandit_id in table.bandit_ids.tolist():
+                self._owners.pop(bandit_id, None)
+
+
+arm_cache = ArmCache()
+
+
+def _arm_rows_query(project_id: int):
+    return (
+        select(Bandit.bandit_id, Bandit.price, Bandit.mean, Bandit.variance)
+        .where(Bandit.project_id == project_id)
+        .order_by(Bandit.bandit_id)
+    )
+
+
+def _project_exists_query(project_id: int):
+    return select(Project.project_id).where(Project.project_id == project_id)
+
+
+def _arm_table_from_rows(project_id: int, rows) -> ArmTable:
+    return ArmTable(
+        project_id=project_id,
+        bandit_ids=np.array([r.bandit_id for r in rows], dtype=np.int64),
+        prices=np.array([float(r.price) for r in rows], dtype=np.float64),
+        means=np.array([float(r.mean) for r in rows], dtype=np.float64),
+        variances=np.array([float(r.variance) for r in rows], dtype=np.float64),
+    )
+
+
+def load_arm_table(db: Session, project_id: int) -> ArmTable | None:
+    """
+    Load the arm table of a project from the database.
+
+    Returns None when the project does not exist, and an empty table when it
+    exists but has no bandits yet.
+    """
+    rows = db.execute(_arm_rows_query(project_id)).all()
+    if not rows and db.execute(_project_exists_query(project_id)).first() is None:
+        return None
+    return _arm_table_from_rows(project_id, rows)
+
+
+async def load_arm_table_async(db: AsyncSession, project_id: int) -> ArmTable | None:
+    """Async counterpart of ``load_arm_table``."""
+    rows = (await db.execute(_arm_rows_query(project_id))).all()
+    if not rows and (await db.execute(_project_exists_query(project_id))).first() is None:
+        return None
+    return _arm_table_from_rows(project_id, rows)
+
+
+def _bandit_project_query(bandit_id: int):
+    return select(Bandit.project_id).where(Bandit.bandit_id == bandit_id)
+
+
+def get_bandit_project(db: Session, bandit_id: int) -> int | None:
+    """Return the project a bandit belongs to, or None if the bandit does not exist."""
+    project_id = arm_cache.project_of(bandit_id)
+    if project_id is None:
+        row = db.execute(_bandit_project_query(bandit_id)).first()
+        project_id = row.project_id if row else None
+    return project_id
+
+
+async def get_bandit_project_async(db: AsyncSession, bandit_id: int) -> int | None:
+    """Async counterpart of ``get_bandit_project``."""
+    project_id = arm_cache.project_of(bandit_id)
+    if project_id is None:
+        row = (await db.execute(_bandit_project_query(bandit_id))).first()
+        project_id = row.project_id if row else None
+    return project_id
+
+
+def get_arm_table(db: Session, project_id: int) -> ArmTable | None:
+    """Return the cached arm table of a project, loading it on a miss."""
+    table = arm_cache.get(project_id)
+    if table is None:
+        token = arm_cache.begin_load(project_id)
+        try:
+            table = load_arm_table(db, project_id)
+        finally:
+            arm_cache.end_load(project_id, table, token)
+    return table
+
+
+async def get_arm_table_async(db: AsyncSession, project_id: int) -> ArmTable | None:
+    """Async counterpart of ``get_arm_table``; cache hits never await."""
+    table = arm_cache.get(project_id)
+    if table is None:
+        token = arm_cache.begin_load(project_id)
+        try:
+            table = await load_arm_table_async(db, project_id)
+        finally:
+            arm_cache.end_load(project_id, table, token)
+    return table
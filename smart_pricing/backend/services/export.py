@@ -0,0 +1,226 @@
+"""
+Streaming export of the ``experiments`` log as Parquet, Arrow IPC or CSV.
+
+Experiments are read through a server-side cursor (``yield_per``) in
+record batches of ``batch_rows``. Each batch is encoded and handed to the
+response as soon as it is ready, so memory stays at about one batch
+whatever the size of the export:
+
+- ``parquet``: one row group per batch; the footer is written at the end.
+- ``arrow``: Arrow IPC stream format, one record batch per batch.
+- ``csv``: plain CSV, optionally gzip-compressed as one continuous stream.
+
+Parquet and Arrow need ``pyarrow``. Without it only CSV is available.
+"""
+
+import csv
+import io
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Float, String, cast, func, select
+from sqlalchemy.orm import Session
+
+from database.models import Experiment
+from .timeseries import to_naive_utc
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV export still works
+    pa = pq = None
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "65536"))
+
+EXPORT_COLUMNS = ("experiment_id", "project_id", "bandit_id", "decision", "reward", "start_date", "end_date")
+
+# Format -> (media type, file extension, allowed compressions; the first is the default)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet", ("zstd", "snappy", "gzip", "none")),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", ("zstd", "lz4", "none")),
+    "csv": ("text/csv", "csv", ("none", "gzip")),
+}
+
+
+@dataclass(frozen=True)
+class ExportOptions:
+    """
+    What to export and how to encode it.
+
+    Attributes:
+        format (str): ``parquet``, ``arrow`` or ``csv``.
+        compression (str | None): Codec of the format; None picks its default.
+        project_id (int | None): Only this project's experiments.
+        since (datetime | None): Only experiments started at or after this time.
+        until (datetime | None): Only experiments started before this time.
+        batch_rows (int): Rows per server-side fetch and per encoded batch.
+    """
+    format: str = "parquet"
+    compression: str | None = None
+    project_id: int | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    batch_rows: int = EXPORT_BATCH_ROWS
+
+    def validated(self) -> "ExportOptions":
+        """
+        Return a copy with the default compression filled in.
+
+        Raises:
+            ValueError: If the format or compression is unknown, or pyarrow is missing.
+        """
+        if self.format not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        codecs = EXPORT_FORMATS[self.format][2]
+        compression = self.compression or codecs[0]
+        if compression not in codecs:
+            raise ValueError(f"compression for {self.format} must be one of {', '.join(codecs)}")
+        if self.format != "csv" and pa is None:
+            raise ValueError(f"{self.format} export needs pyarrow; use format=csv")
+        return ExportOptions(
+            self.format, compression, self.project_id, to_naive_utc(self.since), to_naive_utc(self.until),
+            self.batch_rows,
+        )
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_FORMATS[self.format][0]
+
+    @property
+    def filename(self) -> str:
+        scope = f"project-{self.project_id}" if self.project_id is not None else "all"
+        suffix = ".gz" if self.format == "csv" and self.compression == "gzip" else ""
+        return f"experiments-{scope}.{EXPORT_FORMATS[self.format][1]}{suffix}"
+
+
+def _epoch_us(column):
+    # date_part works in double precision, which is exact to the microsecond for current dates
+    return cast(func.date_part("epoch", column) * 1_000_000, BigInteger)
+
+
+def _export_columns(fmt: str):
+    """
+    Columns as the encoder wants them, converted in SQL.
+
+    Decoding NUMERIC to ``Decimal`` and timestamps to ``datetime`` dominates
+    the cost of a large read. CSV therefore gets text, which is exact, and
+    Arrow gets float rewards and epoch microseconds.
+    """
+    e = Experiment
+    if fmt == "csv":
+        reward, start, end = cast(e.reward, String), cast(e.start_date, String), cast(e.end_date, String)
+    else:
+        reward, start, end = cast(e.reward, Float), _epoch_us(e.start_date), _epoch_us(e.end_date)
+    return e.experiment_id, e.project_id, e.bandit_id, e.decision, reward, start, end
+
+
+def experiment_batches(db: Session, options: ExportOptions):
+    """Yield lists of experiment rows in ``experiment_id`` order, ``batch_rows`` at a time."""
+    stmt = select(*_export_columns(options.format)).order_by(Experiment.experiment_id)
+    if options.project_id is not None:
+        stmt = stmt.where(Experiment.project_id == options.project_id)
+    if options.since is not None:
+        stmt = stmt.where(Experiment.start_date >= options.since)
+    if options.until is not None:
+        stmt = stmt.where(Experiment.start_date < options.until)
+    # Core execution on the session's connection: no ORM row processing
+    result = db.connection().execute(stmt.execution_options(yield_per=options.batch_rows))
+    for rows in result.partitions(options.batch_rows):
+        yield rows
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose written bytes are collected and handed out with ``take``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+# ds/export.py keeps a copy for the CLI; tests/test_export.py checks that they agree
+def _arrow_schema():
+    return pa.schema([
+        ("experiment_id", pa.int64()),
+        ("project_id", pa.int32()),
+        ("bandit_id", pa.int32()),
+        ("decision", pa.string()),
+        ("reward", pa.float64()),
+        ("start_date", pa.timestamp("us")),
+        ("end_date", pa.timestamp("us")),
+    ])
+
+
+def _record_batch(rows, schema):
+    # Timestamps arrive as epoch microseconds, which is how Arrow stores them
+    arrays = [
+        pa.array(col, type=pa.int64()).cast(field.type) if pa.types.is_timestamp(field.type)
+        else pa.array(col, type=field.type)
+        for col, field in zip(zip(*rows), schema)
+    ]
+    return pa.record_batch(arrays, schema=schema)
+
+
+def _encode_arrow(batches, options: ExportOptions):
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    codec = None if options.compression == "none" else options.compression
+    if options.format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=codec or "none")
+    else:
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+    for rows in batches:
+        writer.write_batch(_record_batch(rows, schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def _encode_csv(batches, options: ExportOptions):
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if options.compression == "gzip" else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        yield gzip.compress(data) if gzip else data
+    data = buffer.getvalue().encode()
+    yield gzip.compress(data) + gzip.flush() if gzip else data
+
+
+def stream_experiments(session_factory, options: ExportOptions):
+    """
+    Generate the encoded export, chunk by chunk.
+
+    The generator opens its own session from ``session_factory`` and keeps
+    it, with its server-side cursor, until the last chunk is consumed, so it
+    does not depend on a request-scoped session.
+    """
+    db = session_factory()
+    try:
+        batches = experiment_batches(db, options)
+        encode = _encode_csv if options.format == "csv" else _encode_arrow
+        for chunk in encode(batches, options):
+            if chunk:
+                yield chunk
+    finally:
+        db.close()
@@ -0,0 +1,142 @@
+"""
+Background maintenance of ``projects.optimal_price``.
+
+Selection is read-only; the price a project reports as optimal is the price
+of its arm with the highest posterior mean, recomputed here off the request
+path. Reward writers mark their project dirty, and a background thread
+refreshes all dirty projects in one ``UPDATE ... FROM (SELECT DISTINCT ON ...)``
+every ``OPTIMAL_PRICE_REFRESH_SECONDS``, or earlier once
+``OPTIMAL_PRICE_REFRESH_REWARDS`` rewards have been recorded since the last run.
+"""
+
+import logging
+import os
+import threading
+
+from sqlalchemy import select, update
+
+from database.models import Project, Bandit, get_naive_time
+
+logger = logging.getLogger(__name__)
+
+OPTIMAL_PRICE_REFRESH_SECONDS = float(os.getenv("OPTIMAL_PRICE_REFRESH_SECONDS", "5"))
+OPTIMAL_PRICE_REFRESH_REWARDS = int(os.getenv("OPTIMAL_PRICE_REFRESH_REWARDS", "1000"))
+
+_projects = Project.__table__
+_bandits = Bandit.__table__
+
+
+def recompute_optimal_prices(db, project_ids: list[int]) -> int:
+    """
+    Set ``optimal_price`` and ``last_algorithm_run`` of the given projects to
+    the price of their highest-mean bandit. Projects without bandits are left
+    untouched. Does not commit.
+
+    Returns:
+        int: Number of projects updated.
+    """
+    if not project_ids:
+        return 0
+    best = (
+        select(_bandits.c.project_id, _bandits.c.price)
+        .where(_bandits.c.project_id.in_(project_ids))
+        .distinct(_bandits.c.project_id)
+        .order_by(_bandits.c.project_id, _bandits.c.mean.desc(), _bandits.c.bandit_id)
+        .subquery()
+    )
+    stmt = (
+        update(_projects)
+        .where(_projects.c.project_id == best.c.project_id)
+        .values(optimal_price=best.c.price, last_algorithm_run=get_naive_time())
+    )
+    return db.execute(stmt).rowcount
+
+
+class OptimalPriceTracker:
+    """
+    Collects projects whose posteriors changed and refreshes their optimal
+    price periodically from a background thread.
+
+    Args:
+        session_factory: Callable returning a new SQLAlchemy Session; may be
+            set later, before ``start``.
+        interval_seconds (float): Maximum delay between a reward and the refresh.
+        every_n_rewards (int): Number of marked rewards that triggers an early refresh.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        interval_seconds: float = OPTIMAL_PRICE_REFRESH_SECONDS,
+        every_n_rewards: int = OPTIMAL_PRICE_REFRESH_REWARDS,
+    ):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.every_n_rewards = every_n_rewards
+
+        self._cond = threading.Condition()
+        self._dirty: set[int] = set()
+        self._marked = 0
+        self._thread = None
+        self._stopping = False
+        self.runs = 0
+        self.projects_updated = 0
+
+    def mark_dirty(self, project_id: int, n_rewards: int = 1):
+        with self._cond:
+            self._dirty.add(project_id)
+            self._marked += n_rewards
+            if self._marked >= self.every_n_rewards:
+                self._cond.notify()
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="optimal-price-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after a final refresh."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.refresh()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and self._marked < self.every_n_rewards:
+                    self._cond.wait(self.interval_seconds)
+                if self._stopping:
+                    return
+            self.refresh()
+
+    def refresh(self) -> int:
+        """Recompute the optimal price of every dirty project now."""
+        with self._cond:
+            project_ids, self._dirty = sorted(self._dirty), set()
+            self._marked = 0
+        if not project_ids or self.session_factory is None:
+            return 0
+
+        db = self.session_factory()
+        try:
+            updated = recompute_optimal_prices(db, project_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Optimal price refresh of %d projects failed; will retry", len(project_ids))
+            with self._cond:
+                self._dirty.update(project_ids)
+            return 0
+        finally:
+            db.close()
+
+        self.runs += 1
+        self.projects_updated += updated
+        return updated
+
+
+optimal_price_tracker = OptimalPriceTracker()
@@ -0,0 +1,113 @@
+"""
+Keyset pagination and field projection for list endpoints.
+
+Pages are fetched with ``WHERE (sort key) < / > (last row's key) LIMIT n+1``
+over an index, so every page costs the same no matter how deep the client
+has paged, and a request never loads more than ``API_MAX_PAGE_SIZE`` rows.
+The position is passed around as an opaque cursor (URL-safe base64 JSON of
+the last row's key) returned in the ``X-Next-Cursor`` response header.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+
+from pydantic import BaseModel, TypeAdapter, create_model
+
+API_DEFAULT_PAGE_SIZE = int(os.getenv("API_DEFAULT_PAGE_SIZE", "100"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(**key) -> str:
+    """Encode the sort key of the last returned row; datetimes become ISO strings."""
+    data = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in key.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *keys: str) -> dict:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed or lacks one of ``keys``.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {k: data[k] for k in keys}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def parse_fields(fields: str | None, model: type[BaseModel]) -> list[str] | None:
+    """
+    Parse a comma-separated ``fields=`` projection against a response model.
+
+    Returns:
+        list[str] | None: Requested fields in model order, or None for all fields.
+
+    Raises:
+        ValueError: If a requested field does not exist on the model.
+    """
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in model.model_fields if f in requested]
+
+
+@lru_cache(maxsize=64)
+def _partial_adapter(model: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    """Adapter for a list of ``model`` restricted to ``fields``."""
+    partial = create_model(
+        f"{model.__name__}Partial",
+        **{f: (model.model_fields[f].annotation, ...) for f in fields},
+    )
+    return TypeAdapter(list[partial])
+
+
+def project_rows(rows, model: type[BaseModel], fields: list[str]) -> list[dict]:
+    """
+    Serialize only ``fields`` of each row, with the model's JSON encoding.
+
+    Values are validated against the field types, so e.g. float statistics
+    (``BANDIT_STATS_STORAGE=double``) are encoded like the full response.
+    """
+    adapter = _partial_adapter(model, tuple(fields))
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+def split_page(rows: list, limit: int, cursor_of) -> tuple[list, str | None]:
+    """Trim ``limit + 1`` fetched rows to one page and compute the next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, cursor_of(rows[-1])
+
+
+def fetch_page(db, stmt, limit: int, cursor_of) -> tuple[list, str | None]:
+    """
+    Run an ordered, keyset-filtered select for one page.
+
+    Fetches ``limit + 1`` rows to learn whether another page exists.
+
+    Args:
+        db: SQLAlchemy Session.
+        stmt: Select statement, already ordered and filtered past the cursor.
+        limit (int): Page size.
+        cursor_of: Callable mapping the last row of the page to its cursor.
+
+    Returns:
+        tuple: (rows, next cursor or None on the last page)
+    """
+    return split_page(db.execute(stmt.limit(limit + 1)).all(), limit, cursor_of)
+
+
+async def fetch_page_async(db, stmt, limit: int, cursor_of) -> tuple[list, str | None]:
+    """Async counterpart of ``fetch_page`` for an ``AsyncSession``."""
+    return split_page((await db.execute(stmt.limit(limit + 1))).all(), limit, cursor_of)
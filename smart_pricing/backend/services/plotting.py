@@ -0,0 +1,162 @@
+"""
+Posterior plot rendering with a content-addressed image cache.
+
+A rendered plot depends only on the arms' (id, price, mean, variance) and on
+the render options, so its cache key and ``ETag`` are a digest of exactly
+those values. The same bandit state therefore always maps to the same ETag,
+in every worker, and any reward that moves a posterior produces a new one.
+
+Concurrent requests for the same key are coalesced: the first one submits
+the render, the others wait on its future (single-flight). Rendering itself
+runs in the process pool of ``render_pool``.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from io import BytesIO
+
+import numpy as np
+
+from .arm_cache import ArmTable
+
+PLOT_CACHE_MAX_ENTRIES = int(os.getenv("PLOT_CACHE_MAX_ENTRIES", "256"))
+
+PLOT_MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
+
+
+@dataclass(frozen=True)
+class PlotOptions:
+    """
+    Render options of a posterior plot.
+
+    Attributes:
+        fmt (str): Output format, one of ``PLOT_MEDIA_TYPES``.
+        width (float): Figure width in inches.
+        height (float): Figure height in inches.
+        dpi (int): Raster resolution; ignored for SVG.
+        points (int): Number of x samples per density curve.
+    """
+    fmt: str = "png"
+    width: float = 8.0
+    height: float = 4.0
+    dpi: int = 100
+    points: int = 400
+
+    @property
+    def media_type(self) -> str:
+        return PLOT_MEDIA_TYPES[self.fmt]
+
+
+def plot_digest(table: ArmTable, options) -> str:
+    """
+    Digest of everything a rendered plot depends on; used as cache key and ETag.
+
+    ``options`` is a ``PlotOptions`` or any other value whose ``repr``
+    identifies the representation being served.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for arr in (table.bandit_ids, table.prices, table.means, table.variances):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    h.update(repr((table.project_id, options)).encode())
+    return h.hexdigest()
+
+
+def render_posterior_plot(bandit_ids, prices, means, stds, options: PlotOptions) -> bytes:
+    """
+    Draw one normal density per arm and return the encoded image.
+
+    Uses the object-oriented Figure API only, so no global pyplot state is
+    touched and concurrent renders cannot interfere with each other.
+    """
+    from matplotlib.figure import Figure
+    from scipy.stats import norm
+
+    xmin = min(means) - 4 * max(stds)
+    xmax = max(means) + 4 * max(stds)
+    x = np.linspace(xmin, xmax, options.points)
+
+    fig = Figure(figsize=(options.width, options.height), layout="tight")
+    ax = fig.subplots()
+    for bandit_id, price, mean, std in zip(bandit_ids, prices, means, stds):
+        y = norm.pdf(x, mean, std)
+        ax.plot(x, y, label=f"Bandit {bandit_id} | price={price}")
+
+    ax.legend(fontsize=8)
+    ax.grid(True)
+    buf = BytesIO()
+    fig.savefig(buf, format=options.fmt, dpi=options.dpi)
+    return buf.getvalue()
+
+
+def warm_renderer():
+    """Import matplotlib/scipy and render once so fonts and caches are loaded."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    render_posterior_plot([0], [1.0], [0.0], [1.0], PlotOptions(width=2, height=1.5, dpi=30, points=10))
+
+
+class PlotCache:
+    """
+    LRU of rendered plots keyed by digest, with single-flight rendering.
+
+    Args:
+        max_entries (int): Number of rendered images kept in memory.
+    """
+
+    def __init__(self, max_entries: int = PLOT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._images: OrderedDict[str, bytes] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get_or_submit(self, key: str, submit) -> bytes | Future:
+        """
+        Return the cached image for ``key``, or a future of its rendering.
+
+        On a miss ``submit()`` must start the render and return a
+        ``concurrent.futures.Future``; if a render of the same key is already
+        running, its future is returned instead and ``submit`` is not called.
+        Successful results are stored when the future completes; failures are
+        not cached.
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._inflight[key] = submit()
+
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return future
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.renders += 1
+            self._images[key] = future.result()
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+plot_cache = PlotCache()
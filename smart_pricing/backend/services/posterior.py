@@ -0,0 +1,33 @@
+"""
+Posterior density grids computed with NumPy broadcasting.
+
+Every arm's curve is evaluated on the same standardized grid
+``t = linspace(-4, 4, points)``: ``x = mean + std * t`` and
+``pdf(x) = exp(-t**2 / 2) / (std * sqrt(2 * pi))``, so all arms are computed
+in two ``(arms, points)`` array operations without per-point Python work.
+"""
+
+import numpy as np
+
+from .arm_cache import ArmTable
+
+POSTERIOR_SPAN_STDS = 4.0
+
+
+def posterior_grid(table: ArmTable, points: int = 200) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return ``(x, density)``, both of shape ``(arms, points)``.
+    """
+    t = np.linspace(-POSTERIOR_SPAN_STDS, POSTERIOR_SPAN_STDS, points)
+    stds = table.stds[:, None]
+    x = table.means[:, None] + stds * t
+    density = np.exp(-0.5 * t * t) / (stds * np.sqrt(2.0 * np.pi))
+    return x, density
+
+
+def encode_posterior_f32(x: np.ndarray, density: np.ndarray) -> bytes:
+    """
+    Binary layout: little-endian float32 ``x`` rows followed by ``density``
+    rows, i.e. ``2 * arms * points`` values.
+    """
+    return np.concatenate([x.ravel(), density.ravel()]).astype("<f4").tobytes()
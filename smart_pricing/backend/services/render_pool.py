@@ -0,0 +1,122 @@
+"""
+Process pool for CPU-heavy image rendering and simulations.
+
+Posterior plots are rendered, and simulations run, in separate worker
+processes so matplotlib and long NumPy loops never hold the API process's
+GIL or keep the threadpool that serves select and reward requests busy. Workers are started with ``spawn`` (forking a
+process that already runs threads is unsafe) and pre-warmed with
+``warm_renderer`` so the first real request does not pay for the matplotlib
+import and font cache.
+
+Settings:
+    PLOT_RENDER_WORKERS: number of renderer processes (default 2).
+    PLOT_RENDER_MAX_QUEUE: renders allowed in flight (running or queued)
+        before new ones are rejected with ``RenderPoolBusy`` (default 8).
+    PLOT_RENDER_TIMEOUT_SECONDS: how long a request waits for its render
+        (default 10).
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .plotting import warm_renderer
+
+logger = logging.getLogger(__name__)
+
+PLOT_RENDER_WORKERS = int(os.getenv("PLOT_RENDER_WORKERS", "2"))
+PLOT_RENDER_MAX_QUEUE = int(os.getenv("PLOT_RENDER_MAX_QUEUE", "8"))
+PLOT_RENDER_TIMEOUT_SECONDS = float(os.getenv("PLOT_RENDER_TIMEOUT_SECONDS", "10"))
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the render queue is full."""
+
+
+def _noop():
+    return None
+
+
+class RenderPool:
+    """
+    Bounded ``ProcessPoolExecutor`` of pre-warmed renderer processes.
+
+    Args:
+        workers (int): Number of worker processes.
+        max_queue (int): Maximum number of renders in flight.
+        timeout (float): Seconds a caller should wait for a result.
+    """
+
+    def __init__(
+        self,
+        workers: int = PLOT_RENDER_WORKERS,
+        max_queue: int = PLOT_RENDER_MAX_QUEUE,
+        timeout: float = PLOT_RENDER_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_renderer,
+        )
+        # Processes are spawned on demand; start all of them now
+        for _ in range(self.workers):
+            executor.submit(_noop)
+        return executor
+
+    def submit(self, fn, *args) -> Future:
+        """
+        Run ``fn(*args)`` in a renderer process.
+
+        Raises:
+            RenderPoolBusy: If ``max_queue`` renders are already in flight.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                raise RenderPoolBusy(f"{self._in_flight} renders in flight")
+            if self._executor is None:
+                self._executor = self._create_executor()
+            try:
+                future = self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); replace the whole pool once
+                logger.warning("Render pool broken; restarting it")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor()
+                future = self._executor.submit(fn, *args)
+            self._in_flight += 1
+
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+
+
+render_pool = RenderPool()
@@ -0,0 +1,333 @@
+"""
+Write-behind buffer for reward submission.
+
+With ``REWARD_WRITE_MODE=buffered`` a reward is acknowledged as soon as it is
+appended to an in-process buffer. A background thread flushes the buffer to
+``experiments`` and ``bandits`` with ``apply_reward_batch`` when it holds
+``REWARD_BUFFER_MAX_EVENTS`` events or every ``REWARD_BUFFER_FLUSH_SECONDS``,
+whichever comes first. The buffer is drained on shutdown.
+
+Durability settings:
+    REWARD_BUFFER_JOURNAL_DIR: if set, every accepted reward is appended to an
+        NDJSON journal segment in this directory before it is acknowledged.
+        A segment is deleted only after its flush committed. Segments left
+        by a crashed process are replayed on startup.
+    REWARD_BUFFER_FSYNC: fsync the journal on every append, so acknowledged
+        rewards survive power loss and not only process crashes.
+    REWARD_BUFFER_MAX_PENDING: backpressure limit. When this many events are
+        waiting (e.g. while the database is unavailable), ``submit`` raises
+        ``RewardBufferFull`` and the endpoints answer 503, so memory stays
+        bounded.
+
+Each flush records the names of its journal segments in
+``reward_journal_segments`` in the same transaction as the rewards. A
+segment that is still on disk after a crash but already recorded there is
+deleted instead of being applied twice. Lines of a replayed segment that
+cannot be parsed, such as one torn by the crash, are moved to a
+``.ndjson.bad`` file next to it and skipped.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from database.models import RewardJournalSegment, get_naive_time
+from .rewards import DEFAULT_BULK_DECISION, apply_reward_batch, parse_reward_events
+
+logger = logging.getLogger(__name__)
+
+REWARD_WRITE_MODE = os.getenv("REWARD_WRITE_MODE", "sync")
+REWARD_BUFFER_MAX_EVENTS = int(os.getenv("REWARD_BUFFER_MAX_EVENTS", "500"))
+REWARD_BUFFER_FLUSH_SECONDS = float(os.getenv("REWARD_BUFFER_FLUSH_SECONDS", "1.0"))
+REWARD_BUFFER_MAX_PENDING = int(os.getenv("REWARD_BUFFER_MAX_PENDING", "100000"))
+REWARD_BUFFER_JOURNAL_DIR = os.getenv("REWARD_BUFFER_JOURNAL_DIR") or None
+REWARD_BUFFER_FSYNC = os.getenv("REWARD_BUFFER_FSYNC", "false").lower() in ("1", "true", "yes")
+
+# Markers only have to outlive the segments they describe
+JOURNAL_MARKER_RETENTION = timedelta(days=7)
+
+
+class RewardBufferFull(Exception):
+    """Raised by ``submit`` when ``max_pending`` events are already waiting."""
+
+
+class RewardBuffer:
+    """
+    In-process reward queue flushed to the database in batches.
+
+    Args:
+        session_factory: Callable returning a new SQLAlchemy Session.
+        max_events (int): Buffer size that triggers an immediate flush.
+        flush_seconds (float): Maximum time an event waits before being flushed.
+        max_pending (int): Pending events at which ``submit`` raises ``RewardBufferFull``.
+        journal_dir (str | None): Directory for the NDJSON journal, or None to disable it.
+        fsync (bool): Whether to fsync the journal after every append.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        max_events: int = REWARD_BUFFER_MAX_EVENTS,
+        flush_seconds: float = REWARD_BUFFER_FLUSH_SECONDS,
+        max_pending: int = REWARD_BUFFER_MAX_PENDING,
+        journal_dir: str | None = REWARD_BUFFER_JOURNAL_DIR,
+        fsync: bool = REWARD_BUFFER_FSYNC,
+    ):
+        self.session_factory = session_factory
+        self.max_events = max_events
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.journal_dir = journal_dir
+        self.fsync = fsync
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._events: list[tuple[int, float, str]] = []
+        self._retry: list[tuple[int, float, str]] = []
+        self._retry_segments: list[str] = []
+        self._journal = None
+        self._segment = 0
+        # Keeps segment names unique when the OS reuses a crashed process's pid
+        self._token = uuid.uuid4().hex[:8]
+        self._thread = None
+        self._stopping = False
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self.journal_dir:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._replay_orphaned_segments()
+            self._open_segment()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="reward-buffer-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and drain everything still buffered."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            if os.path.getsize(self._journal.name) == 0:
+                os.remove(self._journal.name)
+            self._journal = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._events) + len(self._retry)
+
+    # ---------- producer side ----------
+    def submit(self, bandit_id: int, reward: float, decision: str | None):
+        """
+        Queue one reward; returns once it is buffered (and journaled, if enabled).
+
+        Raises:
+            RewardBufferFull: If ``max_pending`` events are waiting, e.g. because the database is down.
+        """
+        event = (bandit_id, reward, decision)
+        with self._cond:
+            if self.pending >= self.max_pending:
+                self._cond.notify()
+                raise RewardBufferFull(f"{self.pending} rewards are waiting to be written")
+            if self._journal is not None:
+                self._journal.write(json.dumps({"bandit_id": bandit_id, "reward": reward, "decision": decision}) + "\n")
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            self._events.append(event)
+            if len(self._events) >= self.max_events:
+                self._cond.notify()
+
+    # ---------- consumer side ----------
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._events) < self.max_events:
+                    self._cond.wait(self.flush_seconds)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all buffered events to the database in one batch.
+
+        On failure the events are kept and retried on the next flush, and
+        their journal segments are kept until that retry commits. The
+        segments are marked as applied in the transaction of the batch.
+
+        Returns:
+            int: Number of events written.
+        """
+        with self._flush_lock:
+            with self._cond:
+                events = self._retry + self._events
+                segments = self._retry_segments[:]
+                self._events = []
+                if self._journal is not None and self._journal.tell() > 0:
+                    self._journal.close()
+                    segments.append(self._journal.name)
+                    self._open_segment()
+            if not events:
+                return 0
+
+            markers = [_segment_key(path) for path in segments]
+            db = self.session_factory()
+            try:
+                bandit_ids = np.fromiter((e[0] for e in events), dtype=np.int64, count=len(events))
+                rewards = np.fromiter((e[1] for e in events), dtype=np.float64, count=len(events))
+                decisions = [e[2] or DEFAULT_BULK_DECISION for e in events]
+                apply_reward_batch(db, bandit_ids, rewards, decisions, journal_segments=markers)
+            except Exception:
+                db.rollback()
+                # The commit may have gone through before the error (e.g. in a post-commit hook)
+                if not _committed(db, markers):
+                    logger.exception("Reward buffer flush of %d events failed; will retry", len(events))
+                    self._retry, self._retry_segments = events, segments
+                    return 0
+                logger.exception("Reward buffer flush of %d events failed after its commit", len(events))
+            finally:
+                db.close()
+
+            self._retry, self._retry_segments = [], []
+            for path in segments:
+                os.remove(path)
+            return len(events)
+
+    # ---------- journal ----------
+    def _open_segment(self):
+        self._segment += 1
+        path = os.path.join(self.journal_dir, f"rewards-{os.getpid()}-{self._token}-{self._segment}.ndjson")
+        self._journal = open(path, "a", encoding="utf-8")
+
+    def _replay_orphaned_segments(self):
+        """Apply journal segments left behind by processes that are no longer running."""
+        self._prune_markers()
+        # Both "rewards-<pid>-..." and "replay-<pid>-..." carry their owner pid second
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.ndjson"))):
+            owner = int(os.path.basename(path).split("-")[1])
+            if owner != os.getpid() and _pid_alive(owner):
+                continue
+
+            claimed = os.path.join(self.journal_dir, f"replay-{os.getpid()}-{os.path.basename(path)}")
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # claimed by a sibling worker
+
+            key = _segment_key(path)
+            db = self.session_factory()
+            try:
+                if _all_applied(db, [key]):
+                    logger.warning("Reward journal %s was already applied; deleting it", path)
+                else:
+                    bandit_ids, rewards, decisions = _read_segment(claimed, path + ".bad")
+                    if len(bandit_ids):
+                        result = apply_reward_batch(db, bandit_ids, rewards, decisions, journal_segments=[key])
+                        logger.warning("Replayed %d buffered rewards from %s", result["applied"], path)
+            except IntegrityError:
+                db.rollback()
+                logger.warning("Reward journal %s was already applied; deleting it", path)
+            except Exception:
+                db.rollback()
+                os.rename(claimed, path)
+                logger.exception("Replaying reward journal %s failed", path)
+                continue
+            finally:
+                db.close()
+            os.remove(claimed)
+
+    def _prune_markers(self):
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(RewardJournalSegment)
+                .where(RewardJournalSegment.applied_at < get_naive_time() - JOURNAL_MARKER_RETENTION)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Pruning reward journal markers failed")
+        finally:
+            db.close()
+
+
+def _segment_key(path: str) -> str:
+    """Name of a segment in ``reward_journal_segments``: its file name without any ``replay-<pid>-`` prefix."""
+    name = os.path.basename(path)
+    return name[name.index("rewards-"):]
+
+
+def _all_applied(db, keys: list[str]) -> bool:
+    found = db.execute(
+        select(RewardJournalSegment.segment).where(RewardJournalSegment.segment.in_(keys))
+    ).scalars().all()
+    return len(found) == len(keys)
+
+
+def _committed(db, keys: list[str]) -> bool:
+    """Whether a batch that raised had committed its segments anyway; False when that cannot be told."""
+    if not keys:
+        return False
+    try:
+        return _all_applied(db, keys)
+    except Exception:
+        db.rollback()
+        return False
+
+
+def _read_segment(path: str, quarantine: str):
+    """
+    Parse a journal segment, moving lines that are not valid reward events to ``quarantine``.
+
+    Returns:
+        tuple: The ``parse_reward_events`` arrays of the valid lines.
+    """
+    with open(path, "rb") as f:
+        body = f.read()
+    try:
+        return parse_reward_events(body, ndjson=True)
+    except ValueError:
+        pass
+
+    good, bad = [], []
+    for line in body.splitlines(keepends=True):
+        try:
+            parse_reward_events(line, ndjson=True)
+        except ValueError:
+            bad.append(line if line.endswith(b"\n") else line + b"\n")
+        else:
+            good.append(line)
+    with open(quarantine, "ab") as f:
+        f.writelines(bad)
+    logger.warning("Skipped %d malformed lines of reward journal %s; kept in %s", len(bad), path, quarantine)
+    return parse_reward_events(b"".join(good), ndjson=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def create_reward_buffer(session_factory) -> RewardBuffer | None:
+    """Return a RewardBuffer when write-behind mode is configured, else None."""
+    if REWARD_WRITE_MODE == "buffered":
+        return RewardBuffer(session_factory)
+    return None
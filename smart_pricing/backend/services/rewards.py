@@ -0,0 +1,301 @@
+"""
+Reward application for Thompson Sampling bandits.
+
+Posterior updates are done server-side in a single ``UPDATE ... RETURNING``:
+the new trial count, reward sum, mean and variance are all derived from the
+row's current values inside the statement. Concurrent rewards on the same arm
+therefore never lose increments, and no writer holds a row lock across a
+Python round trip.
+"""
+
+import csv
+import io
+import json
+import os
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+from sqlalchemy import Integer, Numeric, bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import Bandit, Experiment, RewardJournalSegment, get_naive_time
+from .arm_cache import MIN_VARIANCE, arm_cache
+from .optimal_price import optimal_price_tracker
+
+REWARD_BULK_MAX_EVENTS = int(os.getenv("REWARD_BULK_MAX_EVENTS", "1000000"))
+REWARD_BULK_COPY_CHUNK = 100_000
+
+# Rewards are quantized to micro-units when ingested, on every path, and
+# written that way to both ``experiments`` and the bandit sums. Batches add
+# them as integers, and a replay of the log reproduces the sums exactly.
+REWARD_SCALE_DIGITS = 6
+_REWARD_QUANTUM = Decimal(1).scaleb(-REWARD_SCALE_DIGITS)
+# Largest accepted |reward| of a bulk event
+REWARD_MAX_ABS = 1_000_000
+DEFAULT_BULK_DECISION = "bulk"
+
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+_bandits = Bandit.__table__
+_experiments = Experiment.__table__
+_journal_segments = RewardJournalSegment.__table__
+
+
+def bandit_update_statement(returning: bool = True):
+    """
+    Build the atomic posterior update for one bandit.
+
+    Bind parameters:
+        b_id: bandit to update.
+        n: number of new trials.
+        r: sum of the new rewards in whole micro-units (see ``to_decimal``).
+    """
+    n = bindparam("n", type_=Integer)
+    r = bindparam("r", type_=Numeric)
+    new_trial = _bandits.c.trial + n
+
+    stmt = (
+        update(_bandits)
+        .where(_bandits.c.bandit_id == bindparam("b_id"))
+        .values(
+            trial=new_trial,
+            reward=_bandits.c.reward + r,
+            mean=(_bandits.c.reward + r) / new_trial,
+            variance=func.greatest(Decimal(1) / new_trial, Decimal(str(MIN_VARIANCE))),
+        )
+    )
+    if returning:
+        stmt = stmt.returning(
+            _bandits.c.bandit_id,
+            _bandits.c.project_id,
+            _bandits.c.mean,
+            _bandits.c.variance,
+        )
+    return stmt
+
+
+def to_decimal(value: float) -> Decimal:
+    """Convert a client-supplied float to the Decimal it was written as, in whole micro-units."""
+    return Decimal(str(value)).quantize(_REWARD_QUANTUM, rounding=ROUND_HALF_EVEN)
+
+
+def _experiment_insert(project_id: int, bandit_id: int, value: Decimal, decision: str | None):
+    return insert(_experiments).values(
+        project_id=project_id,
+        bandit_id=bandit_id,
+        reward=value,
+        decision=decision,
+    )
+
+
+def _after_reward(row):
+    arm_cache.update_arm(row.project_id, row.bandit_id, float(row.mean), float(row.variance))
+    optimal_price_tracker.mark_dirty(row.project_id)
+
+
+def apply_reward(db: Session, bandit_id: int, reward: float, decision: str | None):
+    """
+    Record one reward: update the bandit atomically and log the experiment.
+
+    Returns:
+        The updated ``(bandit_id, project_id, mean, variance)`` row, or None
+        if the bandit does not exist.
+    """
+    value = to_decimal(reward)
+    row = db.execute(bandit_update_statement(), {"b_id": bandit_id, "n": 1, "r": value}).first()
+    if row is None:
+        db.rollback()
+        return None
+
+    db.execute(_experiment_insert(row.project_id, bandit_id, value, decision))
+    db.commit()
+
+    _after_reward(row)
+    return row
+
+
+async def apply_reward_async(db: AsyncSession, bandit_id: int, reward: float, decision: str | None):
+    """Async counterpart of ``apply_reward``, with the same statements."""
+    value = to_decimal(reward)
+    row = (await db.execute(bandit_update_statement(), {"b_id": bandit_id, "n": 1, "r": value})).first()
+    if row is None:
+        await db.rollback()
+        return None
+
+    await db.execute(_experiment_insert(row.project_id, bandit_id, value, decision))
+    await db.commit()
+
+    _after_reward(row)
+    return row
+
+
+def _event_bandit_id(value) -> int:
+    # bool is an int subclass; floats would be truncated by the int64 cast
+    if type(value) is not int or not _INT64_MIN <= value <= _INT64_MAX:
+        raise ValueError(f"bandit_id must be a 64-bit integer, got {value!r}")
+    return value
+
+
+def _event_reward(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not abs(value) <= REWARD_MAX_ABS:
+        raise ValueError(f"reward must be a finite number of at most {REWARD_MAX_ABS:,} in magnitude, got {value!r}")
+    return value
+
+
+def parse_reward_events(body: bytes, ndjson: bool = False):
+    """
+    Parse a batch of reward events sent as a JSON array or as NDJSON.
+
+    Each event is an object with an integer ``bandit_id``, a numeric
+    ``reward`` of at most ``REWARD_MAX_ABS`` in magnitude and an optional
+    ``decision``.
+
+    Returns:
+        tuple: (bandit_ids int64 array, rewards float64 array, decisions list)
+
+    Raises:
+        ValueError: If the payload is not valid JSON or an event is malformed.
+    """
+    try:
+        if ndjson:
+            events = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            events = json.loads(body)
+        if not isinstance(events, list):
+            raise ValueError("expected a JSON array of reward events")
+
+        count = len(events)
+        bandit_ids = np.fromiter((_event_bandit_id(e["bandit_id"]) for e in events), dtype=np.int64, count=count)
+        rewards = np.fromiter((_event_reward(e["reward"]) for e in events), dtype=np.float64, count=count)
+        decisions = [e.get("decision") or DEFAULT_BULK_DECISION for e in events]
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"malformed reward event: {e!r}") from e
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}") from e
+
+    # apply_reward_batch sums int64 micro-units per bandit
+    if np.abs(rewards).sum() * 10**REWARD_SCALE_DIGITS >= _INT64_MAX:
+        raise ValueError("rewards of the batch sum beyond the exact range; split the batch")
+    return bandit_ids, rewards, decisions
+
+
+def _copy_experiments(db: Session, rows):
+    """
+    Bulk-load experiment rows with COPY when the driver supports it, and
+    with a multi-row INSERT otherwise.
+    """
+    dbapi_conn = db.connection().connection.dbapi_connection
+    cursor = dbapi_conn.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        cursor.close()
+        keys = ("project_id", "bandit_id", "decision", "reward", "start_date", "end_date")
+        db.execute(insert(_experiments), [dict(zip(keys, row)) for row in rows])
+        return
+
+    try:
+        for start in range(0, len(rows), REWARD_BULK_COPY_CHUNK):
+            buf = io.StringIO()
+            csv.writer(buf).writerows(rows[start:start + REWARD_BULK_COPY_CHUNK])
+            buf.seek(0)
+            cursor.copy_expert(
+                "COPY experiments (project_id, bandit_id, decision, reward, start_date, end_date) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+    finally:
+        cursor.close()
+
+
+def apply_reward_totals(db: Session, totals) -> list:
+    """
+    Add aggregated rewards to several bandits, one atomic update each.
+
+    ``totals`` holds ``(bandit_id, n, reward_sum)`` tuples in bandit id
+    order, so that concurrent batches lock rows in the same order and cannot
+    deadlock. Nothing is committed; call ``after_reward_totals`` once the
+    transaction is.
+
+    Returns:
+        list: The updated rows, None for bandits that do not exist.
+    """
+    stmt = bandit_update_statement()
+    return [db.execute(stmt, {"b_id": b_id, "n": n, "r": r}).first() for b_id, n, r in totals]
+
+
+def after_reward_totals(rows, counts):
+    """Refresh the arm cache and optimal-price tracker after committed totals."""
+    for row, n in zip(rows, counts):
+        if row is not None:
+            arm_cache.update_arm(row.project_id, row.bandit_id, float(row.mean), float(row.variance))
+            optimal_price_tracker.mark_dirty(row.project_id, n)
+
+
+def apply_reward_batch(
+    db: Session,
+    bandit_ids: np.ndarray,
+    rewards: np.ndarray,
+    decisions: list[str],
+    journal_segments: list[str] = (),
+) -> dict:
+    """
+    Apply a batch of rewards with one update per bandit and one bulk insert.
+
+    Rewards are rounded to micro-units, the rule of ``to_decimal``, and
+    grouped per bandit with NumPy; each bandit then gets a single atomic
+    update adding its trial count and exact reward sum. The experiment rows
+    get the same rounded rewards. Bandits are
+    updated in id order so concurrent batches cannot deadlock. Events for
+    unknown bandits are rejected and everything else is committed in one
+    transaction, together with the ``journal_segments`` markers of the
+    reward buffer.
+
+    Returns:
+        dict: ``applied``, ``rejected``, ``unknown_bandit_ids`` and ``bandits_updated``.
+    """
+    if not len(bandit_ids):
+        return {"applied": 0, "rejected": 0, "unknown_bandit_ids": [], "bandits_updated": 0}
+
+    uniq, inverse = np.unique(bandit_ids, return_inverse=True)
+    units = np.rint(rewards * 10**REWARD_SCALE_DIGITS).astype(np.int64)
+    # The log gets the same rounded rewards; below 2**53 micro-units each prints as its exact decimal
+    logged = units / 10**REWARD_SCALE_DIGITS
+    sums = np.zeros(len(uniq), dtype=np.int64)
+    np.add.at(sums, inverse, units)
+    counts = np.bincount(inverse, minlength=len(uniq))
+
+    owners = dict(db.execute(
+        select(_bandits.c.bandit_id, _bandits.c.project_id).where(_bandits.c.bandit_id.in_(uniq.tolist()))
+    ).all())
+    project_of = np.array([owners.get(int(b), -1) for b in uniq], dtype=np.int64)
+    known = project_of >= 0
+
+    totals = [
+        (int(uniq[i]), int(counts[i]), Decimal(int(sums[i])).scaleb(-REWARD_SCALE_DIGITS))
+        for i in np.flatnonzero(known)
+    ]
+    updated = apply_reward_totals(db, totals)
+
+    event_known = known[inverse]
+    now = get_naive_time().isoformat(sep=" ")
+    event_projects = project_of[inverse]
+    rows = [
+        (project_id, bandit_id, decision, reward, now, now)
+        for project_id, bandit_id, decision, reward, ok in zip(
+            event_projects.tolist(), bandit_ids.tolist(), decisions, logged.tolist(), event_known.tolist()
+        )
+        if ok
+    ]
+    _copy_experiments(db, rows)
+    if journal_segments:
+        db.execute(insert(_journal_segments), [{"segment": name} for name in journal_segments])
+    db.commit()
+
+    after_reward_totals(updated, [n for _, n, _ in totals])
+
+    return {
+        "applied": len(rows),
+        "rejected": int(len(bandit_ids) - len(rows)),
+        "unknown_bandit_ids": uniq[~known].tolist(),
+        "bandits_updated": len(updated),
+    }
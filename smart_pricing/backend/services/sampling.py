@@ -0,0 +1,38 @@
+"""
+Vectorized Thompson Sampling draws over cached arm tables.
+"""
+
+import threading
+
+import numpy as np
+
+from .arm_cache import ArmTable
+
+_local = threading.local()
+
+
+def get_rng() -> np.random.Generator:
+    """
+    Return the random generator of the calling worker thread.
+
+    Each threadpool worker gets its own independently seeded ``Generator``,
+    so concurrent selects never contend on NumPy's global random state.
+    """
+    rng = getattr(_local, "rng", None)
+    if rng is None:
+        rng = _local.rng = np.random.default_rng()
+    return rng
+
+
+def sample_arms(table: ArmTable, n: int = 1, rng: np.random.Generator | None = None) -> np.ndarray:
+    """
+    Run ``n`` independent Thompson Sampling draws over all arms of a table.
+
+    A single ``(n, arms)`` normal sample matrix is drawn and reduced row-wise.
+
+    Returns:
+        np.ndarray: Index of the winning arm for each of the ``n`` draws.
+    """
+    rng = rng or get_rng()
+    draws = rng.normal(table.means, table.stds, size=(n, len(table)))
+    return draws.argmax(axis=1)
@@ -0,0 +1,274 @@
+"""
+In-memory Thompson Sampling simulation against a demand curve.
+
+The whole simulation runs on NumPy arrays: ``batch_size`` trials are drawn
+from the current posterior at once (``sample_arms``), the simulated buys are
+counted per arm with ``bincount`` and the posterior is updated the way the
+reward route does (mean = reward / trial, variance = 1 / trial). Nothing
+touches the database until the end. The run is then written as one atomic
+update per bandit, with one experiment row per trial if requested, or not
+at all in dry-run mode.
+
+A batch of draws against the same posterior is how selection works in
+production as well, since many selects are served between reward updates.
+``batch_size=1`` gives the strictly sequential algorithm.
+
+The simulation itself runs in the render process pool (``render_pool``), so
+it neither holds the GIL of the API process nor a database connection. It
+is bounded by ``SIMULATION_MAX_TRIALS``, by ``SIMULATION_MAX_BATCHES``
+(its cost grows with the number of batches more than with the trials)
+and by ``SIMULATION_TIMEOUT_SECONDS``.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.models import Bandit, Project
+from .arm_cache import MIN_VARIANCE, ArmTable
+from .render_pool import render_pool
+from .rewards import REWARD_BULK_MAX_EVENTS, after_reward_totals, apply_reward_batch, apply_reward_totals
+from .sampling import sample_arms
+
+SIMULATION_MAX_TRIALS = int(os.getenv("SIMULATION_MAX_TRIALS", "10000000"))
+SIMULATION_MAX_BATCHES = int(os.getenv("SIMULATION_MAX_BATCHES", "100000"))
+SIMULATION_TIMEOUT_SECONDS = float(os.getenv("SIMULATION_TIMEOUT_SECONDS", "30"))
+SIMULATION_DECISION = "simulated"
+
+# Points of the cumulative regret curve returned per run
+REGRET_CHECKPOINTS = 100
+
+
+def buy_probabilities(prices: np.ndarray, demand) -> np.ndarray:
+    """Evaluate a ``DemandCurve`` at every price."""
+    if demand.kind == "logistic":
+        reference = demand.reference_price if demand.reference_price is not None else prices.mean()
+        p = demand.max_probability / (1.0 + np.exp(demand.steepness * (prices - reference)))
+    elif demand.kind == "exponential":
+        p = demand.max_probability * np.exp(-demand.steepness * prices)
+    elif demand.kind == "linear":
+        choke = demand.choke_price if demand.choke_price is not None else 2.0 * prices.max()
+        p = demand.max_probability * (1.0 - prices / choke)
+    else:
+        p = np.interp(prices, demand.prices, demand.probabilities)
+    return np.clip(p, 0.0, 1.0)
+
+
+@dataclass
+class SimulationRun:
+    """
+    Outcome of ``simulate_thompson``.
+
+    Attributes:
+        table (ArmTable): Posterior after the run.
+        trials (np.ndarray): Simulated trials per arm.
+        buys (np.ndarray): Simulated buys per arm.
+        regret (float): Expected regret against the best arm.
+        checkpoints (list[int]): Trial counts of the regret curve.
+        cumulative_regret (list[float]): Expected regret at each checkpoint.
+        choices (np.ndarray | None): Arm index of every trial, if recorded.
+        bought (np.ndarray | None): Whether every trial was a buy, if recorded.
+    """
+    table: ArmTable
+    trials: np.ndarray
+    buys: np.ndarray
+    regret: float
+    checkpoints: list[int]
+    cumulative_regret: list[float]
+    choices: np.ndarray | None = None
+    bought: np.ndarray | None = None
+
+
+def simulate_thompson(
+    table: ArmTable,
+    start_trials: np.ndarray,
+    start_rewards: np.ndarray,
+    buy_prob: np.ndarray,
+    n_trials: int,
+    batch_size: int = 100,
+    rng: np.random.Generator | None = None,
+    record_trials: bool = False,
+) -> SimulationRun:
+    """
+    Simulate ``n_trials`` Thompson Sampling trials starting from ``table``.
+
+    ``start_trials`` and ``start_rewards`` are the arms' current trial counts
+    and reward sums, which the posterior update continues from. A trial that
+    selects arm ``i`` is a buy with probability ``buy_prob[i]`` and then
+    earns ``table.prices[i]``.
+    """
+    rng = rng or np.random.default_rng()
+    table = table.snapshot()
+    n_arms = len(table)
+    trials = np.asarray(start_trials, dtype=np.int64).copy()
+    rewards = np.asarray(start_rewards, dtype=np.float64).copy()
+    added = np.zeros(n_arms, dtype=np.int64)
+    buys = np.zeros(n_arms, dtype=np.int64)
+
+    expected = table.prices * buy_prob
+    best = expected.max()
+    regret = 0.0
+    every = max(1, n_trials // REGRET_CHECKPOINTS)
+    checkpoints, curve = [], []
+
+    choices = np.empty(n_trials, dtype=np.int32) if record_trials else None
+    bought = np.empty(n_trials, dtype=bool) if record_trials else None
+
+    done = 0
+    while done < n_trials:
+        n = min(batch_size, n_trials - done)
+        winners = sample_arms(table, n, rng)
+        sold = rng.random(n) < buy_prob[winners]
+        if record_trials:
+            choices[done:done + n] = winners
+            bought[done:done + n] = sold
+
+        picks = np.bincount(winners, minlength=n_arms)
+        sales = np.bincount(winners[sold], minlength=n_arms)
+        added += picks
+        buys += sales
+        trials += picks
+        rewards += sales * table.prices
+
+        hit = picks > 0
+        table.means[hit] = rewards[hit] / trials[hit]
+        table.variances[hit] = np.maximum(1.0 / trials[hit], MIN_VARIANCE)
+
+        regret += n * best - picks @ expected
+        done += n
+        if done // every > len(checkpoints) or done == n_trials:
+            checkpoints.append(done)
+            curve.append(round(float(regret), 6))
+
+    return SimulationRun(
+        table=table,
+        trials=added,
+        buys=buys,
+        regret=float(regret),
+        checkpoints=checkpoints,
+        cumulative_regret=curve,
+        choices=choices,
+        bought=bought,
+    )
+
+
+def run_simulation(db: Session, project_id: int, req) -> dict | None:
+    """
+    Simulate a project's bandits per a ``RunSimulationRequest`` and store the outcome.
+
+    The simulation continues from the project's current posterior. Unless
+    ``req.dry_run`` is set, each bandit then gets one atomic update adding its
+    simulated trials and exact reward sum (``price * buys``), in the same way
+    as the bulk reward route. Concurrent live rewards are therefore kept.
+
+    Returns:
+        dict: Fields of a ``SimulationResponse``, or None if the project does not exist.
+
+    Raises:
+        LookupError: If the project has no bandits.
+        ValueError: If the run is larger than allowed.
+        RenderPoolBusy: If the process pool has no room for the run.
+        TimeoutError: If the run takes longer than ``SIMULATION_TIMEOUT_SECONDS``.
+    """
+    start = time.perf_counter()
+    if req.n_trials > SIMULATION_MAX_TRIALS:
+        raise ValueError(f"n_trials is limited to {SIMULATION_MAX_TRIALS}")
+    if -(-req.n_trials // req.batch_size) > SIMULATION_MAX_BATCHES:
+        raise ValueError(f"n_trials / batch_size is limited to {SIMULATION_MAX_BATCHES} batches")
+    if req.record_experiments and not req.dry_run and req.n_trials > REWARD_BULK_MAX_EVENTS:
+        raise ValueError(f"record_experiments is limited to {REWARD_BULK_MAX_EVENTS} trials")
+
+    rows = db.execute(
+        select(Bandit.bandit_id, Bandit.price, Bandit.mean, Bandit.variance, Bandit.trial, Bandit.reward)
+        .where(Bandit.project_id == project_id)
+        .order_by(Bandit.bandit_id)
+    ).all()
+    if not rows:
+        if db.execute(select(Project.project_id).where(Project.project_id == project_id)).first() is None:
+            return None
+        raise LookupError(f"No bandits found for project {project_id}")
+
+    table = ArmTable(
+        project_id=project_id,
+        bandit_ids=np.array([r.bandit_id for r in rows], dtype=np.int64),
+        prices=np.array([float(r.price) for r in rows], dtype=np.float64),
+        means=np.array([float(r.mean) for r in rows], dtype=np.float64),
+        variances=np.array([float(r.variance) for r in rows], dtype=np.float64),
+    )
+    prices = [Decimal(r.price) for r in rows]
+    buy_prob = buy_probabilities(table.prices, req.demand)
+
+    # End the read transaction: the connection goes back to the pool while the run works
+    db.rollback()
+    run = render_pool.submit(
+        simulate_thompson,
+        table,
+        [r.trial for r in rows],
+        [float(r.reward) for r in rows],
+        buy_prob,
+        req.n_trials,
+        req.batch_size,
+        np.random.default_rng(req.seed),
+        req.record_experiments and not req.dry_run,
+    ).result(timeout=SIMULATION_TIMEOUT_SECONDS)
+
+    means, variances = run.table.means.tolist(), run.table.variances.tolist()
+    experiments = 0
+    if req.record_experiments and not req.dry_run:
+        result = apply_reward_batch(
+            db,
+            table.bandit_ids[run.choices],
+            np.where(run.bought, table.prices[run.choices], 0.0),
+            [SIMULATION_DECISION] * req.n_trials,
+        )
+        experiments = result["applied"]
+    elif not req.dry_run:
+        totals = [
+            (int(b_id), int(n), price * int(k))
+            for b_id, n, k, price in zip(table.bandit_ids, run.trials, run.buys, prices)
+            if n
+        ]
+        stored = apply_reward_totals(db, totals)
+        db.commit()
+        after_reward_totals(stored, [n for _, n, _ in totals])
+        # Report the stored posterior, which also includes concurrent live rewards
+        index = {b_id: i for i, b_id in enumerate(table.bandit_ids.tolist())}
+        for row in stored:
+            if row is not None:
+                means[index[row.bandit_id]] = float(row.mean)
+                variances[index[row.bandit_id]] = float(row.variance)
+
+    best = int(np.argmax(table.prices * buy_prob))
+    return {
+        "project_id": project_id,
+        "n_trials": req.n_trials,
+        "batch_size": req.batch_size,
+        "dry_run": req.dry_run,
+        "experiments_recorded": experiments,
+        "total_reward": sum((price * int(k) for price, k in zip(prices, run.buys)), Decimal(0)),
+        "best_price": prices[best],
+        "regret": round(run.regret, 6),
+        "checkpoints": run.checkpoints,
+        "cumulative_regret": run.cumulative_regret,
+        "arms": [
+            {
+                "bandit_id": int(b_id),
+                "price": price,
+                "buy_probability": round(float(p), 6),
+                "trials": int(n),
+                "buys": int(k),
+                "reward": price * int(k),
+                "mean": means[i],
+                "variance": variances[i],
+            }
+            for i, (b_id, price, p, n, k) in enumerate(
+                zip(table.bandit_ids, prices, buy_prob, run.trials, run.buys)
+            )
+        ],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
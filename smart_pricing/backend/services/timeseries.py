@@ -0,0 +1,179 @@
+"""
+Per-bandit conversion and revenue time series from ``experiments``.
+
+The project's time range is split into at most ``points * TIMESERIES_OVERSAMPLE``
+equal buckets, and experiments are counted per bucket and bandit in SQL
+(``ix_experiments_project_id_start_date`` covers the range scan). Each
+bandit's series is then reduced to ``points`` buckets with
+Largest-Triangle-Three-Buckets on the conversion rate. LTTB keeps the peaks
+and dips a plot would show. The payload is therefore at most
+``arms * points`` values per field, however long the experiment has run.
+Totals over the whole range are returned separately, because the selected
+buckets do not add up to them.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import Float, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from database.models import Experiment
+from .arm_cache import ArmTable
+
+TIMESERIES_OVERSAMPLE = 8
+TIMESERIES_MIN_BUCKET_SECONDS = 1.0
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the ``threshold`` points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept. From each of the buckets in
+    between, LTTB keeps the point that forms the largest triangle with the
+    previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:threshold])
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def to_naive_utc(value: datetime | None) -> datetime | None:
+    """Convert an aware datetime to naive UTC, the convention of ``experiments.start_date``."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _epoch(column):
+    # Seconds since 1970-01-01 UTC for both ``timestamp`` (naive UTC) and ``timestamptz`` columns
+    return func.extract("epoch", column)
+
+
+def _from_epoch(seconds) -> datetime | None:
+    if seconds is None:
+        return None
+    return datetime(1970, 1, 1) + timedelta(seconds=float(seconds))
+
+
+def _time_range(db: Session, project_id: int, since: datetime | None, until: datetime | None):
+    """
+    Resolve the range as naive UTC datetimes.
+
+    core creates ``start_date`` as ``timestamptz`` while the backend models
+    declare it naive. The first and last experiment are therefore read as
+    epoch seconds, which means the same for both.
+    """
+    since, until = to_naive_utc(since), to_naive_utc(until)
+    if since is None or until is None:
+        first, last = db.execute(
+            select(func.min(_epoch(Experiment.start_date)), func.max(_epoch(Experiment.start_date)))
+            .where(Experiment.project_id == project_id)
+        ).one()
+        since = since or _from_epoch(first)
+        until = until or _from_epoch(last)
+    return since, until
+
+
+def conversion_timeseries(
+    db: Session,
+    table: ArmTable,
+    points: int = 200,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> dict:
+    """
+    Bucketed and downsampled conversion/revenue series of every bandit in ``table``.
+
+    ``since`` and ``until`` default to the project's first and last
+    experiment; both are naive UTC like ``experiments.start_date``.
+
+    Returns:
+        dict: Fields of a ``TimeSeriesResponse``.
+    """
+    since, until = _time_range(db, table.project_id, since, until)
+    arms = len(table)
+    result = {
+        "project_id": table.project_id,
+        "points": points,
+        "start": since,
+        "end": until,
+        "bucket_seconds": None,
+        "bandit_ids": table.bandit_ids.tolist(),
+        "prices": table.prices.tolist(),
+        "t": [[] for _ in range(arms)],
+        "impressions": [[] for _ in range(arms)],
+        "conversions": [[] for _ in range(arms)],
+        "revenue": [[] for _ in range(arms)],
+        "conversion_rate": [[] for _ in range(arms)],
+        "total_impressions": [0] * arms,
+        "total_conversions": [0] * arms,
+        "total_revenue": [0.0] * arms,
+    }
+    if since is None or until is None or until < since:
+        return result
+
+    span = (until - since).total_seconds()
+    width = max(span / (points * TIMESERIES_OVERSAMPLE), TIMESERIES_MIN_BUCKET_SECONDS)
+    result["bucket_seconds"] = width
+
+    start_s = (since - datetime(1970, 1, 1)).total_seconds()
+    bucket = func.floor((_epoch(Experiment.start_date) - start_s) / width)
+    rows = db.execute(
+        select(
+            Experiment.bandit_id,
+            bucket.label("bucket"),
+            func.count().label("impressions"),
+            func.count(case((Experiment.reward > 0, 1))).label("conversions"),
+            cast(func.sum(Experiment.reward), Float).label("revenue"),
+        )
+        .where(
+            Experiment.project_id == table.project_id,
+            # Aware bounds are exact against timestamptz and keep the index usable
+            Experiment.start_date >= since.replace(tzinfo=timezone.utc),
+            Experiment.start_date <= until.replace(tzinfo=timezone.utc),
+        )
+        .group_by(Experiment.bandit_id, bucket)
+        .order_by(Experiment.bandit_id, bucket)
+    ).all()
+    if not rows:
+        return result
+
+    bandit_ids = np.fromiter((r.bandit_id for r in rows), dtype=np.int64, count=len(rows))
+    buckets = np.fromiter((r.bucket for r in rows), dtype=np.float64, count=len(rows))
+    impressions = np.fromiter((r.impressions for r in rows), dtype=np.int64, count=len(rows))
+    conversions = np.fromiter((r.conversions for r in rows), dtype=np.int64, count=len(rows))
+    revenue = np.fromiter((r.revenue for r in rows), dtype=np.float64, count=len(rows))
+    rate = conversions / impressions
+
+    for i, bandit_id in enumerate(table.bandit_ids.tolist()):
+        lo, hi = np.searchsorted(bandit_ids, [bandit_id, bandit_id + 1])
+        if lo == hi:
+            continue
+        keep = lo + lttb_indices(buckets[lo:hi], rate[lo:hi], points)
+        result["t"][i] = np.rint((start_s + buckets[keep] * width) * 1000).astype(np.int64).tolist()
+        result["impressions"][i] = impressions[keep].tolist()
+        result["conversions"][i] = conversions[keep].tolist()
+        result["revenue"][i] = revenue[keep].tolist()
+        result["conversion_rate"][i] = rate[keep].tolist()
+        result["total_impressions"][i] = int(impressions[lo:hi].sum())
+        result["total_conversions"][i] = int(conversions[lo:hi].sum())
+        result["total_revenue"][i] = float(revenue[lo:hi].sum())
+    return result
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+
+# Tests import backend modules the way the app does (``from database import ...``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pg_conn():
+    """
+    Connection to the DB_* database inside a throw-away schema.
+
+    Everything the test creates is rolled back. Skipped when no database is reachable.
+    """
+    from database.database import engine
+
+    try:
+        conn = engine.connect()
+    except Exception as e:  # no database in this environment
+        pytest.skip(f"database not reachable: {e}")
+    trans = conn.begin()
+    conn.execute(text("CREATE SCHEMA pytest_scratch"))
+    conn.execute(text("SET LOCAL search_path TO pytest_scratch"))
+    try:
+        yield conn
+    finally:
+        trans.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def pg_engine():
+    """
+    Engine on the DB_* database whose connections all use a throw-away schema.
+
+    For tests that need several connections to see each other's commits,
+    which ``pg_conn`` cannot give: the schema is dropped afterwards instead
+    of rolled back. Skipped when no database is reachable.
+    """
+    from database.database import engine as app_engine
+
+    try:
+        with app_engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA IF EXISTS pytest_shared CASCADE"))
+            conn.execute(text("CREATE SCHEMA pytest_shared"))
+    except Exception as e:  # no database in this environment
+        pytest.skip(f"database not reachable: {e}")
+    engine = create_engine(app_engine.url, connect_args={"options": "-c search_path=pytest_shared"})
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with app_engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA pytest_shared CASCADE"))
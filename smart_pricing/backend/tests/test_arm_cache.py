@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from services.arm_cache import ArmCache, ArmTable
+
+
+def _table(project_id=1, means=(0.0, 0.0)):
+    return ArmTable(
+        project_id=project_id,
+        bandit_ids=np.array([10, 11]),
+        prices=np.array([5.0, 6.0]),
+        means=np.array(means),
+        variances=np.ones(2),
+    )
+
+
+def test_write_through_publishes_a_new_table():
+    cache = ArmCache()
+    cache.put(_table())
+    before = cache.get(1)
+
+    cache.update_arm(1, 11, 3.0, 0.5)
+    after = cache.get(1)
+
+    assert after is not before
+    assert before.means.tolist() == [0.0, 0.0] and before.variances.tolist() == [1.0, 1.0]
+    assert after.means.tolist() == [0.0, 3.0] and after.variances.tolist() == [1.0, 0.5]
+    assert after.version == before.version + 1
+    with pytest.raises(ValueError):
+        after.means[0] = 1.0
+
+
+def test_load_racing_a_write_is_not_cached():
+    cache = ArmCache()
+    token = cache.begin_load(1)
+    # A reward commits and writes through while the load reads the older row
+    cache.update_arm(1, 11, 3.0, 0.5)
+
+    assert not cache.end_load(1, _table(), token)
+    assert cache.get(1) is None
+
+    token = cache.begin_load(1)
+    assert cache.end_load(1, _table(means=(0.0, 3.0)), token)
+    assert cache.get(1).means.tolist() == [0.0, 3.0]
+
+
+def test_write_to_another_project_does_not_discard_a_load():
+    cache = ArmCache()
+    token = cache.begin_load(1)
+    cache.update_arm(2, 20, 1.0, 1.0)
+    assert cache.end_load(1, _table(), token)
+
+
+def test_snapshot_is_writable():
+    cache = ArmCache()
+    cache.put(_table())
+    copy = cache.get(1).snapshot()
+    copy.means[0] = 2.0
+    assert cache.get(1).means[0] == 0.0
@@ -0,0 +1,37 @@
+import importlib.util
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from services import export as api_export  # noqa: E402
+
+DS_EXPORT = os.path.join(os.path.dirname(__file__), "..", "..", "ds", "export.py")
+
+
+@pytest.fixture
+def ds_export():
+    if not os.path.exists(DS_EXPORT):
+        pytest.skip("ds is not checked out next to the backend")
+    spec = importlib.util.spec_from_file_location("ds_export", DS_EXPORT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_ds_export_matches_api_schema(ds_export):
+    assert ds_export.COLUMNS == api_export.EXPORT_COLUMNS
+    assert ds_export._schema() == api_export._arrow_schema()
+    assert ds_export.CODECS == {fmt: codecs for fmt, (_, _, codecs) in api_export.EXPORT_FORMATS.items()}
+
+
+def test_ds_export_encodes_rows_like_api(ds_export):
+    # Rows as both read them for Arrow: float reward, epoch-microsecond timestamps
+    rows = [
+        (1, 3, 7, "buy", 9.99, 1_761_998_400_000_000, 1_761_998_400_250_000),
+        (2, 3, 8, "bulk", 0.0, 1_761_998_401_000_000, None),
+    ]
+    api = api_export._record_batch(rows, api_export._arrow_schema())
+    ds = ds_export._record_batch(rows, ds_export._schema())
+    assert ds.equals(api)
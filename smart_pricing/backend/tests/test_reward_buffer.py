@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.models import Base
+from services.reward_buffer import RewardBuffer, RewardBufferFull
+
+DEAD_PID = 999999
+
+
+def _event(reward):
+    return json.dumps({"bandit_id": 1, "reward": reward, "decision": "x"}) + "\n"
+
+
+def _buffer(conn, journal_dir, **kwargs):
+    Base.metadata.create_all(conn)
+    conn.execute(text("INSERT INTO projects (project_id, description, number_bandits, created_at) VALUES (1, 'p', 1, now())"))
+    conn.execute(text(
+        "INSERT INTO bandits (bandit_id, project_id, price, mean, variance, reward, trial, number_explored) "
+        "VALUES (1, 1, 10, 0, 1, 0, 0, 0)"
+    ))
+    # Every commit of the buffer becomes a savepoint of the test's transaction
+    factory = lambda: Session(bind=conn, join_transaction_mode="create_savepoint")
+    return RewardBuffer(factory, journal_dir=str(journal_dir), flush_seconds=60, **kwargs)
+
+
+def _trials(conn):
+    return conn.execute(text("SELECT trial FROM bandits WHERE bandit_id = 1")).scalar()
+
+
+def test_replay_quarantines_torn_line_and_skips_applied_segment(pg_conn, tmp_path):
+    rb = _buffer(pg_conn, tmp_path)
+    torn = tmp_path / f"rewards-{DEAD_PID}-abcd1234-1.ndjson"
+    torn.write_text(_event(1.0) + _event(2.0) + '{"bandit_id": 1, "rew')
+    applied = tmp_path / f"rewards-{DEAD_PID}-abcd1234-2.ndjson"
+    applied.write_text(_event(5.0))
+    pg_conn.execute(
+        text("INSERT INTO reward_journal_segments (segment, applied_at) VALUES (:s, now())"),
+        {"s": applied.name},
+    )
+
+    rb.start()
+    rb.stop()
+
+    assert _trials(pg_conn) == 2
+    assert sorted(os.listdir(tmp_path)) == [f"{torn.name}.bad"]
+    assert (tmp_path / f"{torn.name}.bad").read_text() == '{"bandit_id": 1, "rew\n'
+
+
+def test_submit_rejects_when_pending_limit_reached(pg_conn, tmp_path):
+    rb = _buffer(pg_conn, tmp_path, max_pending=2)
+    rb.start()
+    try:
+        # Keep the flusher from draining the buffer while we fill it
+        with rb._flush_lock:
+            rb.submit(1, 1.0, None)
+            rb.submit(1, 1.0, None)
+            with pytest.raises(RewardBufferFull):
+                rb.submit(1, 1.0, None)
+    finally:
+        rb.stop()
+
+    assert _trials(pg_conn) == 2
+    assert pg_conn.execute(text("SELECT count(*) FROM reward_journal_segments")).scalar() == 1
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base
+from services.rewards import apply_reward
+
+N_REWARDS = 400
+WORKERS = 16
+REWARDS = [0.5, 1.25, 0.0, 9.99]
+
+
+def test_concurrent_rewards_lose_no_updates(pg_engine):
+    Base.metadata.create_all(pg_engine)
+    with pg_engine.begin() as conn:
+        conn.execute(text("INSERT INTO projects (project_id, description, number_bandits, created_at) VALUES (1, 'p', 2, now())"))
+        conn.execute(text(
+            "INSERT INTO bandits (bandit_id, project_id, price, mean, variance, reward, trial, number_explored) "
+            "VALUES (1, 1, 10, 0, 1, 0, 0, 0), (2, 1, 12, 0, 1, 0, 0, 0)"
+        ))
+    SessionTest = sessionmaker(bind=pg_engine, autoflush=False)
+
+    # Every reward hits one of two hot rows, so the updates race on the same bandits
+    events = [(1 + i % 2, REWARDS[i % len(REWARDS)]) for i in range(N_REWARDS)]
+
+    def send(event):
+        with SessionTest() as db:
+            assert apply_reward(db, event[0], event[1], "concurrency_test") is not None
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        list(pool.map(send, events))
+
+    with pg_engine.connect() as conn:
+        stored = {r.bandit_id: r for r in conn.execute(text("SELECT bandit_id, trial, reward FROM bandits"))}
+        logged = conn.execute(text("SELECT count(*) FROM experiments")).scalar()
+    for bandit_id in (1, 2):
+        sent = [reward for b_id, reward in events if b_id == bandit_id]
+        assert stored[bandit_id].trial == len(sent)
+        assert stored[bandit_id].reward == sum((Decimal(str(r)) for r in sent), Decimal(0))
+    assert logged == N_REWARDS
@@ -0,0 +1,62 @@
+import json
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.models import Base
+from services.rewards import REWARD_MAX_ABS, apply_reward_batch, parse_reward_events, to_decimal
+
+
+def _parse(*events):
+    return parse_reward_events(json.dumps(list(events)).encode())
+
+
+def test_parse_accepts_integer_ids_and_numeric_rewards():
+    bandit_ids, rewards, decisions = _parse({"bandit_id": 3, "reward": 9.99, "decision": "buy"}, {"bandit_id": 4, "reward": 0})
+    assert bandit_ids.tolist() == [3, 4]
+    assert np.array_equal(rewards, [9.99, 0.0])
+    assert decisions == ["buy", "bulk"]
+
+
+@pytest.mark.parametrize("event", [
+    {"bandit_id": 1.9, "reward": 1},
+    {"bandit_id": "1", "reward": 1},
+    {"bandit_id": True, "reward": 1},
+    {"bandit_id": 2**63, "reward": 1},
+    {"bandit_id": 1, "reward": "3"},
+    {"bandit_id": 1, "reward": False},
+    {"bandit_id": 1, "reward": REWARD_MAX_ABS * 2},
+    {"bandit_id": 1},
+])
+def test_parse_rejects_malformed_events(event):
+    with pytest.raises(ValueError):
+        _parse(event)
+
+
+def test_parse_rejects_non_finite_rewards():
+    with pytest.raises(ValueError):
+        parse_reward_events(b'{"bandit_id": 1, "reward": NaN}', ndjson=True)
+
+
+def test_single_rewards_are_quantized_to_micro_units():
+    assert to_decimal(9.99) == Decimal("9.99")
+    assert to_decimal(0.1234567) == Decimal("0.123457")
+
+
+def test_bulk_log_matches_bandit_sum(pg_conn):
+    Base.metadata.create_all(pg_conn)
+    pg_conn.execute(text("INSERT INTO projects (project_id, description, number_bandits, created_at) VALUES (1, 'p', 1, now())"))
+    pg_conn.execute(text(
+        "INSERT INTO bandits (bandit_id, project_id, price, mean, variance, reward, trial, number_explored) "
+        "VALUES (1, 1, 10, 0, 1, 0, 0, 0)"
+    ))
+    db = Session(bind=pg_conn, join_transaction_mode="create_savepoint")
+
+    apply_reward_batch(db, np.array([1, 1, 1]), np.array([0.1234567, 1 / 3, 9.99]), ["x"] * 3)
+
+    logged = pg_conn.execute(text("SELECT reward FROM experiments ORDER BY experiment_id")).scalars().all()
+    assert logged == [Decimal("0.123457"), Decimal("0.333333"), Decimal("9.99")]
+    assert pg_conn.execute(text("SELECT reward FROM bandits")).scalar() == sum(logged)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.models import Base
+from services.arm_cache import ArmTable
+from services.timeseries import conversion_timeseries, lttb_indices
+
+START = datetime(2025, 11, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _project_with_timestamptz_experiments(conn):
+    """Tables as core creates them: ``experiments.start_date`` is ``timestamptz``."""
+    Base.metadata.create_all(conn)
+    conn.execute(text("ALTER TABLE experiments ALTER COLUMN start_date TYPE timestamptz"))
+    conn.execute(text("INSERT INTO projects (project_id, description, number_bandits, created_at) VALUES (1, 'p', 2, now())"))
+    conn.execute(text(
+        "INSERT INTO bandits (bandit_id, project_id, price, mean, variance, reward, trial, number_explored) "
+        "VALUES (1, 1, 10, 0, 1, 0, 0, 0), (2, 1, 20, 0, 1, 0, 0, 0)"
+    ))
+    # Bandit 1: one experiment per minute for an hour, every other one a buy
+    conn.execute(
+        text(
+            "INSERT INTO experiments (project_id, bandit_id, decision, reward, start_date) "
+            "VALUES (1, 1, 'x', :r, :t)"
+        ),
+        [{"r": 10 if i % 2 else 0, "t": START + timedelta(minutes=i)} for i in range(60)],
+    )
+    return ArmTable(
+        project_id=1,
+        bandit_ids=np.array([1, 2]),
+        prices=np.array([10.0, 20.0]),
+        means=np.zeros(2),
+        variances=np.ones(2),
+    )
+
+
+def test_timeseries_on_timestamptz_column(pg_conn):
+    table = _project_with_timestamptz_experiments(pg_conn)
+    db = Session(bind=pg_conn)
+
+    result = conversion_timeseries(db, table, points=10)
+
+    assert result["start"] == START.replace(tzinfo=None)
+    assert result["end"] == START.replace(tzinfo=None) + timedelta(minutes=59)
+    assert result["total_impressions"] == [60, 0]
+    assert result["total_conversions"] == [30, 0]
+    assert result["total_revenue"] == [300.0, 0.0]
+    assert len(result["t"][0]) == 10 and result["t"][1] == []
+    assert result["t"][0][0] == int(START.timestamp() * 1000)
+
+
+def test_timeseries_aware_bounds(pg_conn):
+    table = _project_with_timestamptz_experiments(pg_conn)
+    db = Session(bind=pg_conn)
+    # The same instant as START + 30 min, given in UTC+4
+    since = (START + timedelta(minutes=30)).astimezone(timezone(timedelta(hours=4)))
+
+    result = conversion_timeseries(db, table, points=200, since=since)
+
+    assert result["start"] == START.replace(tzinfo=None) + timedelta(minutes=30)
+    assert result["total_impressions"][0] == 30
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    kept = lttb_indices(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert np.array_equal(lttb_indices(x[:5], y[:5], 50), np.arange(5))
@@ -0,0 +1,125 @@
+"""
+Shared helpers for the benchmark scripts: latency summaries, concurrent
+request driving and JSON reports.
+"""
+
+import asyncio
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+DEFAULT_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+
+def summarize(latencies_s, elapsed_s: float | None = None) -> dict:
+    """
+    Summarize a list of request latencies (seconds) into milliseconds.
+
+    Returns count, mean, p50/p95/p99 and max, plus throughput when the
+    wall-clock duration of the run is given.
+    """
+    arr = np.asarray(latencies_s, dtype=np.float64) * 1000.0
+    if not len(arr):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    summary = {
+        "count": int(len(arr)),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = round(len(arr) / elapsed_s, 1)
+    return summary
+
+
+async def run_concurrent(jobs, concurrency: int):
+    """
+    Await every coroutine factory in ``jobs`` with at most ``concurrency`` in flight.
+
+    Returns:
+        tuple: (latencies in seconds, number of failed jobs, wall-clock seconds)
+    """
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(job):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                await job()
+            except (httpx.HTTPError, AssertionError):
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(job) for job in jobs))
+    return latencies, errors, time.perf_counter() - start
+
+
+def make_client(base_url: str, concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0)
+
+
+async def create_project(client: httpx.AsyncClient, prices, description: str = "benchmark") -> tuple[int, list[int]]:
+    """Create a project with one bandit per price; return (project_id, bandit_ids)."""
+    r = await client.post(
+        "/projects",
+        json={"description": description, "number_bandits": len(prices), "price": prices[0]},
+    )
+    r.raise_for_status()
+    project_id = r.json()["project_id"]
+    for price in prices[1:]:
+        (await client.post(f"/projects/{project_id}/bandits", json={"price": price})).raise_for_status()
+    r = await client.get(f"/projects/{project_id}/bandits")
+    r.raise_for_status()
+    return project_id, sorted(b["bandit_id"] for b in r.json())
+
+
+def write_report(path: str | None, report: dict):
+    """Print the report and optionally store it as JSON for later comparison."""
+    report.setdefault("timestamp", datetime.utcnow().isoformat())
+    report.setdefault("python", platform.python_version())
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+
+
+def compare_reports(baseline: dict, current: dict, metrics=("throughput_rps", "p50_ms", "p95_ms", "p99_ms")) -> dict:
+    """
+    Relative change of throughput and latency figures present in both reports.
+
+    Returns a mapping from the dotted path of every such figure (e.g.
+    ``endpoints.offer.p99_ms``) to its baseline and current value and the
+    change in percent.
+    """
+    def flatten(report, prefix=""):
+        for key, value in report.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{key}.")
+            elif key in metrics and isinstance(value, (int, float)):
+                yield f"{prefix}{key}", value
+
+    before = dict(flatten(baseline))
+    comparison = {}
+    for path, value in flatten(current):
+        if path in before:
+            old = before[path]
+            comparison[path] = {
+                "baseline": old,
+                "current": value,
+                "change_pct": round((value - old) / old * 100.0, 1) if old else None,
+            }
+    return comparison
@@ -0,0 +1,86 @@
+"""
+Tail latency of the database-backed hot routes at high client concurrency,
+for comparing a backend started with ``DB_ASYNC=false`` (sync routes in the
+threadpool) against one started with ``DB_ASYNC=true`` (asyncpg).
+
+Every client runs the same mix: a bandit listing (always a DB read), a
+reward (DB write) and a select (arm cache). Run it once per backend mode
+and compare the reports:
+
+Usage:
+    DB_ASYNC=false uvicorn endpoints:app ...
+    python benchmarks/db_async_load.py --label sync --output sync.json
+    DB_ASYNC=true uvicorn endpoints:app ...
+    python benchmarks/db_async_load.py --label async --output async.json
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from common import DEFAULT_URL, create_project, make_client, summarize, write_report
+
+
+async def main(args):
+    async with make_client(args.url, args.concurrency) as client:
+        project_id, bandit_ids = await create_project(client, args.prices, "async db benchmark")
+
+        latencies = {"list": [], "reward": [], "select": []}
+        errors = {name: Counter() for name in latencies}
+
+        async def timed(name, request):
+            start = time.perf_counter()
+            try:
+                r = await request
+                error = None if r.status_code == 200 else f"HTTP {r.status_code}"
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            if error is None:
+                latencies[name].append(time.perf_counter() - start)
+            else:
+                errors[name][error] += 1
+
+        async def worker():
+            for _ in range(args.rounds):
+                await timed("list", client.get(f"/projects/{project_id}/bandits"))
+                await timed("reward", client.post(
+                    f"/bandits/{random.choice(bandit_ids)}/thompson/reward",
+                    json={"reward": random.choice((0.0, 9.99)), "decision": "buy"},
+                ))
+                await timed("select", client.post(f"/projects/{project_id}/thompson/select"))
+
+        # All clients start together, i.e. one burst of --concurrency connections
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = {
+        name: {"errors": sum(errors[name].values()), "error_kinds": dict(errors[name]), **summarize(lat, elapsed)}
+        for name, lat in latencies.items()
+    }
+    write_report(args.output, {
+        "benchmark": "db_async_load",
+        "label": args.label,
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "rounds_per_client": args.rounds,
+        "elapsed_s": round(elapsed, 2),
+        **results,
+    })
+    return 1 if any(sum(e.values()) for e in errors.values()) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--label", default="", help="backend mode under test, e.g. sync or async")
+    parser.add_argument("--concurrency", type=int, default=1000, help="concurrent client connections")
+    parser.add_argument("--rounds", type=int, default=5, help="list/reward/select rounds per client")
+    parser.add_argument("--prices", type=float, nargs="+", default=[9.99, 14.99, 19.99])
+    parser.add_argument("--output", help="write the JSON report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
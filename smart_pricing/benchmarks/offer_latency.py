@@ -0,0 +1,67 @@
+"""
+Storefront offer latency: three round trips versus ``POST /offer``.
+
+The legacy customer page loads an offer with ``GET /projects`` (taking the
+first, i.e. newest, project), ``POST /projects/{id}/thompson/select`` and
+``GET /projects/{id}``. This script times that sequence against the single
+``POST /offer`` call under the same concurrency.
+
+Usage:
+    python benchmarks/offer_latency.py --offers 3000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import sys
+
+from common import DEFAULT_URL, create_project, make_client, run_concurrent, summarize, write_report
+
+
+async def legacy_offer(client):
+    r = await client.get("/projects")
+    assert r.status_code == 200, r.text
+    project_id = r.json()[0]["project_id"]
+    r = await client.post(f"/projects/{project_id}/thompson/select")
+    assert r.status_code == 200, r.text
+    await client.get(f"/projects/{project_id}")
+
+
+async def one_shot_offer(client):
+    r = await client.post("/offer")
+    assert r.status_code == 200, r.text
+
+
+async def main(args):
+    async with make_client(args.url, args.concurrency) as client:
+        # Background projects make the legacy full listing realistically large
+        for i in range(args.extra_projects):
+            await create_project(client, [9.99], f"offer benchmark filler {i}")
+        project_id, _ = await create_project(client, args.prices, "offer benchmark")
+
+        results = {}
+        for name, fn in (("legacy_three_calls", legacy_offer), ("offer_endpoint", one_shot_offer)):
+            latencies, errors, elapsed = await run_concurrent([lambda: fn(client)] * args.offers, args.concurrency)
+            results[name] = {"errors": errors, **summarize(latencies, elapsed)}
+
+    write_report(args.output, {
+        "benchmark": "offer_latency",
+        "url": args.url,
+        "project_id": project_id,
+        "projects_listed": args.extra_projects + 1,
+        "offers": args.offers,
+        "concurrency": args.concurrency,
+        **results,
+    })
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--offers", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--extra-projects", type=int, default=50,
+                        help="additional projects created first, so GET /projects is not trivially small")
+    parser.add_argument("--prices", type=float, nargs="+", default=[9.99, 14.99, 19.99])
+    parser.add_argument("--output", help="write the JSON report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
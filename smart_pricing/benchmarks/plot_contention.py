@@ -0,0 +1,74 @@
+"""
+Select latency with and without concurrent posterior-plot traffic.
+
+Runs the same select load twice against one project: once alone, and once
+while ``--plot-clients`` clients keep requesting uncached plots (a different
+width each time, so every request is a real render). If plot rendering
+competes with the API process for the GIL or the threadpool, the second
+run's select latencies grow.
+
+Usage:
+    python benchmarks/plot_contention.py --selects 3000 --concurrency 50 --plot-clients 4
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from common import DEFAULT_URL, create_project, make_client, run_concurrent, summarize, write_report
+
+
+async def select_load(client, project_id: int, selects: int, concurrency: int) -> dict:
+    async def job():
+        r = await client.post(f"/projects/{project_id}/thompson/select")
+        assert r.status_code == 200, r.text
+
+    latencies, errors, elapsed = await run_concurrent([job] * selects, concurrency)
+    return {"errors": errors, **summarize(latencies, elapsed)}
+
+
+async def plot_load(client, project_id: int, stop: asyncio.Event, stats: dict):
+    width = 4.0
+    while not stop.is_set():
+        width = 4.0 + (width - 3.99) % 12  # new cache key per request
+        start = time.perf_counter()
+        r = await client.get(f"/projects/{project_id}/thompson/plot", params={"width": round(width, 2)})
+        stats.setdefault(r.status_code, []).append(time.perf_counter() - start)
+
+
+async def main(args):
+    async with make_client(args.url, args.concurrency + args.plot_clients) as client:
+        project_id, _ = await create_project(client, args.prices, "plot contention benchmark")
+
+        baseline = await select_load(client, project_id, args.selects, args.concurrency)
+
+        stop, stats = asyncio.Event(), {}
+        plotters = [asyncio.create_task(plot_load(client, project_id, stop, stats)) for _ in range(args.plot_clients)]
+        contended = await select_load(client, project_id, args.selects, args.concurrency)
+        stop.set()
+        await asyncio.gather(*plotters)
+
+    write_report(args.output, {
+        "benchmark": "plot_contention",
+        "url": args.url,
+        "project_id": project_id,
+        "selects": args.selects,
+        "concurrency": args.concurrency,
+        "plot_clients": args.plot_clients,
+        "select_alone": baseline,
+        "select_with_plots": contended,
+        "plots": {str(code): summarize(lat) for code, lat in stats.items()},
+    })
+    return 1 if baseline["errors"] or contended["errors"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--selects", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--plot-clients", type=int, default=4)
+    parser.add_argument("--prices", type=float, nargs="+", default=[9.99, 14.99, 19.99, 24.99, 29.99])
+    parser.add_argument("--output", help="write the JSON report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
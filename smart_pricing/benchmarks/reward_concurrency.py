@@ -0,0 +1,96 @@
+"""
+Concurrency stress test for reward submission.
+
+Fires thousands of parallel ``POST /bandits/{id}/thompson/reward`` calls at a
+running backend, concentrated on a few hot arms, then checks that every
+bandit's ``trial`` and ``reward`` totals match what was sent exactly. Any
+lost update makes the script exit with status 1.
+
+Usage:
+    python benchmarks/reward_concurrency.py --url http://localhost:8000 --rewards 5000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+from common import DEFAULT_URL, create_project, make_client, run_concurrent, summarize, write_report
+
+
+async def main(args):
+    rng = np.random.default_rng(args.seed)
+    prices = [round(float(p), 2) for p in args.prices]
+
+    async with make_client(args.url, args.concurrency) as client:
+        project_id, bandit_ids = await create_project(client, prices, "reward concurrency benchmark")
+
+        arms = rng.integers(0, len(bandit_ids), size=args.rewards)
+        buys = rng.random(args.rewards) < args.buy_probability
+
+        expected_trials = {b: 0 for b in bandit_ids}
+        expected_reward = {b: Decimal(0) for b in bandit_ids}
+        jobs = []
+        for arm, buy in zip(arms, buys):
+            bandit_id = bandit_ids[arm]
+            reward = prices[arm] if buy else 0.0
+            expected_trials[bandit_id] += 1
+            expected_reward[bandit_id] += Decimal(str(reward))
+
+            async def job(bandit_id=bandit_id, reward=reward):
+                r = await client.post(
+                    f"/bandits/{bandit_id}/thompson/reward",
+                    json={"reward": reward, "decision": "stress_test"},
+                )
+                assert r.status_code == 200, r.text
+
+            jobs.append(job)
+
+        latencies, errors, elapsed = await run_concurrent(jobs, args.concurrency)
+        # Give a write-behind backend time to flush before checking totals
+        await asyncio.sleep(args.settle_seconds)
+
+        r = await client.get(f"/projects/{project_id}/bandits")
+        r.raise_for_status()
+        actual = {b["bandit_id"]: b for b in r.json()}
+
+    mismatches = []
+    for bandit_id in bandit_ids:
+        got_trials = int(actual[bandit_id]["trial"])
+        got_reward = Decimal(str(actual[bandit_id]["reward"]))
+        if got_trials != expected_trials[bandit_id] or got_reward != expected_reward[bandit_id]:
+            mismatches.append({
+                "bandit_id": bandit_id,
+                "expected_trials": expected_trials[bandit_id],
+                "actual_trials": got_trials,
+                "expected_reward": expected_reward[bandit_id],
+                "actual_reward": got_reward,
+            })
+
+    write_report(args.output, {
+        "benchmark": "reward_concurrency",
+        "url": args.url,
+        "project_id": project_id,
+        "rewards": args.rewards,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "latency": summarize(latencies, elapsed),
+        "lost_updates": sum(e["expected_trials"] - e["actual_trials"] for e in mismatches),
+        "mismatches": mismatches,
+    })
+    return 1 if mismatches or errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--rewards", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--prices", type=float, nargs="+", default=[9.99, 14.99, 19.99])
+    parser.add_argument("--buy-probability", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--settle-seconds", type=float, default=0.0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -21,10 +21,31 @@ def get_database_url():
 
     return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}"
 
+def pool_options_from_env() -> dict:
+    """
+    Pool settings shared with the backend (see backend/database/pool.py).
+    DB_POOL_PRE_PING=idle is treated like "always" here.
+
+    Same function as in ds/database/database.py; core and ds are separate images and
+    cannot import each other, so change both together
+    (ds/tests/test_database.py checks that they agree).
+    """
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "always").lower() != "never",
+    }
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout_ms > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return options
+
 def create_engine_from_env(echo=False):
     global engine
     if engine is None:
         url = get_database_url()
-        engine = create_engine(url, echo=echo)
+        engine = create_engine(url, echo=echo, **pool_options_from_env())
         SessionLocal.configure(bind=engine)
     return engine
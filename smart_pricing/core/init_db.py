@@ -1,10 +1,18 @@
 from config import create_engine_from_env
-from models import Base
+from models import Base, BANDIT_STATS_STORAGE
+import migrations
 
 def main():
     engine = create_engine_from_env(echo=True)
     Base.metadata.create_all(engine)
     print("Database tables successfully created.")
 
+    # Bring existing databases up to date (columns, indexes created concurrently)
+    applied = migrations.upgrade(engine)
+    print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
+
+    # Match the statistics column type to BANDIT_STATS_STORAGE (no-op if already)
+    migrations.set_stats_storage(engine, BANDIT_STATS_STORAGE)
+
 if __name__ == "__main__": 
     main()
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Database migration CLI.
+
+Usage:
+    python -m migrate            # apply pending migrations
+    python -m migrate status     # list migrations and whether they are applied
+    python -m migrate stats-storage double|numeric
+                                 # convert bandits.mean/variance storage
+"""
+
+import argparse
+
+from config import create_engine_from_env
+import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations.")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status", "stats-storage"], default="upgrade")
+    parser.add_argument("storage", nargs="?", choices=["numeric", "double"],
+                        help="target storage for stats-storage")
+    args = parser.parse_args()
+    if args.command == "stats-storage" and args.storage is None:
+        parser.error("stats-storage requires a target: numeric or double")
+
+    engine = create_engine_from_env()
+    if args.command == "status":
+        for revision, description, applied in migrations.status(engine):
+            print(f"{revision}  {'applied' if applied else 'pending':8}  {description}")
+        with engine.connect() as conn:
+            print(f"bandit stats storage: {migrations.current_stats_storage(conn)}")
+    elif args.command == "stats-storage":
+        changed = migrations.set_stats_storage(engine, args.storage)
+        print(f"Converted to {args.storage}." if changed else f"Already {args.storage}.")
+    else:
+        applied = migrations.upgrade(engine)
+        print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+from .runner import upgrade, status, discover, create_index_concurrently
+from .stats_storage import current_stats_storage, set_stats_storage
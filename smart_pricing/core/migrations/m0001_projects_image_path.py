@@ -0,0 +1,16 @@
+"""
+Add ``projects.image_path``.
+
+The backend stores uploaded product images there, but the column was
+missing from the schema created by core.
+"""
+
+from sqlalchemy import text
+
+REVISION = "0001"
+DESCRIPTION = "add projects.image_path"
+TRANSACTIONAL = True
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE projects ADD COLUMN IF NOT EXISTS image_path VARCHAR"))
@@ -0,0 +1,34 @@
+"""
+Secondary indexes for the API's hot queries.
+
+Built with ``CREATE INDEX CONCURRENTLY`` so they can be added to a live
+database without blocking reward writes.
+
+- ``projects (created_at, project_id)``: newest-first listing / keyset pages
+  and the storefront's default project.
+- ``bandits (project_id, bandit_id)``: arm table loads and bandit listing.
+- ``experiments (project_id, start_date)`` and
+  ``experiments (bandit_id, start_date)``: per-project / per-bandit history
+  and time windows.
+- BRIN on ``experiments (start_date)``: date-range analytics over the whole
+  table; tiny because rows are appended in time order.
+"""
+
+from .runner import create_index_concurrently
+
+REVISION = "0002"
+DESCRIPTION = "hot-path indexes on projects, bandits and experiments"
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_projects_created_at", "projects", "created_at, project_id", "btree"),
+    ("ix_bandits_project_id", "bandits", "project_id, bandit_id", "btree"),
+    ("ix_experiments_project_id_start_date", "experiments", "project_id, start_date", "btree"),
+    ("ix_experiments_bandit_id_start_date", "experiments", "bandit_id, start_date", "btree"),
+    ("brin_experiments_start_date", "experiments", "start_date", "brin"),
+]
+
+
+def upgrade(conn):
+    for name, table, definition, using in INDEXES:
+        create_index_concurrently(conn, name, table, definition, using)
@@ -0,0 +1,35 @@
+"""
+Checkpoint tables of the experiments replay (``ds/replay.py``).
+
+- ``replay_checkpoints``: per project, the last ``experiment_id`` already
+  folded into the replayed totals.
+- ``replay_bandit_totals``: per bandit, trial count and exact reward sum of
+  all experiments up to that checkpoint. A later rebuild only aggregates
+  newer experiments and adds them to these totals.
+
+Both cascade with their project or bandit.
+"""
+
+from sqlalchemy import text
+
+REVISION = "0003"
+DESCRIPTION = "replay checkpoint tables"
+TRANSACTIONAL = True
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS replay_checkpoints (
+            project_id INTEGER PRIMARY KEY REFERENCES projects (project_id) ON DELETE CASCADE,
+            last_experiment_id BIGINT NOT NULL,
+            replayed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS replay_bandit_totals (
+            bandit_id INTEGER PRIMARY KEY REFERENCES bandits (bandit_id) ON DELETE CASCADE,
+            project_id INTEGER NOT NULL,
+            trial BIGINT NOT NULL,
+            reward NUMERIC NOT NULL
+        )
+    """))
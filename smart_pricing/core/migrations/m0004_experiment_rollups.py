@@ -0,0 +1,42 @@
+"""
+Time-bucketed experiment rollups maintained by ``ds/rollups.py``.
+
+- ``experiment_rollups``: per grain (``minute``, ``hour``, ``day``), bucket
+  start, project and bandit, the number of experiments (impressions), those
+  with a positive reward (conversions), the reward sum (revenue) and the sum
+  of squared rewards. Mean and variance of a bucket follow from these.
+- ``rollup_watermarks``: the last ``experiment_id`` already folded into the
+  rollups, per pipeline.
+
+The primary key leads with ``(grain, project_id, bucket)``, which is the
+shape of a dashboard query. Rows cascade with their project.
+"""
+
+from sqlalchemy import text
+
+REVISION = "0004"
+DESCRIPTION = "experiment rollup tables"
+TRANSACTIONAL = True
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS experiment_rollups (
+            grain VARCHAR(6) NOT NULL CHECK (grain IN ('minute', 'hour', 'day')),
+            bucket TIMESTAMP NOT NULL,
+            project_id INTEGER NOT NULL REFERENCES projects (project_id) ON DELETE CASCADE,
+            bandit_id INTEGER NOT NULL,
+            impressions BIGINT NOT NULL,
+            conversions BIGINT NOT NULL,
+            revenue NUMERIC NOT NULL,
+            revenue_sq NUMERIC NOT NULL,
+            PRIMARY KEY (grain, project_id, bucket, bandit_id)
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS rollup_watermarks (
+            name VARCHAR PRIMARY KEY,
+            last_experiment_id BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
@@ -0,0 +1,22 @@
+"""
+Commit markers of the backend's reward journal (``services/reward_buffer.py``).
+
+Every flush of journaled rewards records its segment names in
+``reward_journal_segments`` in the same transaction. A segment that is
+found there on replay has already been applied and is only deleted.
+"""
+
+from sqlalchemy import text
+
+REVISION = "0005"
+DESCRIPTION = "reward journal segment markers"
+TRANSACTIONAL = True
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS reward_journal_segments (
+            segment VARCHAR PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+    """))
@@ -0,0 +1,114 @@
+"""
+Minimal forward-only migration runner.
+
+Every migration is a module ``mNNNN_<name>.py`` in this package defining:
+
+    REVISION = "NNNN"
+    DESCRIPTION = "..."
+    TRANSACTIONAL = True   # False for CREATE INDEX CONCURRENTLY and friends
+    def upgrade(conn): ...
+
+Applied revisions are recorded in ``schema_migrations``. Transactional
+migrations run inside one transaction together with their bookkeeping row.
+Non-transactional ones run on an AUTOCOMMIT connection, so they must be
+idempotent (``IF NOT EXISTS``). If one fails halfway it is simply re-run
+next time. A session-level advisory lock keeps concurrent runners (e.g. two
+containers starting at once) from applying the same migration twice.
+"""
+
+import importlib
+import pkgutil
+
+from sqlalchemy import text
+
+MIGRATIONS_LOCK_ID = 727_2025
+
+CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+
+def discover():
+    """Return all migration modules sorted by revision."""
+    package = importlib.import_module(__package__)
+    modules = [
+        importlib.import_module(f"{__package__}.{info.name}")
+        for info in pkgutil.iter_modules(package.__path__)
+        if info.name.startswith("m") and info.name[1:5].isdigit()
+    ]
+    return sorted(modules, key=lambda m: m.REVISION)
+
+
+def applied_versions(conn) -> set[str]:
+    conn.execute(text(CREATE_VERSION_TABLE))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def status(engine) -> list[tuple[str, str, bool]]:
+    """Return ``(revision, description, applied)`` for every known migration."""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [(m.REVISION, m.DESCRIPTION, m.REVISION in done) for m in discover()]
+
+
+def upgrade(engine, log=print) -> list[str]:
+    """
+    Apply all pending migrations in revision order.
+
+    Returns:
+        list[str]: Revisions applied by this call.
+    """
+    applied = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        # Index builds and table rewrites may legitimately exceed DB_STATEMENT_TIMEOUT_MS
+        lock_conn.execute(text("SET statement_timeout = 0"))
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+        try:
+            done = applied_versions(lock_conn)
+            for migration in discover():
+                if migration.REVISION in done:
+                    continue
+                log(f"Applying migration {migration.REVISION}: {migration.DESCRIPTION}")
+                if migration.TRANSACTIONAL:
+                    with engine.begin() as conn:
+                        conn.execute(text("SET LOCAL statement_timeout = 0"))
+                        migration.upgrade(conn)
+                        _record(conn, migration)
+                else:
+                    migration.upgrade(lock_conn)
+                    _record(lock_conn, migration)
+                applied.append(migration.REVISION)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+    return applied
+
+
+def _record(conn, migration):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+        {"v": migration.REVISION, "d": migration.DESCRIPTION},
+    )
+
+
+def create_index_concurrently(conn, name: str, table: str, definition: str, using: str = "btree"):
+    """
+    Build an index without blocking writes to ``table``.
+
+    ``conn`` must be in AUTOCOMMIT mode. An INVALID index left behind by an
+    interrupted earlier build is dropped and rebuilt, since ``IF NOT EXISTS``
+    alone would keep it.
+    """
+    invalid = conn.execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first()
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING {using} ({definition})"))
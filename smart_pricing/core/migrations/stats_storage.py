@@ -0,0 +1,69 @@
+"""
+Switch the storage type of the bandit statistics columns.
+
+``bandits.mean`` and ``bandits.variance`` can be stored as exact ``NUMERIC``
+(default) or as ``double precision``. The backend recomputes the mean from
+the exact ``NUMERIC`` reward sum on every update, so float storage never
+accumulates rounding drift; prices and reward sums are not converted.
+
+This is a data migration selected by configuration (``BANDIT_STATS_STORAGE``)
+rather than a numbered revision, since it can be applied in either direction.
+Both columns are rewritten in one ``ALTER TABLE``, which holds an exclusive
+lock on ``bandits`` for the duration of the (small) table rewrite.
+"""
+
+from sqlalchemy import text
+
+STATS_COLUMNS = ("mean", "variance")
+STORAGE_TYPES = {"numeric": "numeric", "double": "double precision"}
+
+
+def current_stats_storage(conn) -> str | None:
+    """Return ``"numeric"`` or ``"double"``, or None if ``bandits`` does not exist."""
+    types = {
+        row.column_name: row.data_type
+        for row in conn.execute(
+            text(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'bandits' "
+                "AND column_name = ANY(:columns)"
+            ),
+            {"columns": list(STATS_COLUMNS)},
+        )
+    }
+    if not types:
+        return None
+    return "double" if all(t == "double precision" for t in types.values()) else "numeric"
+
+
+def set_stats_storage(engine, storage: str, lock_timeout: str = "5s", log=print) -> bool:
+    """
+    Convert the statistics columns to ``storage`` (``"numeric"`` or ``"double"``).
+
+    Values are cast in place; converting back to ``NUMERIC`` keeps the
+    float8 values as written (they are re-derived from the exact reward sum
+    on the next update of each arm).
+
+    Returns:
+        bool: True if the columns were converted, False if already in place.
+
+    Raises:
+        ValueError: If ``storage`` is not a known storage type.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"unknown stats storage {storage!r}, expected one of {sorted(STORAGE_TYPES)}")
+    sql_type = STORAGE_TYPES[storage]
+
+    with engine.begin() as conn:
+        current = current_stats_storage(conn)
+        if current is None or current == storage:
+            return False
+        log(f"Converting bandits.{'/'.join(STATS_COLUMNS)} from {current} to {storage}")
+        # Give up instead of queueing every API request behind a long transaction
+        conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text(
+            "ALTER TABLE bandits "
+            + ", ".join(f"ALTER COLUMN {c} TYPE {sql_type} USING {c}::{sql_type}" for c in STATS_COLUMNS)
+        ))
+    return True
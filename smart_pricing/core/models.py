@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Text
+import os
+
+from sqlalchemy import Column, Integer, String, Numeric, Double, ForeignKey, DateTime, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -6,6 +8,11 @@ from pytz import timezone
 
 Base = declarative_base()
 
+# "numeric" (default) or "double"; must match the backend's setting.
+# See migrations/stats_storage.py for converting an existing database.
+BANDIT_STATS_STORAGE = os.getenv("BANDIT_STATS_STORAGE", "numeric").lower()
+StatsType = Double if BANDIT_STATS_STORAGE == "double" else Numeric
+
 def get_yerevan_time():
     yerevan_tz = timezone("Asia/Yerevan")
     return datetime.now(yerevan_tz)
@@ -20,9 +27,11 @@ class User(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (Index("ix_projects_created_at", "created_at", "project_id"),)
 
     project_id = Column(Integer, primary_key=True, autoincrement=True)
     description = Column(Text, nullable=False)
+    image_path = Column(String, nullable=True)
     number_bandits = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), default=get_yerevan_time)
     optimal_price = Column(Numeric, nullable=True)
@@ -33,12 +42,13 @@ class Project(Base):
 
 class Bandit(Base):
     __tablename__ = "bandits"
+    __table_args__ = (Index("ix_bandits_project_id", "project_id", "bandit_id"),)
 
     bandit_id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
     price = Column(Numeric, nullable=False)
-    mean = Column(Numeric, nullable=False, default=0.0)
-    variance = Column(Numeric, nullable=False, default=1.0)
+    mean = Column(StatsType, nullable=False, default=0.0)
+    variance = Column(StatsType, nullable=False, default=1.0)
     reward = Column(Numeric, nullable=False, default=0.0)
     trial = Column(Integer, nullable=False, default=0)
     number_explored = Column(Integer, nullable=False, default=0)
@@ -49,6 +59,11 @@ class Bandit(Base):
 
 class Experiment(Base):
     __tablename__ = "experiments"
+    __table_args__ = (
+        Index("ix_experiments_project_id_start_date", "project_id", "start_date"),
+        Index("ix_experiments_bandit_id_start_date", "bandit_id", "start_date"),
+        Index("brin_experiments_start_date", "start_date", postgresql_using="brin"),
+    )
 
     experiment_id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
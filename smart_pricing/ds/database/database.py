@@ -11,7 +11,28 @@ def get_db_url():
 
     return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}"
 
-engine = create_engine(get_db_url(), pool_pre_ping=True)
+def pool_options_from_env() -> dict:
+    """
+    Pool settings shared with the backend (see backend/database/pool.py).
+    DB_POOL_PRE_PING=idle is treated like "always" here.
+
+    Same function as in core/config.py; core and ds are separate images and
+    cannot import each other, so change both together
+    (ds/tests/test_database.py checks that they agree).
+    """
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "always").lower() != "never",
+    }
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout_ms > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return options
+
+engine = create_engine(get_db_url(), **pool_options_from_env())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -0,0 +1,161 @@
+"""
+Export the experiments log to Parquet, Arrow IPC or CSV with flat memory.
+
+Experiments are read through a server-side cursor (``yield_per``) and
+written one record batch at a time, so memory use does not depend on the
+size of the export. The same export is served by the backend at
+``GET /experiments/export``; this CLI writes straight to a file instead.
+
+Usage:
+    python export.py experiments.parquet
+    python export.py p3.arrows --format arrow --project 3 --since 2025-11-01
+    python export.py all.csv.gz --format csv --compression gzip
+"""
+
+import argparse
+import csv
+import gzip
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV export still works
+    pa = pq = None
+
+CODECS = {
+    "parquet": ("zstd", "snappy", "gzip", "none"),
+    "arrow": ("zstd", "lz4", "none"),
+    "csv": ("none", "gzip"),
+}
+
+COLUMNS = ("experiment_id", "project_id", "bandit_id", "decision", "reward", "start_date", "end_date")
+
+# Conversions done in SQL: decoding NUMERIC/timestamps in Python dominates a large read
+SQL_COLUMNS = {
+    "csv": "experiment_id, project_id, bandit_id, decision, reward::text, start_date::text, end_date::text",
+    "arrow": "experiment_id, project_id, bandit_id, decision, reward::float8, "
+             "(date_part('epoch', start_date) * 1000000)::bigint, (date_part('epoch', end_date) * 1000000)::bigint",
+}
+
+
+def experiment_batches(engine, fmt: str, project_id=None, since=None, until=None, batch_rows: int = 65536):
+    """Yield lists of experiment tuples in ``experiment_id`` order."""
+    where, params = [], {}
+    if project_id is not None:
+        where.append("project_id = :p")
+        params["p"] = project_id
+    if since is not None:
+        where.append("start_date >= :since")
+        params["since"] = since
+    if until is not None:
+        where.append("start_date < :until")
+        params["until"] = until
+    sql = (
+        f"SELECT {SQL_COLUMNS['csv' if fmt == 'csv' else 'arrow']} FROM experiments "
+        + (f"WHERE {' AND '.join(where)} " if where else "")
+        + "ORDER BY experiment_id"
+    )
+    with engine.connect() as conn:
+        result = conn.execute(text(sql).execution_options(yield_per=batch_rows), params)
+        for rows in result.partitions(batch_rows):
+            yield rows
+
+
+# Same schema and conversion as backend/services/export.py, which ds cannot import;
+# backend/tests/test_export.py checks that they agree
+def _schema():
+    return pa.schema([
+        ("experiment_id", pa.int64()),
+        ("project_id", pa.int32()),
+        ("bandit_id", pa.int32()),
+        ("decision", pa.string()),
+        ("reward", pa.float64()),
+        ("start_date", pa.timestamp("us")),
+        ("end_date", pa.timestamp("us")),
+    ])
+
+
+def _record_batch(rows, schema):
+    arrays = [
+        pa.array(col, type=pa.int64()).cast(field.type) if pa.types.is_timestamp(field.type)
+        else pa.array(col, type=field.type)
+        for col, field in zip(zip(*rows), schema)
+    ]
+    return pa.record_batch(arrays, schema=schema)
+
+
+def export(engine, path: str, fmt: str = "parquet", compression: str | None = None, log=print, **filters) -> int:
+    """
+    Write the selected experiments to ``path`` and return the number of rows.
+
+    Raises:
+        ValueError: If the compression does not fit the format, or pyarrow is missing.
+    """
+    compression = compression or CODECS[fmt][0]
+    if compression not in CODECS[fmt]:
+        raise ValueError(f"compression for {fmt} must be one of {', '.join(CODECS[fmt])}")
+    if fmt != "csv" and pa is None:
+        raise ValueError(f"{fmt} export needs pyarrow; use --format csv")
+
+    rows_written = 0
+    started = time.perf_counter()
+    batches = experiment_batches(engine, fmt, **filters)
+    if fmt == "csv":
+        opener = gzip.open if compression == "gzip" else open
+        with opener(path, "wt", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(COLUMNS)
+            for rows in batches:
+                writer.writerows(rows)
+                rows_written += len(rows)
+                log(f"{rows_written:,} rows ({rows_written / (time.perf_counter() - started):,.0f}/s)")
+        return rows_written
+
+    schema = _schema()
+    codec = None if compression == "none" else compression
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression=codec or "none")
+    else:
+        writer = pa.ipc.new_stream(path, schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+    with writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            rows_written += len(rows)
+            log(f"{rows_written:,} rows ({rows_written / (time.perf_counter() - started):,.0f}/s)")
+    return rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--format", choices=list(CODECS), default="parquet")
+    parser.add_argument("--compression", help="parquet: zstd|snappy|gzip|none, arrow: zstd|lz4|none, csv: none|gzip")
+    parser.add_argument("--project", type=int, help="only this project")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="experiments started at or after (UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="experiments started before (UTC)")
+    parser.add_argument("--batch-rows", type=int, default=65536, help="rows per fetch and per record batch")
+    parser.add_argument("--quiet", action="store_true", help="no per-batch progress")
+    args = parser.parse_args()
+
+    from database.database import engine
+
+    started = time.perf_counter()
+    try:
+        n = export(
+            engine, args.output, args.format, args.compression,
+            log=(lambda msg: None) if args.quiet else print,
+            project_id=args.project, since=args.since, until=args.until, batch_rows=args.batch_rows,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"wrote {n:,} experiments to {args.output} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Monte Carlo regret study of Thompson Sampling configurations.
+
+Compares price grids, priors and demand curves offline, without a database.
+Each configuration is simulated ``replications`` times for ``horizon``
+customers, with the same Gaussian model as the backend (mean = reward sum /
+trials, variance = 1 / trials). Optionally a prior counts as
+``prior_trials`` pseudo-observations of ``prior_mean``. A customer buys with
+the probability the demand curve gives for the offered price, and a buy
+earns the price.
+
+For every configuration the study reports percentiles of:
+
+- cumulative expected regret against always offering the best price, at
+  the end and along the horizon
+- time to convergence: the number of customers after which the price with
+  the highest posterior mean (the project's ``optimal_price``) is the true
+  best price and stays so until the end. Runs that have not converged by
+  the end count as infinite; ``converged_pct`` reports how many did.
+
+Replications run in chunks on a process pool across all cores. The
+replications of one chunk are simulated together as NumPy arrays. Every
+chunk gets its own random stream from ``SeedSequence(seed).spawn``, so a
+study is reproducible for a given seed and chunk size, whatever the number
+of workers. Workers write their results straight into shared-memory arrays.
+
+Usage:
+    python regret.py --grid 9.99,14.99,19.99 --grid 12,15,18,21 --prior-trials 0 5 \\
+        --replications 2000 --horizon 20000 --output study.json
+
+Library:
+    from regret import DemandCurve, StudyConfig, run_study
+    report = run_study([StudyConfig("a", [9.99, 14.99], DemandCurve())], replications=500, horizon=5000)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import product
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Same floor as the backend (services/arm_cache.py)
+MIN_VARIANCE = 1e-4
+
+
+@dataclass
+class DemandCurve:
+    """
+    Buy probability as a function of the price (as the backend's ``DemandCurve``).
+
+    Attributes:
+        kind (str): ``logistic``, ``exponential``, ``linear`` or ``points``.
+        max_probability (float): Buy probability at a price of zero.
+        steepness (float): How quickly demand falls with the price.
+        reference_price (float | None): Logistic midpoint; defaults to the mean grid price.
+        choke_price (float | None): Price where linear demand reaches zero;
+            defaults to twice the highest grid price.
+        prices (list[float] | None): Support points of a ``points`` curve.
+        probabilities (list[float] | None): Buy probability at each support point.
+    """
+    kind: str = "logistic"
+    max_probability: float = 0.5
+    steepness: float = 0.2
+    reference_price: float | None = None
+    choke_price: float | None = None
+    prices: list[float] | None = None
+    probabilities: list[float] | None = None
+
+    def buy_probabilities(self, prices: np.ndarray) -> np.ndarray:
+        if self.kind == "logistic":
+            reference = self.reference_price if self.reference_price is not None else prices.mean()
+            p = self.max_probability / (1.0 + np.exp(self.steepness * (prices - reference)))
+        elif self.kind == "exponential":
+            p = self.max_probability * np.exp(-self.steepness * prices)
+        elif self.kind == "linear":
+            choke = self.choke_price if self.choke_price is not None else 2.0 * prices.max()
+            p = self.max_probability * (1.0 - prices / choke)
+        elif self.kind == "points":
+            p = np.interp(prices, self.prices, self.probabilities)
+        else:
+            raise ValueError(f"unknown demand curve {self.kind!r}")
+        return np.clip(p, 0.0, 1.0)
+
+
+@dataclass
+class StudyConfig:
+    """
+    One candidate configuration.
+
+    Attributes:
+        name (str): Label in the report.
+        prices (list[float]): Price grid (one bandit per price).
+        demand (DemandCurve): True demand the customers follow.
+        prior_mean (float): Posterior mean of an arm without trials.
+        prior_variance (float): Posterior variance of an arm without trials.
+        prior_trials (float): Pseudo-observations of ``prior_mean``; 0 is the backend's behaviour.
+    """
+    name: str
+    prices: list[float]
+    demand: DemandCurve = field(default_factory=DemandCurve)
+    prior_mean: float = 0.0
+    prior_variance: float = 1.0
+    prior_trials: float = 0.0
+
+
+# ======================================================
+#  SIMULATION KERNEL
+# ======================================================
+def simulate_replications(
+    config: StudyConfig,
+    n_replications: int,
+    horizon: int,
+    batch_size: int,
+    checkpoints: np.ndarray,
+    rng: np.random.Generator,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate independent replications of one configuration side by side.
+
+    Returns:
+        tuple: cumulative regret at each checkpoint, shape ``(replications, len(checkpoints))``,
+        and time to convergence per replication (``inf`` if not converged).
+    """
+    prices = np.asarray(config.prices, dtype=np.float64)
+    buy_prob = config.demand.buy_probabilities(prices)
+    expected = prices * buy_prob
+    gap = expected.max() - expected
+    best_arm = int(expected.argmax())
+
+    R, A = n_replications, len(prices)
+    offsets = (np.arange(R) * A)[:, None]
+    trials = np.zeros((R, A), dtype=np.int64)
+    rewards = np.zeros((R, A), dtype=np.float64)
+    means = np.full((R, A), config.prior_mean, dtype=np.float64)
+    stds = np.full((R, A), np.sqrt(config.prior_variance), dtype=np.float64)
+
+    regret = np.zeros(R, dtype=np.float64)
+    curve = np.empty((R, len(checkpoints)), dtype=np.float64)
+    last_wrong = np.zeros(R, dtype=np.float64)
+
+    done, next_checkpoint = 0, 0
+    while done < horizon:
+        n = min(batch_size, horizon - done)
+        # (replications, n, arms) posterior draws; the winner of each row is offered
+        winners = (rng.standard_normal((R, n, A)) * stds[:, None, :] + means[:, None, :]).argmax(axis=2)
+        bought = rng.random((R, n)) < buy_prob[winners]
+
+        flat = (winners + offsets).ravel()
+        picks = np.bincount(flat, minlength=R * A).reshape(R, A)
+        sales = np.bincount(flat[bought.ravel()], minlength=R * A).reshape(R, A)
+        trials += picks
+        rewards += sales * prices
+
+        weight = trials + config.prior_trials
+        observed = weight > 0
+        safe = np.where(observed, weight, 1.0)
+        means = np.where(observed, (config.prior_trials * config.prior_mean + rewards) / safe, config.prior_mean)
+        stds = np.where(observed, np.sqrt(np.maximum(1.0 / safe, MIN_VARIANCE)), np.sqrt(config.prior_variance))
+
+        regret += picks @ gap
+        done += n
+        last_wrong[means.argmax(axis=1) != best_arm] = done
+        while next_checkpoint < len(checkpoints) and checkpoints[next_checkpoint] <= done:
+            curve[:, next_checkpoint] = regret
+            next_checkpoint += 1
+
+    convergence = np.where(last_wrong >= horizon, np.inf, last_wrong)
+    return curve, convergence
+
+
+# ======================================================
+#  PROCESS POOL + SHARED MEMORY
+# ======================================================
+_shared = {}
+
+
+def _attach(regret_name: str, regret_shape: tuple, convergence_name: str, convergence_shape: tuple):
+    """Pool initializer: map the shared result arrays into this worker."""
+    for key, name, shape in (("regret", regret_name, regret_shape), ("convergence", convergence_name, convergence_shape)):
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key + "_block"] = block
+        _shared[key] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+
+def _run_chunk(task) -> int:
+    config_index, config, start, stop, horizon, batch_size, checkpoints, seed_seq = task
+    curve, convergence = simulate_replications(
+        config, stop - start, horizon, batch_size, checkpoints, np.random.default_rng(seed_seq)
+    )
+    _shared["regret"][config_index, start:stop] = curve
+    _shared["convergence"][config_index, start:stop] = convergence
+    return stop - start
+
+
+def _percentiles(values: np.ndarray, percentiles) -> dict:
+    # No interpolation, so that "not converged" (inf) stays inf instead of nan
+    points = np.percentile(values, percentiles, method="inverted_cdf")
+    return {f"p{p:g}": (round(float(v), 4) if np.isfinite(v) else None) for p, v in zip(percentiles, points)}
+
+
+def run_study(
+    configs: list[StudyConfig],
+    replications: int = 1000,
+    horizon: int = 10000,
+    batch_size: int = 10,
+    n_checkpoints: int = 20,
+    percentiles=(5, 25, 50, 75, 95),
+    workers: int | None = None,
+    chunk_size: int = 100,
+    seed: int = 0,
+    arrays: dict | None = None,
+) -> dict:
+    """
+    Run every configuration ``replications`` times and summarize regret and convergence.
+
+    If ``arrays`` is a dict, the raw results are stored in it: ``regret``
+    with shape ``(configs, replications, checkpoints)``, ``convergence`` with
+    shape ``(configs, replications)`` and ``checkpoints``.
+
+    Returns:
+        dict: The study report, one entry per configuration under ``configs``.
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoints = np.unique(np.linspace(horizon / n_checkpoints, horizon, n_checkpoints).round().astype(np.int64))
+    regret_shape = (len(configs), replications, len(checkpoints))
+    convergence_shape = (len(configs), replications)
+
+    root = np.random.SeedSequence(seed)
+    tasks = []
+    for i, (config, config_seq) in enumerate(zip(configs, root.spawn(len(configs)))):
+        starts = range(0, replications, chunk_size)
+        for start, chunk_seq in zip(starts, config_seq.spawn(len(starts))):
+            stop = min(start + chunk_size, replications)
+            tasks.append((i, config, start, stop, horizon, batch_size, checkpoints, chunk_seq))
+
+    blocks = [
+        shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        for shape in (regret_shape, convergence_shape)
+    ]
+    started = time.perf_counter()
+    try:
+        init_args = (blocks[0].name, regret_shape, blocks[1].name, convergence_shape)
+        if workers == 1:
+            _attach(*init_args)
+            for task in tasks:
+                _run_chunk(task)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=init_args) as pool:
+                for _ in pool.map(_run_chunk, tasks):
+                    pass
+        regret = np.ndarray(regret_shape, dtype=np.float64, buffer=blocks[0].buf).copy()
+        convergence = np.ndarray(convergence_shape, dtype=np.float64, buffer=blocks[1].buf).copy()
+    finally:
+        for key in ("regret_block", "convergence_block"):
+            if key in _shared:
+                _shared.pop(key).close()
+        _shared.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+    elapsed = time.perf_counter() - started
+
+    if arrays is not None:
+        arrays.update(regret=regret, convergence=convergence, checkpoints=checkpoints)
+
+    results = []
+    for i, config in enumerate(configs):
+        prices = np.asarray(config.prices, dtype=np.float64)
+        expected = prices * config.demand.buy_probabilities(prices)
+        converged = np.isfinite(convergence[i])
+        curve = [_percentiles(regret[i, :, c], percentiles) for c in range(len(checkpoints))]
+        results.append({
+            **asdict(config),
+            "best_price": float(prices[expected.argmax()]),
+            "expected_reward_per_customer": round(float(expected.max()), 6),
+            "final_regret": _percentiles(regret[i, :, -1], percentiles),
+            "regret_per_customer_p50": round(float(np.median(regret[i, :, -1])) / horizon, 6),
+            "regret_curve": {
+                "customers": checkpoints.tolist(),
+                **{key: [row[key] for row in curve] for key in curve[0]},
+            },
+            "converged_pct": round(float(converged.mean() * 100), 2),
+            "time_to_convergence": _percentiles(convergence[i], percentiles),
+        })
+
+    return {
+        "study": "thompson_regret",
+        "replications": replications,
+        "horizon": horizon,
+        "batch_size": batch_size,
+        "seed": seed,
+        "chunk_size": chunk_size,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "configs": results,
+    }
+
+
+# ======================================================
+#  CLI
+# ======================================================
+def _configs_from_args(args) -> list[StudyConfig]:
+    if args.config:
+        with open(args.config) as f:
+            entries = json.load(f)
+        return [
+            StudyConfig(**{**entry, "demand": DemandCurve(**entry.get("demand", {}))})
+            for entry in entries
+        ]
+
+    demand = DemandCurve(
+        kind=args.demand,
+        max_probability=args.max_probability,
+        steepness=args.steepness,
+        reference_price=args.reference_price,
+        choke_price=args.choke_price,
+    )
+    configs = []
+    for grid, prior_trials in product(args.grid, args.prior_trials):
+        prices = [float(p) for p in grid.split(",")]
+        configs.append(StudyConfig(
+            name=f"{grid} prior={args.prior_mean:g}x{prior_trials:g}",
+            prices=prices,
+            demand=demand,
+            prior_mean=args.prior_mean,
+            prior_variance=args.prior_variance,
+            prior_trials=prior_trials,
+        ))
+    return configs
+
+
+def main(args):
+    arrays = {} if args.save_arrays else None
+    report = run_study(
+        _configs_from_args(args),
+        replications=args.replications,
+        horizon=args.horizon,
+        batch_size=args.batch_size,
+        n_checkpoints=args.checkpoints,
+        percentiles=args.percentiles,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        arrays=arrays,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if arrays is not None:
+        np.savez_compressed(args.save_arrays, **arrays)
+
+    median = f"p{50:g}" if 50 in args.percentiles else f"p{args.percentiles[len(args.percentiles) // 2]:g}"
+    print(f"{'configuration':40} {'best':>8} {'regret ' + median:>14} {'converged':>10} {'converge ' + median:>14}")
+    for c in report["configs"]:
+        converge = c["time_to_convergence"][median]
+        print(f"{c['name'][:40]:40} {c['best_price']:>8g} {c['final_regret'][median]:>14.2f} "
+              f"{c['converged_pct']:>9.1f}% {converge if converge is not None else 'never':>14}")
+    print(f"{report['replications']} replications x {report['horizon']} customers per configuration, "
+          f"{report['workers']} workers, {report['elapsed_s']} s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", action="append",
+                        help="comma-separated price grid; repeat to compare grids (default 9.99,14.99,19.99,24.99)")
+    parser.add_argument("--config", help="JSON file with a list of StudyConfig objects instead of --grid")
+    parser.add_argument("--prior-mean", type=float, default=0.0)
+    parser.add_argument("--prior-variance", type=float, default=1.0)
+    parser.add_argument("--prior-trials", type=float, nargs="+", default=[0.0],
+                        help="pseudo-observations of the prior mean; several values are compared")
+    parser.add_argument("--demand", choices=["logistic", "exponential", "linear"], default="logistic")
+    parser.add_argument("--max-probability", type=float, default=0.5)
+    parser.add_argument("--steepness", type=float, default=0.2)
+    parser.add_argument("--reference-price", type=float)
+    parser.add_argument("--choke-price", type=float)
+    parser.add_argument("--replications", type=int, default=1000)
+    parser.add_argument("--horizon", type=int, default=10000, help="customers per replication")
+    parser.add_argument("--batch-size", type=int, default=10, help="customers per posterior update")
+    parser.add_argument("--checkpoints", type=int, default=20, help="points of the regret curve")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=[5, 25, 50, 75, 95])
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=100, help="replications per task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--save-arrays", help="write the raw regret/convergence arrays to this .npz file")
+    args = parser.parse_args()
+    args.grid = args.grid or ["9.99,14.99,19.99,24.99"]
+    sys.exit(main(args))
@@ -0,0 +1,324 @@
+"""
+Rebuild bandit posteriors from the experiments log.
+
+``bandits`` holds running sums (``trial``, ``reward``) that the API updates
+in place. ``experiments`` is the event log they are derived from. This
+module recomputes every bandit's ``trial``, ``reward``, ``mean`` and
+``variance`` from the log. It rewrites the bandits that drifted and
+reports by how much.
+
+How a rebuild works:
+
+1. Settle. Take the experiments sequence's last value as the upper bound.
+   Then wait until every transaction that was running at that moment has
+   finished. After that, no experiment with an id at or below the bound
+   can still appear.
+2. Read. Stream ``(experiment_id, project_id, bandit_id, reward)`` in id
+   order through a server-side cursor, ``--chunk-rows`` at a time. Rewards
+   arrive as integer micro-units, so the sums stay exact. The backend
+   quantizes every reward to micro-units when it is ingested, so this is
+   the exact sum of the log. Each chunk is grouped per bandit with a NumPy
+   sort and ``add.reduceat``.
+3. Apply. For each group of projects, in one transaction:
+   - lock their bandits;
+   - add the experiments committed after the bound (the live tail) to the
+     replayed totals;
+   - rewrite the bandits that differ;
+   - store the replayed totals and the bound as the new checkpoint.
+
+   Live rewards keep flowing: they wait on the row locks and are neither
+   lost nor counted twice.
+
+Checkpoints (``replay_checkpoints`` and ``replay_bandit_totals``, core
+migration 0003) make later rebuilds incremental. Only experiments after a
+project's checkpoint are read. ``--full`` ignores the checkpoints and
+replays everything.
+
+Usage:
+    python replay.py                  # incremental rebuild of all projects
+    python replay.py --check          # report drift, write nothing
+    python replay.py --full --projects 3 7
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import text
+
+# Same as the backend (services/rewards.py, services/arm_cache.py)
+REWARD_SCALE_DIGITS = 6
+MIN_VARIANCE = Decimal("0.0001")
+
+SETTLE_POLL_SECONDS = 0.05
+
+
+# ======================================================
+#  SETTLE
+# ======================================================
+def settled_upper_bound(engine, timeout: float = 30.0) -> int:
+    """
+    Return an ``experiment_id`` bound below which the log can no longer change.
+
+    Raises:
+        TimeoutError: If a transaction older than the bound stays open longer than ``timeout``.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        row = conn.execute(text(
+            "SELECT coalesce(pg_sequence_last_value("
+            "pg_get_serial_sequence('experiments', 'experiment_id')::regclass), 0), "
+            "pg_snapshot_xmax(pg_current_snapshot())::text::bigint"
+        )).one()
+        upper, horizon = row
+        deadline = time.monotonic() + timeout
+        # Every transaction that could hold an id <= upper has an xid below horizon
+        while conn.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar() < horizon:
+            if time.monotonic() > deadline:
+                raise TimeoutError("a transaction writing experiments stayed open; retry later")
+            time.sleep(SETTLE_POLL_SECONDS)
+    return int(upper)
+
+
+# ======================================================
+#  READ + AGGREGATE
+# ======================================================
+def _group_sum(bandit_ids: np.ndarray, units: np.ndarray):
+    """Trial count and exact reward sum per distinct bandit of a chunk."""
+    order = np.argsort(bandit_ids, kind="stable")
+    sorted_ids = bandit_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_ids)])
+    return sorted_ids[starts], counts, np.add.reduceat(units[order], starts)
+
+
+def aggregate_experiments(engine, checkpoints: dict[int, int], project_ids, upper: int,
+                          chunk_rows: int = 1_000_000, log=print):
+    """
+    Count trials and sum rewards per bandit over experiments newer than each project's checkpoint.
+
+    Returns:
+        tuple: (trials, reward micro-units) indexed by bandit id, and the number of rows read.
+    """
+    with engine.connect() as conn:
+        max_bandit = conn.execute(text("SELECT coalesce(max(bandit_id), 0) FROM bandits")).scalar()
+        max_project = conn.execute(text("SELECT coalesce(max(project_id), 0) FROM projects")).scalar()
+    trials = np.zeros(max_bandit + 1, dtype=np.int64)
+    units = np.zeros(max_bandit + 1, dtype=np.int64)
+
+    # Per project: replay experiments with id > since[project]; projects not replayed get upper.
+    # Ids above max_project (unknown, or created after it was read) have no rows up to upper.
+    since = np.full(max_project + 1, upper, dtype=np.int64)
+    for project_id in project_ids:
+        if 0 <= project_id <= max_project:
+            since[project_id] = checkpoints.get(project_id, 0)
+    low = int(since.min()) if len(since) else upper
+    if low >= upper:
+        return trials, units, 0
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor(name="experiments_replay")
+        cursor.itersize = chunk_rows
+        cursor.execute(
+            "SELECT experiment_id, project_id, bandit_id, "
+            f"round(reward * 1e{REWARD_SCALE_DIGITS})::bigint "
+            "FROM experiments WHERE experiment_id > %s AND experiment_id <= %s ORDER BY experiment_id",
+            (low, upper),
+        )
+        rows_read = 0
+        started = time.perf_counter()
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            chunk = np.array(rows, dtype=np.int64)
+            rows_read += len(chunk)
+            # Projects created after the max_project snapshot are not part of this rebuild
+            known = chunk[:, 1] <= max_project
+            chunk = chunk[known]
+            new = chunk[chunk[:, 0] > since[chunk[:, 1]]]
+            if len(new):
+                ids, counts, sums = _group_sum(new[:, 2], new[:, 3])
+                inside = ids <= max_bandit
+                trials[ids[inside]] += counts[inside]
+                units[ids[inside]] += sums[inside]
+            log(f"read {rows_read:,} experiments ({rows_read / (time.perf_counter() - started):,.0f}/s)")
+        cursor.close()
+        raw.commit()
+    finally:
+        raw.close()
+    return trials, units, rows_read
+
+
+# ======================================================
+#  APPLY
+# ======================================================
+def _to_reward(micro_units: int) -> Decimal:
+    return Decimal(int(micro_units)).scaleb(-REWARD_SCALE_DIGITS)
+
+
+def _apply_projects(conn, project_ids: list[int], replayed: dict, upper: int, write: bool) -> dict:
+    """Compare and rewrite the bandits of some projects in the current transaction."""
+    stored = conn.execute(
+        text(
+            "SELECT bandit_id, project_id, trial, reward FROM bandits "
+            "WHERE project_id = ANY(:p) ORDER BY bandit_id " + ("FOR UPDATE" if write else "")
+        ),
+        {"p": project_ids},
+    ).all()
+    # Rewards committed after the bound (e.g. live traffic during the read)
+    tail = {
+        row.bandit_id: (row.n, row.r)
+        for row in conn.execute(
+            text(
+                "SELECT bandit_id, count(*) AS n, "
+                f"sum(round(reward, {REWARD_SCALE_DIGITS})) AS r FROM experiments "
+                "WHERE experiment_id > :upper AND project_id = ANY(:p) GROUP BY bandit_id"
+            ),
+            {"upper": upper, "p": project_ids},
+        )
+    }
+
+    summary = {"bandits": len(stored), "drifted": 0, "rewritten": 0, "trial_drift": 0, "reward_drift": Decimal(0)}
+    rewrites, totals = [], []
+    for row in stored:
+        trial, reward = replayed.get(row.bandit_id, (0, Decimal(0)))
+        totals.append({"b": row.bandit_id, "p": row.project_id, "t": trial, "r": reward})
+        tail_n, tail_r = tail.get(row.bandit_id, (0, Decimal(0)))
+        expected_trial, expected_reward = trial + tail_n, reward + tail_r
+        if row.trial != expected_trial or row.reward != expected_reward:
+            summary["drifted"] += 1
+            summary["trial_drift"] += abs(row.trial - expected_trial)
+            summary["reward_drift"] += abs(row.reward - expected_reward)
+        rewrites.append({"b": row.bandit_id, "t": expected_trial, "r": expected_reward})
+
+    if write and rewrites:
+        # Only rows that differ are written; this also repairs mean/variance of bandits whose sums are right
+        summary["rewritten"] = conn.execute(
+            text(
+                "UPDATE bandits SET trial = v.t, reward = v.r, mean = v.m, variance = v.v "
+                "FROM (SELECT CAST(:t AS integer) AS t, CAST(:r AS numeric) AS r, "
+                "CASE WHEN :t > 0 THEN CAST(:r AS numeric) / :t ELSE 0 END AS m, "
+                "CASE WHEN :t > 0 THEN greatest(1.0 / :t, :min_var) ELSE 1 END AS v) AS v "
+                "WHERE bandit_id = :b "
+                "AND (trial, reward, mean, variance) IS DISTINCT FROM (v.t, v.r, v.m, v.v)"
+            ),
+            [{**r, "min_var": MIN_VARIANCE} for r in rewrites],
+        ).rowcount
+        conn.execute(
+            text(
+                "INSERT INTO replay_bandit_totals (bandit_id, project_id, trial, reward) "
+                "VALUES (:b, :p, :t, :r) "
+                "ON CONFLICT (bandit_id) DO UPDATE SET trial = EXCLUDED.trial, reward = EXCLUDED.reward"
+            ),
+            totals,
+        )
+    if write:
+        conn.execute(
+            text(
+                "INSERT INTO replay_checkpoints (project_id, last_experiment_id) "
+                "SELECT unnest(CAST(:p AS integer[])), :upper "
+                "ON CONFLICT (project_id) DO UPDATE "
+                "SET last_experiment_id = EXCLUDED.last_experiment_id, replayed_at = now()"
+            ),
+            {"p": project_ids, "upper": upper},
+        )
+    return summary
+
+
+def rebuild(engine, project_ids=None, full: bool = False, write: bool = True,
+            chunk_rows: int = 1_000_000, projects_per_transaction: int = 500,
+            settle_timeout: float = 30.0, log=print) -> dict:
+    """
+    Recompute bandit statistics from ``experiments`` and repair drifted bandits.
+
+    Args:
+        project_ids: Projects to rebuild; all projects if None.
+        full: Ignore stored checkpoints and replay the whole log.
+        write: False only reports drift; nothing (not even checkpoints) is written.
+
+    Returns:
+        dict: Rows read, bandits checked and drifted, total drift and timings.
+    """
+    started = time.perf_counter()
+    upper = settled_upper_bound(engine, settle_timeout)
+
+    with engine.connect() as conn:
+        if project_ids is None:
+            project_ids = [r[0] for r in conn.execute(text("SELECT project_id FROM projects ORDER BY project_id"))]
+        checkpoints, base = {}, {}
+        if not full:
+            checkpoints = dict(conn.execute(
+                text("SELECT project_id, last_experiment_id FROM replay_checkpoints WHERE project_id = ANY(:p)"),
+                {"p": project_ids},
+            ).all())
+            for row in conn.execute(
+                text("SELECT bandit_id, project_id, trial, reward FROM replay_bandit_totals WHERE project_id = ANY(:p)"),
+                {"p": project_ids},
+            ):
+                if row.project_id in checkpoints:
+                    base[row.bandit_id] = (int(row.trial), row.reward)
+    # A checkpoint beyond the bound (from a concurrent rebuild) is simply re-checked
+    checkpoints = {p: min(c, upper) for p, c in checkpoints.items()}
+
+    trials, units, rows_read = aggregate_experiments(engine, checkpoints, project_ids, upper, chunk_rows, log)
+    read_s = time.perf_counter() - started
+
+    replayed = dict(base)
+    for bandit_id in np.flatnonzero(trials).tolist():
+        trial, reward = replayed.get(bandit_id, (0, Decimal(0)))
+        replayed[bandit_id] = (trial + int(trials[bandit_id]), reward + _to_reward(units[bandit_id]))
+
+    summary = {"bandits": 0, "drifted": 0, "rewritten": 0, "trial_drift": 0, "reward_drift": Decimal(0)}
+    for start in range(0, len(project_ids), projects_per_transaction):
+        group = project_ids[start:start + projects_per_transaction]
+        with engine.connect() as conn:
+            part = _apply_projects(conn, group, replayed, upper, write)
+            if write:
+                conn.commit()
+        for key in summary:
+            summary[key] += part[key]
+
+    return {
+        "projects": len(project_ids),
+        "mode": "full" if full else "incremental",
+        "write": write,
+        "checkpoint": upper,
+        "rows_read": rows_read,
+        **summary,
+        "reward_drift": str(summary["reward_drift"]),
+        "read_seconds": round(read_s, 2),
+        "total_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, nargs="+", help="projects to rebuild (default: all)")
+    parser.add_argument("--full", action="store_true", help="ignore checkpoints and replay the whole log")
+    parser.add_argument("--check", action="store_true", help="only report drift; write nothing")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="rows per server-side cursor fetch")
+    parser.add_argument("--settle-timeout", type=float, default=30.0)
+    parser.add_argument("--quiet", action="store_true", help="no per-chunk progress")
+    args = parser.parse_args()
+
+    from database.database import engine
+
+    result = rebuild(
+        engine,
+        project_ids=args.projects,
+        full=args.full,
+        write=not args.check,
+        chunk_rows=args.chunk_rows,
+        settle_timeout=args.settle_timeout,
+        log=(lambda msg: None) if args.quiet else print,
+    )
+    for key, value in result.items():
+        print(f"{key:15} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
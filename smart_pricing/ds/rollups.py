@@ -0,0 +1,209 @@
+"""
+Incremental ETL from ``experiments`` to time-bucketed rollups.
+
+This is the aggregation step of the pipeline described in ``docs/etl.md``.
+New experiments are read by ``experiment_id`` watermark. They are folded into
+``experiment_rollups``, one row per grain (minute, hour, day), bucket,
+project and bandit:
+
+    impressions   experiments (rewards) recorded
+    conversions   experiments with a positive reward
+    revenue       reward sum
+    revenue_sq    sum of squared rewards (variance = revenue_sq / n - mean²)
+
+Each batch is one transaction. One ``INSERT ... SELECT ... GROUP BY`` reads
+the batch's id range once and upserts all three grains by adding to the
+existing rows. The watermark advances in the same transaction. A batch is
+therefore applied exactly once: a crash rolls it back, and a second runner
+waits on the watermark row lock. Only ids below a settled bound are read
+(see ``replay.settled_upper_bound``), so an experiment that commits late is
+not skipped.
+
+Tables come from core migration 0004.
+
+Usage:
+    python rollups.py                 # catch up once
+    python rollups.py --follow 10     # keep catching up every 10 seconds
+    python rollups.py --rebuild       # drop all rollups and start over
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from replay import settled_upper_bound
+
+PIPELINE = "experiment_rollups"
+GRAINS = ("minute", "hour", "day")
+
+_ROLLUP_COLUMNS = "grain, bucket, project_id, bandit_id, impressions, conversions, revenue, revenue_sq"
+_ADD_ON_CONFLICT = """
+    ON CONFLICT (grain, project_id, bucket, bandit_id) DO UPDATE SET
+        impressions = experiment_rollups.impressions + EXCLUDED.impressions,
+        conversions = experiment_rollups.conversions + EXCLUDED.conversions,
+        revenue = experiment_rollups.revenue + EXCLUDED.revenue,
+        revenue_sq = experiment_rollups.revenue_sq + EXCLUDED.revenue_sq
+"""
+
+
+def _coarser(grain: str) -> str:
+    return f"""
+        INSERT INTO experiment_rollups ({_ROLLUP_COLUMNS})
+        SELECT '{grain}', date_trunc('{grain}', bucket), project_id, bandit_id,
+               sum(impressions), sum(conversions), sum(revenue), sum(revenue_sq)
+        FROM batch GROUP BY 2, 3, 4
+        {_ADD_ON_CONFLICT}
+    """
+
+
+ROLLUP_BATCH_SQL = f"""
+WITH batch AS (
+    SELECT date_trunc('minute', start_date) AS bucket, project_id, bandit_id,
+           count(*) AS impressions,
+           count(*) FILTER (WHERE reward > 0) AS conversions,
+           sum(reward) AS revenue,
+           sum(reward * reward) AS revenue_sq
+    FROM experiments
+    WHERE experiment_id > :low AND experiment_id <= :high AND start_date IS NOT NULL
+    GROUP BY 1, 2, 3
+),
+minute AS (
+    INSERT INTO experiment_rollups ({_ROLLUP_COLUMNS})
+    SELECT 'minute', bucket, project_id, bandit_id, impressions, conversions, revenue, revenue_sq
+    FROM batch
+    {_ADD_ON_CONFLICT}
+),
+hour AS ({_coarser("hour")})
+{_coarser("day")}
+"""
+
+
+def _lock_watermark(conn) -> int:
+    conn.execute(
+        text("INSERT INTO rollup_watermarks (name, last_experiment_id) VALUES (:n, 0) ON CONFLICT DO NOTHING"),
+        {"n": PIPELINE},
+    )
+    return conn.execute(
+        text("SELECT last_experiment_id FROM rollup_watermarks WHERE name = :n FOR UPDATE"),
+        {"n": PIPELINE},
+    ).scalar()
+
+
+def run_once(engine, batch_rows: int = 500_000, settle_timeout: float = 30.0, log=print) -> dict:
+    """
+    Fold all settled experiments newer than the watermark into the rollups.
+
+    Args:
+        batch_rows: Width of the ``experiment_id`` range applied per transaction.
+
+    Returns:
+        dict: Watermark before and after, batches applied and elapsed seconds.
+    """
+    started = time.perf_counter()
+    upper = settled_upper_bound(engine, settle_timeout)
+    batches = 0
+    first = None
+    while True:
+        with engine.begin() as conn:
+            low = _lock_watermark(conn)
+            first = low if first is None else first
+            if low >= upper:
+                break
+            high = min(low + batch_rows, upper)
+            conn.execute(text(ROLLUP_BATCH_SQL), {"low": low, "high": high})
+            conn.execute(
+                text("UPDATE rollup_watermarks SET last_experiment_id = :high, updated_at = now() WHERE name = :n"),
+                {"high": high, "n": PIPELINE},
+            )
+        batches += 1
+        log(f"rolled up experiments {low + 1:,}..{high:,}")
+    return {
+        "from": first,
+        "to": max(first, upper),
+        "batches": batches,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def rebuild(engine, **kwargs) -> dict:
+    """Delete every rollup, reset the watermark and roll up the whole log again."""
+    with engine.begin() as conn:
+        _lock_watermark(conn)
+        conn.execute(text("DELETE FROM experiment_rollups"))
+        conn.execute(text("UPDATE rollup_watermarks SET last_experiment_id = 0 WHERE name = :n"), {"n": PIPELINE})
+    return run_once(engine, **kwargs)
+
+
+def load_rollups(engine, project_id: int, grain: str = "hour",
+                 since: datetime | None = None, until: datetime | None = None) -> list[dict]:
+    """
+    Rollup rows of one project, with conversion rate, mean and variance per bucket.
+
+    ``since`` is inclusive and ``until`` exclusive; both are naive UTC like ``experiments.start_date``.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {GRAINS}")
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT bucket, bandit_id, impressions, conversions, revenue, revenue_sq "
+                "FROM experiment_rollups WHERE grain = :g AND project_id = :p "
+                "AND bucket >= coalesce(CAST(:since AS timestamp), '-infinity') "
+                "AND bucket < coalesce(CAST(:until AS timestamp), 'infinity') "
+                "ORDER BY bucket, bandit_id"
+            ),
+            {"g": grain, "p": project_id, "since": since, "until": until},
+        ).all()
+    result = []
+    for r in rows:
+        n = r.impressions
+        mean = float(r.revenue) / n
+        result.append({
+            "bucket": r.bucket,
+            "bandit_id": r.bandit_id,
+            "impressions": n,
+            "conversions": r.conversions,
+            "conversion_rate": r.conversions / n,
+            "revenue": r.revenue,
+            "mean": mean,
+            "variance": max(float(r.revenue_sq) / n - mean * mean, 0.0),
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--follow", type=float, metavar="SECONDS", help="keep running, catching up every SECONDS")
+    parser.add_argument("--rebuild", action="store_true", help="delete all rollups and start from the first experiment")
+    parser.add_argument("--batch-rows", type=int, default=500_000, help="experiment ids per transaction")
+    parser.add_argument("--settle-timeout", type=float, default=30.0)
+    parser.add_argument("--quiet", action="store_true", help="no per-batch progress")
+    args = parser.parse_args()
+
+    from database.database import engine
+
+    options = {
+        "batch_rows": args.batch_rows,
+        "settle_timeout": args.settle_timeout,
+        "log": (lambda msg: None) if args.quiet else print,
+    }
+    result = rebuild(engine, **options) if args.rebuild else run_once(engine, **options)
+    print(f"watermark {result['from']} -> {result['to']} in {result['batches']} batches ({result['seconds']}s)")
+
+    while args.follow:
+        time.sleep(args.follow)
+        try:
+            result = run_once(engine, **options)
+        except TimeoutError as exc:
+            print(f"skipped: {exc}")
+            continue
+        if result["batches"]:
+            print(f"watermark {result['from']} -> {result['to']} ({result['seconds']}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
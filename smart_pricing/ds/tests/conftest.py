@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+
+# Tests import ds modules the way the scripts do (``from replay import ...``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA = "pytest_ds_scratch"
+
+
+@pytest.fixture
+def pg_engine():
+    """
+    Engine on the DB_* database whose connections all use a throw-away schema.
+
+    The ds scripts open several connections and commit, so the schema is
+    dropped afterwards instead of rolled back. Skipped when no database is reachable.
+    """
+    from database.database import get_db_url
+
+    admin = create_engine(get_db_url())
+    try:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    except Exception as e:  # no database in this environment
+        admin.dispose()
+        pytest.skip(f"database not reachable: {e}")
+    engine = create_engine(get_db_url(), connect_args={"options": f"-c search_path={SCHEMA}"})
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+        admin.dispose()
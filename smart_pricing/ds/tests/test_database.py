@@ -0,0 +1,25 @@
+import ast
+import os
+
+import pytest
+
+from database import database
+
+CORE_CONFIG = os.path.join(os.path.dirname(__file__), "..", "..", "core", "config.py")
+
+
+def _function_source(path: str, name: str) -> str:
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    node = next(n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == name)
+    # The docstrings name each other's file; compare the code only
+    node.body = node.body[1:]
+    return ast.unparse(node)
+
+
+def test_pool_options_match_core():
+    if not os.path.exists(CORE_CONFIG):
+        pytest.skip("core is not checked out next to ds")
+    assert _function_source(database.__file__, "pool_options_from_env") == _function_source(
+        CORE_CONFIG, "pool_options_from_env"
+    )
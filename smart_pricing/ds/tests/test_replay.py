@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from replay import rebuild
+
+
+def _schema(engine):
+    """The tables replay reads and writes, as core and its migration 0003 create them."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE projects (project_id SERIAL PRIMARY KEY)"))
+        conn.execute(text(
+            "CREATE TABLE bandits (bandit_id SERIAL PRIMARY KEY, project_id INTEGER REFERENCES projects, "
+            "trial INTEGER NOT NULL, reward NUMERIC NOT NULL, mean NUMERIC NOT NULL, variance NUMERIC NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE experiments (experiment_id BIGSERIAL PRIMARY KEY, project_id INTEGER, "
+            "bandit_id INTEGER, reward NUMERIC)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE replay_checkpoints (project_id INTEGER PRIMARY KEY, "
+            "last_experiment_id BIGINT NOT NULL, replayed_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        conn.execute(text(
+            "CREATE TABLE replay_bandit_totals (bandit_id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL, "
+            "trial BIGINT NOT NULL, reward NUMERIC NOT NULL)"
+        ))
+        conn.execute(text("INSERT INTO projects VALUES (1)"))
+        conn.execute(text("INSERT INTO bandits VALUES (1, 1, 3, 3.5, 1.1666666666666667, 0.3333333333333333)"))
+        conn.execute(text(
+            "INSERT INTO experiments (project_id, bandit_id, reward) VALUES (1, 1, 1), (1, 1, 2.5), (1, 1, 0)"
+        ))
+
+
+def _bandit(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT trial, reward FROM bandits WHERE bandit_id = 1")).one()
+
+
+def test_rebuild_skips_unknown_project_ids(pg_engine):
+    _schema(pg_engine)
+
+    result = rebuild(pg_engine, project_ids=[1, 99], full=True, log=lambda msg: None)
+
+    assert result["rows_read"] == 3
+    assert result["drifted"] == 0
+    assert _bandit(pg_engine) == (3, Decimal("3.5"))
+
+
+def test_rebuild_repairs_drift(pg_engine):
+    _schema(pg_engine)
+    with pg_engine.begin() as conn:
+        conn.execute(text("UPDATE bandits SET trial = 5, reward = 9 WHERE bandit_id = 1"))
+
+    result = rebuild(pg_engine, full=True, log=lambda msg: None)
+
+    assert result["drifted"] == 1 and result["trial_drift"] == 2
+    assert _bandit(pg_engine) == (3, Decimal("3.5"))
+    assert rebuild(pg_engine, log=lambda msg: None)["drifted"] == 0
@@ -1,15 +1,19 @@
 # frontend/app.py
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import pandas as pd
 import numpy as np
 from typing import Optional
 import os
 import altair as alt
-from scipy.stats import norm
 
 # ==== CONFIG ====
 API_BASE_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+HTTP_POOL_SIZE = int(os.getenv("FRONTEND_HTTP_POOL_SIZE", "16"))
 CUSTOMER_APP_URL = os.getenv("CUSTOMER_APP_URL", "http://localhost:8502")  # where customer_app.py runs
 
 # Convert backend static path → public URL
@@ -398,10 +402,39 @@ if "current_bandit_id" not in st.session_state:
 if "last_price" not in st.session_state:
     st.session_state.last_price = None
 
+# ==== HTTP CLIENT ====
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    # One keep-alive connection pool shared by all reruns and sessions of this server
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_fetch_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="api-fetch")
+
+def fetch_concurrently(*calls):
+    """
+    Run independent API helpers in parallel; ``calls`` are ``(fn, *args)``
+    tuples and the results come back in the same order.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(fn, *args):
+        # Worker threads need the script context to use st.* (errors, session_state)
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    futures = [get_fetch_executor().submit(run, *call) for call in calls]
+    return [f.result() for f in futures]
+
 # ==== API SAFE REQUEST WRAPPER ====
 def _safe_request(method: str, url: str, **kwargs) -> Optional[requests.Response]:
     try:
-        return requests.request(method, url, timeout=5, **kwargs)
+        return get_http_session().request(method, url, timeout=5, **kwargs)
     except requests.RequestException as e:
         st.error(f"Network error calling {url}: {e}")
         return None
@@ -411,9 +444,21 @@ def fetch_project(project_id: int):
     r = _safe_request("GET", f"{API_BASE_URL}/projects/{project_id}")
     return r.json() if r and r.status_code == 200 else None
 
+def _fetch_all_pages(url: str, **params):
+    # List endpoints are keyset-paginated; follow X-Next-Cursor to the last page
+    items = []
+    while True:
+        r = _safe_request("GET", url, params=params)
+        if not r or r.status_code != 200:
+            return items
+        items.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+        params["cursor"] = cursor
+
 def fetch_projects():
-    r = _safe_request("GET", f"{API_BASE_URL}/projects")
-    return r.json() if r and r.status_code == 200 else []
+    return _fetch_all_pages(f"{API_BASE_URL}/projects", fields="project_id,description", limit=1000)
 
 def create_project(description: str, number_bandits: int, price: float):
     payload = {"description": description, "number_bandits": number_bandits, "price": price}
@@ -425,8 +470,7 @@ def create_bandit(project_id: int, price: float):
     return r.json() if r and r.status_code in (200, 201) else None
 
 def fetch_bandits(project_id: int):
-    r = _safe_request("GET", f"{API_BASE_URL}/projects/{project_id}/bandits")
-    return r.json() if r and r.status_code == 200 else []
+    return _fetch_all_pages(f"{API_BASE_URL}/projects/{project_id}/bandits")
 
 def thompson_select(project_id: int):
     r = _safe_request("POST", f"{API_BASE_URL}/projects/{project_id}/thompson/select")
@@ -448,9 +492,32 @@ def submit_reward(bandit_id: int, reward: float, decision: str):
     st.write("Debug reward response:", res)  # TEMP: to see it in the UI
     return res
 
-def fetch_posterior_plot(project_id: int):
-    r = _safe_request("GET", f"{API_BASE_URL}/projects/{project_id}/thompson/plot")
-    return r.content if r and r.status_code == 200 else None
+def _fetch_revalidated(cache_name: str, key, url: str, decode, **params):
+    # Revalidate with the last ETag; the backend answers 304 while no reward changed the posteriors
+    cache = st.session_state.setdefault(cache_name, {})
+    etag, value = cache.get(key, (None, None))
+    r = _safe_request("GET", url, params=params, headers={"If-None-Match": etag} if etag else {})
+    if r is not None and r.status_code == 304:
+        return value
+    if not r or r.status_code != 200:
+        return None
+    cache[key] = (r.headers.get("ETag"), decode(r))
+    return cache[key][1]
+
+def fetch_posterior_grid(project_id: int, points: int = 200):
+    return _fetch_revalidated(
+        "posterior_grid_cache", (project_id, points),
+        f"{API_BASE_URL}/projects/{project_id}/thompson/posterior",
+        lambda r: r.json(), points=points,
+    )
+
+def fetch_timeseries(project_id: int, points: int = 200):
+    r = _safe_request(
+        "GET",
+        f"{API_BASE_URL}/projects/{project_id}/experiments/timeseries",
+        params={"points": points},
+    )
+    return r.json() if r and r.status_code == 200 else None
 
 # ==== SIDEBAR NAVIGATION ====
 with st.sidebar:
@@ -636,7 +703,13 @@ def experiment_page():
     # -----------------------------------------------------
     # 2. PRODUCT INFO SECTION
     # -----------------------------------------------------
-    project_data = fetch_project(pid)
+    # Independent fetches run concurrently: the page waits for the slowest, not the sum
+    project_data, bandits, grid, series = fetch_concurrently(
+        (fetch_project, pid),
+        (fetch_bandits, pid),
+        (fetch_posterior_grid, pid),
+        (fetch_timeseries, pid),
+    )
 
     st.markdown('<div class="section-title">Product</div>', unsafe_allow_html=True)
     prod_col1, prod_col2 = st.columns([1.5, 0.3])
@@ -668,7 +741,6 @@ def experiment_page():
     # -----------------------------------------------------
     # 3. LOAD BANDITS
     # -----------------------------------------------------
-    bandits = fetch_bandits(pid)
     df = pd.DataFrame()
 
     if bandits:
@@ -695,8 +767,9 @@ def experiment_page():
         total_trials = int(df["trials"].sum())
         total_reward = float(df["reward_sum"].sum())
 
-        # reward ≠ count → conversion computed later
-        conversion_rate = (df["reward_sum"] > 0).sum() / total_trials if total_trials > 0 else 0.0
+        # Experiments with a positive reward, counted by the backend
+        impressions = sum(series["total_impressions"]) if series else 0
+        conversion_rate = sum(series["total_conversions"]) / impressions if impressions > 0 else 0.0
 
         best_idx = df["mean"].idxmax()
         best_price = df.loc[best_idx, "price"]
@@ -716,59 +789,50 @@ def experiment_page():
         st.bar_chart(comparison_df.set_index("price"), use_container_width=True)
 
         # -----------------------------------------------------
-        # 6. FIXED ROLLING CONVERSION
+        # 6. CONVERSION OVER TIME
         # -----------------------------------------------------
-        st.subheader("Performance Over Time (Rolling Conversion)")
-
-        if total_trials > 0:
-            conversions = []
-
-            # Count conversions per bandit properly
-            for _, row in df.iterrows():
-                buys = int(1 if row["reward_sum"] > 0 else 0)
-                no_buys = int(row["trials"] - buys)
-                conversions.extend([1] * buys + [0] * no_buys)
-
-            # enforce equal length
-            conversions = conversions[:total_trials]
+        st.subheader("Performance Over Time (Conversion Rate)")
 
+        if series and any(series["t"]):
+            # Buckets per bandit, already downsampled by the backend
+            labels = [f"Bandit {b} | price={p}" for b, p in zip(series["bandit_ids"], series["prices"])]
             timeline_df = pd.DataFrame({
-                "trial": np.arange(1, total_trials + 1),
-                "conversion": conversions,
+                "time": pd.to_datetime(np.concatenate(series["t"]).astype(np.int64), unit="ms"),
+                "conversion_rate": np.concatenate(series["conversion_rate"]),
+                "revenue": np.concatenate(series["revenue"]),
+                "impressions": np.concatenate(series["impressions"]).astype(np.int64),
+                "bandit": np.repeat(labels, [len(t) for t in series["t"]]),
             })
 
-            timeline_df["rolling_rate"] = timeline_df["conversion"].rolling(20, min_periods=1).mean()
-
-            st.line_chart(
-                timeline_df.set_index("trial")[["rolling_rate"]],
-                use_container_width=True
+            timeline_chart = (
+                alt.Chart(timeline_df)
+                .mark_line(point=True)
+                .encode(
+                    x=alt.X("time:T", title="Time (UTC)"),
+                    y=alt.Y("conversion_rate:Q", title="Conversion Rate", axis=alt.Axis(format="%")),
+                    color=alt.Color("bandit:N", title="Bandit"),
+                    tooltip=["bandit:N", "time:T", "conversion_rate:Q", "impressions:Q", "revenue:Q"],
+                )
+                .properties(height=300, width="container")
+                .interactive()
             )
+            st.altair_chart(timeline_chart, use_container_width=True)
+        else:
+            st.info("No experiments recorded yet.")
 
         # -----------------------------------------------------
         # 7. POSTERIOR PLOTS
         # -----------------------------------------------------
         st.subheader("Posterior Distributions (Thompson Sampling)")
 
-        if not df.empty:
-            bandit_curves = []
-
-            for _, row in df.iterrows():
-                mean = float(row["mean"])
-                var = float(row["variance"])
-                std = max(var, 1e-6) ** 0.5
-                price = float(row["price"])
-                bandit_id = int(row["bandit_id"])
-
-                xs = np.linspace(mean - 4 * std, mean + 4 * std, 200)
-
-                for x in xs:
-                    bandit_curves.append({
-                        "x": x,
-                        "density": norm.pdf(x, mean, std),
-                        "bandit": f"Bandit {bandit_id} | price={price}"
-                    })
-
-            chart_df = pd.DataFrame(bandit_curves)
+        if grid:
+            # Columnar grid from the backend: one row of x/density per bandit
+            labels = [f"Bandit {b} | price={p}" for b, p in zip(grid["bandit_ids"], grid["prices"])]
+            chart_df = pd.DataFrame({
+                "x": np.ravel(grid["x"]),
+                "density": np.ravel(grid["density"]),
+                "bandit": np.repeat(labels, grid["points"]),
+            })
 
             posterior_chart = (
                 alt.Chart(chart_df)
@@ -15,26 +15,26 @@ st.set_page_config(page_title="Special Offer", layout="centered")
 
 
 # --------------------------
-#  LOGIC (UNCHANGED)
+#  LOGIC
 # --------------------------
 
-def get_default_project():
-    r = requests.get(f"{API_BASE}/projects")
-    if r.status_code != 200 or len(r.json()) == 0:
-        return None
-    return r.json()[0]["project_id"]
-
-PROJECT_ID = get_default_project()
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    return requests.Session()
 
-if PROJECT_ID is None:
-    st.error("No projects found. Ask admin to create one.")
-    st.stop()
+def make_public_image_url(path: str | None):
+    if not path:
+        return None
+    return f"http://localhost:8000{path}"
 
-# Load price once
+# Load the offer once: project, price and image come back in one call
 if "offer" not in st.session_state:
-    r = requests.post(f"{API_BASE}/projects/{PROJECT_ID}/thompson/select")
+    r = get_http_session().post(f"{API_BASE}/offer", timeout=5)
     if r.status_code == 200:
         st.session_state.offer = r.json()
+    elif r.status_code == 404:
+        st.error("No projects found. Ask admin to create one.")
+        st.stop()
     else:
         st.error("Backend returned no price.")
         st.stop()
@@ -42,25 +42,7 @@ if "offer" not in st.session_state:
 offer = st.session_state.offer
 bandit_id = offer["bandit_id"]
 price = float(offer["price"])
-
-
-# --------------------------
-#  FETCH PROJECT TO SHOW IMAGE
-# --------------------------
-
-def make_public_image_url(path: str | None):
-    if not path:
-        return None
-    return f"http://localhost:8000{path}"
-
-def fetch_project(pid):
-    r = requests.get(f"{API_BASE}/projects/{pid}")
-    if r.status_code != 200:
-        return None
-    return r.json()
-
-project_data = fetch_project(PROJECT_ID)
-product_image = make_public_image_url(project_data.get("image_path")) if project_data else None
+product_image = make_public_image_url(offer.get("image_path"))
 
 
 # --------------------------
@@ -113,11 +95,11 @@ st.markdown(
 
 
 # --------------------------
-#  REWARD HANDLER (UNCHANGED)
+#  REWARD HANDLER
 # --------------------------
 
 def send_reward(value):
-    requests.post(
+    get_http_session().post(
         f"{API_BASE}/bandits/{bandit_id}/thompson/reward",
         json={"reward": value, "decision": "customer_click"}
     )